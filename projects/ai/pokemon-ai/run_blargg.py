@@ -4,6 +4,8 @@ Usage:
     python run_blargg.py rom/blargg/instr_timing.gb
     python run_blargg.py rom/blargg/cpu_instrs.gb
     python run_blargg.py rom/blargg/instr_timing.gb --max-cycles 50000000
+    python run_blargg.py rom/blargg/cpu_instrs.gb --compile-blocks
+    python run_blargg.py rom/blargg/instr_timing.gb --event-scheduler
 """
 
 import argparse
@@ -15,14 +17,16 @@ from src.gameboy import GameBoy
 DEFAULT_MAX_CYCLES = 30_000_000  # 30M T-cycles (~7 seconds of Game Boy time)
 
 
-def run_blargg(rom_path, max_cycles):
-    gb = GameBoy()
+def run_blargg(rom_path, max_cycles, compile_blocks=False, event_scheduler=False):
+    gb = GameBoy(compile_blocks=compile_blocks, event_scheduler=event_scheduler)
     cart = gb.load_cartridge(rom_path)
 
     print(f"ROM:    {cart.title}")
     print(f"Type:   {cart.cartridge_type_name}")
     print(f"Size:   {cart.rom_size // 1024} KB")
     print(f"Budget: {max_cycles:,} T-cycles")
+    print(f"Mode:   {'block compiler' if compile_blocks else 'interpreter'}"
+          f"{', event scheduler' if event_scheduler else ''}")
     print("-" * 40)
 
     gb.cpu.registers.PC = 0x0100  # Skip boot ROM, start at cartridge entry point
@@ -67,6 +71,16 @@ if __name__ == "__main__":
         default=DEFAULT_MAX_CYCLES,
         help=f"Maximum T-cycles to run (default: {DEFAULT_MAX_CYCLES:,})",
     )
+    parser.add_argument(
+        "--compile-blocks",
+        action="store_true",
+        help="Run with the basic-block compiler instead of the plain interpreter",
+    )
+    parser.add_argument(
+        "--event-scheduler",
+        action="store_true",
+        help="Catch up timer/PPU/APU on events instead of ticking them every instruction",
+    )
     args = parser.parse_args()
 
-    sys.exit(run_blargg(args.rom, args.max_cycles))
+    sys.exit(run_blargg(args.rom, args.max_cycles, args.compile_blocks, args.event_scheduler))
@@ -3,6 +3,10 @@
 Usage:
     python run_pygame.py rom/Tetris.gb
     python run_pygame.py rom/Tetris.gb --scale 4
+    python run_pygame.py rom/Tetris.gb --threaded
+    python run_pygame.py rom/Tetris.gb --audio low --audio-rate 11025
+    python run_pygame.py rom/Tetris.gb --audio-sync
+    python run_pygame.py rom/Tetris.gb --skip-idle-loops
 """
 
 import argparse
@@ -23,11 +27,50 @@ def main():
     parser.add_argument(
         "--wav",
         metavar="FILE",
-        help="Record audio to a WAV file (48kHz 16-bit stereo)",
+        help="Record audio to a WAV file (16-bit stereo at the audio rate)",
+    )
+    parser.add_argument(
+        "--audio",
+        choices=("off", "low", "full"),
+        default="full",
+        help="Audio quality: off (silent, fastest), low (--audio-rate Hz) or full (48kHz)",
+    )
+    parser.add_argument(
+        "--audio-rate",
+        type=int,
+        default=22050,
+        help="Sample rate for --audio low (default: 22050)",
+    )
+    parser.add_argument(
+        "--audio-sync",
+        action="store_true",
+        help="Pace emulation by the sound card and nudge the audio rate to hold latency",
+    )
+    parser.add_argument(
+        "--numpy-renderer",
+        action="store_true",
+        help="Draw each frame at V-Blank with NumPy (needs numpy installed)",
+    )
+    parser.add_argument(
+        "--numpy-audio",
+        action="store_true",
+        help="Synthesize audio in blocks with NumPy (needs numpy installed)",
+    )
+    parser.add_argument(
+        "--skip-idle-loops",
+        action="store_true",
+        help="Fast-forward through polling loops (see src/cpu/idle_loop.py)",
+    )
+    parser.add_argument(
+        "--threaded",
+        action="store_true",
+        help="Run emulation on a worker thread, apart from presentation and input",
     )
     args = parser.parse_args()
 
-    gb = GameBoy()
+    gb = GameBoy(numpy_renderer=args.numpy_renderer, numpy_audio=args.numpy_audio,
+                 audio_mode=args.audio, low_audio_rate=args.audio_rate,
+                 skip_idle_loops=args.skip_idle_loops)
     cart = gb.load_cartridge(args.rom)
     print(f"ROM:   {cart.title}")
     print(f"Type:  {cart.cartridge_type_name}")
@@ -38,7 +81,8 @@ def main():
 
     gb.init_post_boot_state()
 
-    frontend = PygameFrontend(gb, scale=args.scale, wav_path=args.wav, rom_path=args.rom)
+    frontend = PygameFrontend(gb, scale=args.scale, wav_path=args.wav, rom_path=args.rom,
+                              threaded=args.threaded, audio_sync=args.audio_sync)
     try:
         frontend.run()
     finally:
@@ -14,7 +14,7 @@ DEFAULT_MAX_CYCLES = 12_000_000  # ~3 seconds of Game Boy time (reaches title sc
 
 
 def run_tetris(max_cycles):
-    gb = GameBoy()
+    gb = GameBoy(skip_idle_loops=True)
     cart = gb.load_cartridge("rom/Tetris.gb")
 
     print(f"ROM:    {cart.title}")
@@ -38,8 +38,8 @@ def run_tetris(max_cycles):
     print(f"LCDC:   0x{gb.ppu._lcdc:02X}")
     print(f"BGP:    0x{gb.ppu._bgp:02X}")
 
-    fb = gb.ppu.get_framebuffer()
-    nonzero = sum(1 for row in fb for px in row if px > 0)
+    fb = bytes(gb.ppu.get_framebuffer())
+    nonzero = len(fb) - fb.count(0)
     print(f"Pixels: {nonzero} non-zero / {160 * 144} total")
 
     print(f"\n{'=' * 40}")
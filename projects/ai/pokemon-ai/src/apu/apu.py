@@ -1,8 +1,8 @@
+from src.apu import block_synth
 from src.apu.pulse_channel import PulseChannel
 from src.apu.wave_channel import WaveChannel
 from src.apu.noise_channel import NoiseChannel
-
-_NOISE_DIVISOR_TABLE = NoiseChannel.DIVISOR_TABLE
+from src.apu.sample_ring import SampleRing
 
 
 class APU:
@@ -12,14 +12,41 @@ class APU:
     sample output. Register range: 0xFF10-0xFF3F.
 
     The APU is ticked by the CPU after each instruction (same pattern as
-    Timer and PPU). It generates stereo samples at 48 kHz into a buffer
-    that the frontend can drain for audio playback.
+    Timer and PPU). It generates 16-bit stereo samples at 48 kHz into a
+    preallocated SampleRing (see sample_ring.py) that the frontend drains
+    for audio playback.
+
+    Ticks only add to a count of pending cycles. The channels are caught up
+    (_catch_up) when the next frame sequencer step or sample point is due,
+    or before a register access, save_state() or drain_samples(): nothing
+    else can observe them in between. Each channel advances its timer in
+    closed form, so catching up costs the same for 4 cycles or 4,000.
+
+    With numpy_synthesis=True (and NumPy installed) sample points are not
+    events either: a BlockSynth (see block_synth.py) synthesizes all the
+    samples between two events with array operations.
+
+    audio_mode picks how much sound is produced:
+
+        "full"  48 kHz, the default.
+        "low"   low_sample_rate Hz (e.g. 22050 or 11025): fewer sample
+                points to mix, at the cost of treble.
+        "off"   No samples at all, for headless runs nobody listens to.
+                The frame sequencer and channel timers still run, so
+                everything a game can read back (NR52 status bits, length
+                counters, sweep overflow) behaves exactly as in "full".
+
+    set_rate_adjustment() lets a frontend produce samples a fraction of a
+    percent faster or slower than sample_rate, so the audio it queues
+    keeps pace with the sound card's clock (see frontend/audio_sync.py).
     """
 
-    SAMPLE_RATE = 48000
+    SAMPLE_RATE = 48000  # "full" audio_mode
     CPU_CLOCK = 4_194_304
     SAMPLE_PERIOD = CPU_CLOCK / SAMPLE_RATE  # ~87.38 T-cycles
     FRAME_SEQUENCER_PERIOD = 8192  # T-cycles per frame sequencer step
+    AUDIO_MODES = ("off", "low", "full")
+    MAX_RATE_ADJUSTMENT = 0.005  # ±0.5%: too little to hear as a pitch change
 
     # Register read masks: unused bits read as 1
     READ_MASKS = {
@@ -30,7 +57,17 @@ class APU:
         0xFF24: 0x00, 0xFF25: 0x00, 0xFF26: 0x70,
     }
 
-    def __init__(self):
+    def __init__(self, numpy_synthesis=False, audio_mode="full", low_sample_rate=22050):
+        if audio_mode not in self.AUDIO_MODES:
+            raise ValueError(f"Unknown audio mode: {audio_mode!r} "
+                             f"(expected one of {self.AUDIO_MODES})")
+        if audio_mode == "low" and not 0 < low_sample_rate <= self.SAMPLE_RATE:
+            raise ValueError(f"low_sample_rate must be in 1..{self.SAMPLE_RATE}, "
+                             f"got {low_sample_rate}")
+        self.audio_mode = audio_mode
+        # Samples per second, or None when audio is off
+        self.sample_rate = {"off": None, "low": low_sample_rate, "full": self.SAMPLE_RATE}[audio_mode]
+
         # Channels
         self._ch1 = PulseChannel(has_sweep=True)
         self._ch2 = PulseChannel(has_sweep=False)
@@ -47,11 +84,24 @@ class APU:
         self._fs_step = 0
 
         # Sample generation — integer Bresenham counter prevents float drift.
-        # Counter increments by SAMPLE_RATE * cycles each tick.
+        # Counter increments by sample_rate * cycles each tick.
         # A sample is generated when counter >= CPU_CLOCK, then counter -= CPU_CLOCK.
-        # This produces exactly SAMPLE_RATE samples per CPU_CLOCK cycles with zero drift.
+        # This produces exactly sample_rate samples per CPU_CLOCK cycles with zero drift.
         self._sample_counter = 0
-        self._sample_buffer = []
+        self._ring = SampleRing(self.sample_rate or 0)  # One second of audio
+        # The rate the counter advances at: sample_rate, nudged by set_rate_adjustment()
+        self._counter_rate = self.sample_rate
+
+        # Lazy catch-up: cycles ticked but not yet run, and how many
+        # pending cycles reach the next frame sequencer step or sample
+        self._pending_cycles = 0
+        self._cycles_to_event = 0
+        self._synth = None
+        if numpy_synthesis and block_synth.AVAILABLE and self.sample_rate:
+            self._synth = block_synth.BlockSynth(self)
+        # Whether sample points are catch-up events (per-sample mixing)
+        self._sample_events = self._synth is None and self.sample_rate is not None
+        self._update_cycles_to_event()
 
         # High-pass filter state (removes DC offset)
         self._hpf_capacitor_left = 0.0
@@ -59,87 +109,94 @@ class APU:
         # Charge factor adjusted for 48 kHz sample rate
         # DMG factor at native rate: 0.999958
         # Adjusted: 0.999958 ^ (4194304 / 48000) ≈ 0.9963
-        self._hpf_charge_factor = 0.9963
+        # A lower sample_rate does 48000 / sample_rate of those steps per sample
+        self._hpf_charge_factor = 0.9963 ** (self.SAMPLE_RATE / (self.sample_rate or self.SAMPLE_RATE))
 
     def tick(self, cycles):
         """Advance the APU by the given number of T-cycles."""
         if not self._power:
             return
-
-        fs_counter = self._fs_counter + cycles
-        sample_counter = self._sample_counter + cycles * 48000
-
-        # Fast path: no event boundary within this batch
-        if fs_counter < 8192 and sample_counter < 4194304:
-            self._fs_counter = fs_counter
-            self._sample_counter = sample_counter
-            # Inline channel ticks to avoid 4 method calls
-            ch1 = self._ch1
-            if ch1._enabled:
-                ch1._freq_timer -= cycles
-                if ch1._freq_timer <= 0:
-                    while ch1._freq_timer <= 0:
-                        ch1._freq_timer += (2048 - ch1._period) * 4
-                        ch1._duty_pos = (ch1._duty_pos + 1) & 7
-            ch2 = self._ch2
-            if ch2._enabled:
-                ch2._freq_timer -= cycles
-                if ch2._freq_timer <= 0:
-                    while ch2._freq_timer <= 0:
-                        ch2._freq_timer += (2048 - ch2._period) * 4
-                        ch2._duty_pos = (ch2._duty_pos + 1) & 7
-            ch3 = self._ch3
-            if ch3._enabled:
-                ch3._freq_timer -= cycles
-                if ch3._freq_timer <= 0:
-                    while ch3._freq_timer <= 0:
-                        ch3._freq_timer += (2048 - ch3._period) * 2
-                        ch3._wave_pos = (ch3._wave_pos + 1) & 31
-                        byte_idx = ch3._wave_pos >> 1
-                        if ch3._wave_pos & 1:
-                            ch3._sample_buffer = ch3._wave_ram[byte_idx] & 0x0F
-                        else:
-                            ch3._sample_buffer = (ch3._wave_ram[byte_idx] >> 4) & 0x0F
-            ch4 = self._ch4
-            if ch4._enabled:
-                ch4._freq_timer -= cycles
-                if ch4._freq_timer <= 0:
-                    while ch4._freq_timer <= 0:
-                        divisor = _NOISE_DIVISOR_TABLE[ch4._divisor_code]
-                        period = divisor << ch4._clock_shift
-                        ch4._freq_timer += period if period else 1
-                        xor_bit = (ch4._lfsr & 1) ^ ((ch4._lfsr >> 1) & 1)
-                        ch4._lfsr = (ch4._lfsr >> 1) | (xor_bit << 14)
-                        if ch4._width_mode:
-                            ch4._lfsr = (ch4._lfsr & ~0x40) | (xor_bit << 6)
+        pending = self._pending_cycles + cycles
+        self._pending_cycles = pending
+        if pending >= self._cycles_to_event:
+            self._catch_up()
+
+    def _catch_up(self):
+        """Run the pending cycles, stopping at each frame sequencer step and sample."""
+        if not self._sample_events:
+            self._catch_up_fs_steps()
             return
-
-        # Slow path: event boundary crossed
-        remaining = cycles
+        remaining = self._pending_cycles
+        self._pending_cycles = 0
+        ch1 = self._ch1
+        ch2 = self._ch2
+        ch3 = self._ch3
+        ch4 = self._ch4
+        fs_counter = self._fs_counter
+        sample_counter = self._sample_counter
+        rate = self._counter_rate
         while remaining > 0:
-            cycles_to_fs = 8192 - self._fs_counter
+            cycles_to_fs = 8192 - fs_counter
             # Ceiling division: how many cycles until next sample
-            cycles_to_sample = (4194304 - self._sample_counter + 47999) // 48000
+            cycles_to_sample = (4194304 - sample_counter + rate - 1) // rate
             if cycles_to_sample < 1:
                 cycles_to_sample = 1
             step = min(remaining, cycles_to_fs, cycles_to_sample)
 
-            self._fs_counter += step
-            self._sample_counter += step * 48000
+            fs_counter += step
+            sample_counter += step * rate
             remaining -= step
 
-            self._ch1.tick(step)
-            self._ch2.tick(step)
-            self._ch3.tick(step)
-            self._ch4.tick(step)
+            ch1.tick(step)
+            ch2.tick(step)
+            ch3.tick(step)
+            ch4.tick(step)
+
+            if fs_counter >= 8192:
+                fs_counter = 0
+                self._clock_frame_sequencer()
+
+            if sample_counter >= 4194304:
+                sample_counter -= 4194304
+                self._ring.push(*self._mix_channels())
+        self._fs_counter = fs_counter
+        self._sample_counter = sample_counter
+        self._update_cycles_to_event()
 
+    def _catch_up_fs_steps(self):
+        """Run the pending cycles, stopping only at frame sequencer steps.
+
+        Samples come from the BlockSynth, or not at all with audio off.
+        """
+        remaining = self._pending_cycles
+        self._pending_cycles = 0
+        synth = self._synth
+        while remaining > 0:
+            step = min(remaining, 8192 - self._fs_counter)
+            if synth is not None:
+                synth.run(step, self._fs_counter + step >= 8192)
+            else:
+                self._ch1.tick(step)
+                self._ch2.tick(step)
+                self._ch3.tick(step)
+                self._ch4.tick(step)
+            self._fs_counter += step
+            remaining -= step
             if self._fs_counter >= 8192:
                 self._fs_counter = 0
                 self._clock_frame_sequencer()
-
-            if self._sample_counter >= 4194304:
-                self._sample_counter -= 4194304
-                self._sample_buffer.append(self._mix_channels())
+                if synth is not None and self._sample_counter >= 4194304:
+                    synth.run(0)  # The sample due on the step, mixed after it
+        self._update_cycles_to_event()
+
+    def _update_cycles_to_event(self):
+        """Recompute the cycles from the caught-up state to the next event."""
+        if not self._sample_events:
+            self._cycles_to_event = 8192 - self._fs_counter
+            return
+        rate = self._counter_rate
+        cycles_to_sample = (4194304 - self._sample_counter + rate - 1) // rate
+        self._cycles_to_event = min(8192 - self._fs_counter, max(cycles_to_sample, 1))
 
     def _clock_frame_sequencer(self):
         """Clock the frame sequencer step and dispatch to channel modulators."""
@@ -212,6 +269,8 @@ class APU:
 
     def read(self, address):
         """Read an APU register (0xFF10-0xFF3F)."""
+        if self._pending_cycles:
+            self._catch_up()
         # Wave RAM
         if 0xFF30 <= address <= 0xFF3F:
             return self._ch3.read_wave_ram(address)
@@ -264,6 +323,8 @@ class APU:
 
     def write(self, address, value):
         """Write an APU register (0xFF10-0xFF3F)."""
+        if self._pending_cycles:
+            self._catch_up()
         value = value & 0xFF
 
         # Wave RAM is always writable
@@ -279,6 +340,7 @@ class APU:
             elif not self._power and new_power:
                 self._fs_step = 0
                 self._fs_counter = 0
+                self._update_cycles_to_event()
             self._power = new_power
             return
 
@@ -318,6 +380,8 @@ class APU:
         self._nr51 = 0
 
     def save_state(self):
+        if self._pending_cycles:
+            self._catch_up()
         return {
             'ch1': self._ch1.save_state(),
             'ch2': self._ch2.save_state(),
@@ -346,14 +410,44 @@ class APU:
         self._sample_counter = state['sample_counter']
         self._hpf_capacitor_left = state['hpf_capacitor_left']
         self._hpf_capacitor_right = state['hpf_capacitor_right']
-        self._sample_buffer = []
+        self._ring.clear()
+        self._pending_cycles = 0
+        self._update_cycles_to_event()
+
+    def set_rate_adjustment(self, ratio):
+        """Produce samples `ratio` faster (negative: slower) than sample_rate.
+
+        Clamped to ±MAX_RATE_ADJUSTMENT. Only the number of samples per
+        emulated second changes, not how the channels sound or anything a
+        game can observe, so it is safe to call between any two ticks.
+        """
+        if self.sample_rate is None:
+            return
+        if self._pending_cycles:
+            self._catch_up()
+        ratio = max(-self.MAX_RATE_ADJUSTMENT, min(self.MAX_RATE_ADJUSTMENT, ratio))
+        self._counter_rate = round(self.sample_rate * (1.0 + ratio))
+        self._update_cycles_to_event()
+
+    @property
+    def effective_sample_rate(self):
+        """Samples produced per emulated second, after set_rate_adjustment()."""
+        return self._counter_rate
+
+    @property
+    def overflow_frames(self):
+        """Stereo frames dropped because the sample ring was full (not drained)."""
+        return self._ring.overflow_frames
 
     def drain_samples(self):
-        """Return pending samples and clear the buffer.
+        """Return pending samples and mark them drained.
 
-        Returns a list of (left, right) float tuples.
-        Called by the frontend to get audio data.
+        Returns a memoryview of interleaved int16 (left, right) values,
+        each sample clamped to [-1, 1] and scaled by 32767: ready for
+        pygame.mixer.Sound(buffer=...) or wave.writeframes(). The view
+        points into the sample ring without copying and stays valid until
+        the next drain_samples() call.
         """
-        samples = self._sample_buffer
-        self._sample_buffer = []
-        return samples
+        if self._pending_cycles:
+            self._catch_up()
+        return self._ring.drain()
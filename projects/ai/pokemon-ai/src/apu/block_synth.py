@@ -0,0 +1,191 @@
+"""
+Block synthesis for the APU, built on NumPy (optional).
+
+Without it the APU stops at every sample point (~every 87 cycles) and
+mixes one (left, right) pair in Python. With a BlockSynth the only events
+are frame sequencer steps and register accesses. Between two of them,
+every channel setting is fixed, so the samples of the whole stretch are
+computed as arrays:
+
+    reloads  = (sample cycles - freq timer) // timer period + 1
+    pulse    = DUTY_TABLE[duty][(duty pos + reloads) & 7] * volume
+    wave     = wave RAM nibbles[(wave pos + reloads) & 31] >> volume shift
+    noise    = ~LFSR cycle table[(LFSR index + reloads) % cycle length] & 1
+
+They are panned with NR51 and scaled with NR50 like _mix_channels. The
+high-pass filter's recurrence is solved in closed form with a cumulative
+sum, which matches the per-sample filter to within float rounding, and
+the block is clamped and written into the APU's SampleRing as int16.
+
+A sample point that falls exactly on a frame sequencer step is mixed after
+the step, as APU._catch_up does: run(cycles, fs_step=True) leaves it out
+and run(0) after _clock_frame_sequencer() mixes it.
+
+NumPy is optional: without it GameBoy(numpy_audio=True) falls back to
+per-sample mixing (see AVAILABLE).
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+from src.apu import noise_channel
+from src.apu.pulse_channel import PulseChannel
+from src.apu.wave_channel import WaveChannel
+
+AVAILABLE = np is not None
+
+
+class BlockSynth:
+    """Synthesizes an APU's samples one stretch of cycles at a time."""
+
+    def __init__(self, apu):
+        self._apu = apu
+        # The APU's sample ring as a writable (frames, 2) int16 array, sharing its memory
+        self._ring_frames = np.frombuffer(apu._ring.buffer, dtype=np.int16).reshape(-1, 2)
+        self._duty = np.array(PulseChannel.DUTY_TABLE, dtype=np.float64)
+        self._lfsr_states = {}  # bits -> LFSR cycle as an array
+        self._charge = None
+        self._powers = None
+
+    def run(self, cycles, fs_step=False):
+        """Advance the APU's channels by `cycles`, synthesizing the samples due.
+
+        The caller splits at frame sequencer steps and register accesses,
+        so no channel setting changes within `cycles`. With fs_step=True a
+        step follows: a sample due exactly at `cycles` is left pending (the
+        sample counter stays at or above 4194304) for run(0) after the step.
+        """
+        apu = self._apu
+        rate = apu._counter_rate
+        sample_counter = apu._sample_counter
+        total = sample_counter + cycles * rate
+        count = total // 4194304
+        if fs_step and count and (count * 4194304 - sample_counter + rate - 1) // rate == cycles:
+            count -= 1
+        if count:
+            # Cycles from now to each sample point, as in APU._catch_up
+            k = np.arange(1, count + 1, dtype=np.int64)
+            self._emit(self._mix((k * 4194304 - sample_counter + rate - 1) // rate))
+        apu._sample_counter = total - count * 4194304
+        if not cycles:
+            return
+        apu._ch1.tick(cycles)
+        apu._ch2.tick(cycles)
+        apu._ch3.tick(cycles)
+        apu._ch4.tick(cycles)
+
+    def _emit(self, samples):
+        """Clamp (samples, 2) floats to int16 and write them into the sample ring."""
+        start, count = self._apu._ring.reserve(len(samples))
+        if count:
+            start >>= 1
+            pcm = samples[:count].clip(-1.0, 1.0)
+            pcm *= 32767
+            # Assigning floats to int16 truncates toward zero, like int()
+            self._ring_frames[start:start + count] = pcm
+
+    # ------------------------------------------------------------------ #
+
+    def _mix(self, cycles):
+        apu = self._apu
+        nr51 = apu._nr51
+        left = np.zeros(len(cycles))
+        right = np.zeros(len(cycles))
+        # Same order of additions as _mix_channels, for the same rounding
+        for channel, dac, pan in ((apu._ch1, self._pulse, 0x11), (apu._ch2, self._pulse, 0x22),
+                                  (apu._ch3, self._wave, 0x44), (apu._ch4, self._noise, 0x88)):
+            if not nr51 & pan:
+                continue
+            d = dac(channel, cycles)
+            if nr51 & pan & 0xF0:
+                left += d
+            if nr51 & pan & 0x0F:
+                right += d
+
+        nr50 = apu._nr50
+        left *= (((nr50 >> 4) & 0x07) + 1) / 32.0
+        right *= ((nr50 & 0x07) + 1) / 32.0
+        return self._high_pass(np.column_stack((left, right)))
+
+    @staticmethod
+    def _reloads(channel, reload, cycles):
+        """Timer reloads of a channel `cycles` from now, as in its tick()."""
+        return np.maximum((cycles - channel._freq_timer) // reload + 1, 0)
+
+    def _pulse(self, channel, cycles):
+        """DAC output of a pulse channel at each sample point."""
+        if not channel._dac_enabled:
+            return 0.0
+        if not channel._enabled:
+            return -1.0
+        reloads = self._reloads(channel, (2048 - channel._period) * 4, cycles)
+        duty = self._duty[(channel._nrx1 >> 6) & 0x03]
+        return duty[(channel._duty_pos + reloads) & 7] * channel._volume / 7.5 - 1.0
+
+    def _wave(self, channel, cycles):
+        """DAC output of the wave channel at each sample point."""
+        if not channel._dac_enabled:
+            return 0.0
+        if not channel._enabled:
+            return -1.0
+        reloads = self._reloads(channel, (2048 - channel._period) * 2, cycles)
+        ram = np.frombuffer(bytes(channel._wave_ram), dtype=np.uint8)
+        nibbles = np.empty(32, dtype=np.int64)
+        nibbles[0::2] = ram >> 4
+        nibbles[1::2] = ram & 0x0F
+        samples = nibbles[(channel._wave_pos + reloads) & 31]
+        # Before the first reload the channel still plays its sample buffer
+        samples[reloads == 0] = channel._sample_buffer
+        shift = WaveChannel.VOLUME_SHIFT[(channel._nr32 >> 5) & 0x03]
+        return (samples >> shift) / 7.5 - 1.0
+
+    def _noise(self, channel, cycles):
+        """DAC output of the noise channel at each sample point."""
+        if not channel._dac_enabled:
+            return 0.0
+        if not channel._enabled:
+            return -1.0
+        reloads = self._reloads(channel, channel._get_timer_period(), cycles)
+        # Bit 0 only depends on the low 7 bits in 7-bit mode
+        bits = 7 if channel._width_mode else 15
+        lfsr = channel._lfsr & ((1 << bits) - 1)
+        if lfsr == 0:
+            bit0 = np.zeros(len(cycles), dtype=np.int64)
+        else:
+            states, positions = self._lfsr_cycle(bits)
+            bit0 = states[(positions[lfsr] + reloads) % len(states)] & 1
+        return ((bit0 ^ 1) * channel._volume) / 7.5 - 1.0
+
+    def _lfsr_cycle(self, bits):
+        cached = self._lfsr_states.get(bits)
+        if cached is None:
+            states, positions = noise_channel._lfsr_cycle(bits)
+            cached = self._lfsr_states[bits] = (np.array(states, dtype=np.int64), positions)
+        return cached
+
+    def _high_pass(self, x):
+        """Apply the APU's high-pass filter to (samples, 2) input, updating its state.
+
+        Per sample: out = in - cap, then cap = in - out * c, i.e.
+        cap[n+1] = c * cap[n] + (1 - c) * in[n], whose solution is
+        cap[n] = c**n * (cap[0] + (1 - c) * sum(in[j] / c**(j+1), j < n)).
+        """
+        apu = self._apu
+        count = len(x)
+        charge = apu._hpf_charge_factor
+        if self._charge != charge or len(self._powers) <= count:
+            self._charge = charge
+            self._powers = charge ** np.arange(max(count + 1, 128), dtype=np.float64)
+        powers = self._powers[:count + 1, None]
+        weighted = x * ((1.0 - charge) / powers[1:])
+        sums = np.cumsum(weighted, axis=0)
+        cap0 = np.array([apu._hpf_capacitor_left, apu._hpf_capacitor_right])
+        caps = np.empty_like(x)
+        caps[0] = cap0
+        caps[1:] = powers[1:count] * (cap0 + sums[:-1])
+        last = powers[count] * (cap0 + sums[-1])
+        apu._hpf_capacitor_left = float(last[0])
+        apu._hpf_capacitor_right = float(last[1])
+        return x - caps
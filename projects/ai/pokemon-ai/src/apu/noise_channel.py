@@ -1,3 +1,71 @@
+import functools
+from array import array
+
+# Advancing the LFSR by fewer steps than this is cheaper in a loop
+_LFSR_JUMP_MIN_STEPS = 16
+
+
+def _lfsr_step(lfsr, width_mode):
+    """Clock the LFSR once."""
+    xor_bit = (lfsr & 1) ^ ((lfsr >> 1) & 1)
+    lfsr = (lfsr >> 1) | (xor_bit << 14)  # Set bit 14
+    if width_mode:
+        # 7-bit mode: also set bit 6
+        lfsr = (lfsr & ~0x40) | (xor_bit << 6)
+    return lfsr
+
+
+@functools.lru_cache(maxsize=None)
+def _lfsr_cycle(bits):
+    """Return (states, positions) of the maximal-length cycle of a bits-wide LFSR.
+
+    states lists every non-zero state in clocking order; positions maps a
+    state back to its index. Zero is the only state off the cycle (and
+    clocks to itself).
+    """
+    mask = (1 << bits) - 1
+    states = array('H')
+    state = mask
+    while True:
+        states.append(state)
+        xor_bit = (state & 1) ^ ((state >> 1) & 1)
+        state = (state >> 1) | (xor_bit << (bits - 1))
+        if state == mask:
+            break
+    positions = array('l', [0]) * (mask + 1)
+    for index, state in enumerate(states):
+        positions[state] = index
+    return states, positions
+
+
+def lfsr_advance(lfsr, steps, width_mode):
+    """Return the LFSR after `steps` clocks, in O(1) for large step counts.
+
+    15-bit mode is a jump along the 32,767-state cycle. In 7-bit mode bits
+    0-6 run their own 127-state cycle, and after 8 or more clocks every
+    other bit is a copy of a recent feedback bit: bits 8-14 repeat bits
+    0-6, and bit 7 holds bit 0 of the state one clock earlier.
+    """
+    if steps < _LFSR_JUMP_MIN_STEPS:
+        for _ in range(steps):
+            lfsr = _lfsr_step(lfsr, width_mode)
+        return lfsr
+    if not width_mode:
+        lfsr &= 0x7FFF
+        if lfsr == 0:
+            return 0
+        states, positions = _lfsr_cycle(15)
+        return states[(positions[lfsr] + steps) % 32767]
+    low = lfsr & 0x7F
+    if low == 0:
+        return 0
+    states, positions = _lfsr_cycle(7)
+    index = positions[low] + steps
+    low = states[index % 127]
+    previous = states[(index - 1) % 127]
+    return (low << 8) | ((previous & 1) << 7) | low
+
+
 class NoiseChannel:
     """Noise channel (CH4) with linear feedback shift register.
 
@@ -39,19 +107,20 @@ class NoiseChannel:
         self._env_direction = 0  # +1 = increase, -1 = decrease
 
     def tick(self, cycles):
-        """Advance the frequency timer by the given number of T-cycles."""
+        """Advance the frequency timer by the given number of T-cycles.
+
+        The LFSR clocks once per timer reload; the reloads are counted with
+        one integer division and the LFSR jumps ahead with lfsr_advance().
+        """
         if not self._enabled:
             return
-        self._freq_timer -= cycles
-        while self._freq_timer <= 0:
-            self._freq_timer += self._get_timer_period()
-            # Clock the LFSR
-            xor_bit = (self._lfsr & 1) ^ ((self._lfsr >> 1) & 1)
-            self._lfsr >>= 1
-            self._lfsr |= (xor_bit << 14)  # Set bit 14
-            if self._width_mode:
-                # 7-bit mode: also set bit 6
-                self._lfsr = (self._lfsr & ~0x40) | (xor_bit << 6)
+        timer = self._freq_timer - cycles
+        if timer <= 0:
+            reload = self._get_timer_period()
+            steps = -timer // reload + 1
+            timer += steps * reload
+            self._lfsr = lfsr_advance(self._lfsr, steps, self._width_mode)
+        self._freq_timer = timer
 
     def _get_timer_period(self):
         """Calculate the timer period from clock shift and divisor code."""
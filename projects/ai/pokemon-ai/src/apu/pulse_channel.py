@@ -52,13 +52,21 @@ class PulseChannel:
         self._sweep_negate_used = False
 
     def tick(self, cycles):
-        """Advance the frequency timer by the given number of T-cycles."""
+        """Advance the frequency timer by the given number of T-cycles.
+
+        Each time the timer runs out it reloads with (2048 - period) * 4 and
+        the duty position steps once; the number of reloads is computed with
+        one integer division instead of a loop.
+        """
         if not self._enabled:
             return
-        self._freq_timer -= cycles
-        while self._freq_timer <= 0:
-            self._freq_timer += (2048 - self._period) * 4
-            self._duty_pos = (self._duty_pos + 1) & 7
+        timer = self._freq_timer - cycles
+        if timer <= 0:
+            reload = (2048 - self._period) * 4
+            steps = -timer // reload + 1
+            timer += steps * reload
+            self._duty_pos = (self._duty_pos + steps) & 7
+        self._freq_timer = timer
 
     def clock_length(self):
         """Clock the length counter (called at 256 Hz by frame sequencer)."""
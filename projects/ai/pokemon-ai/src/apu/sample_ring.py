@@ -0,0 +1,116 @@
+"""
+Preallocated int16 ring for the APU's stereo output.
+
+Samples are clamped to [-1, 1], scaled by 32767 and stored as interleaved
+(left, right) values in one array('h') allocated up front, so producing a
+sample never allocates. Two cursors index into it:
+
+    read    first value not yet drained
+    write   where the next frame goes
+
+drain() returns a memoryview of [read, write) and moves read up to write:
+no copy is made, and the view can go straight to
+pygame.mixer.Sound(buffer=...) or wave.writeframes(). When the write
+cursor reaches the end, the undrained values are moved back to the start,
+but never over the values the last drain() returned: a drained view stays
+valid until the next drain() (or clear()).
+
+Undrained frames and the last drained ones share the ring. When they fill
+it (a consumer that drains rarely, or never, as in a headless run with no
+audio) further frames are dropped and counted in overflow_frames instead
+of growing a buffer without bound.
+
+Values are in native byte order, i.e. little-endian on every platform the
+frontend targets.
+"""
+
+from array import array
+
+
+class SampleRing:
+    """Fixed-size ring of interleaved int16 stereo frames."""
+
+    def __init__(self, frames=48000):
+        self.buffer = array('h', bytes(frames * 4))
+        self._view = memoryview(self.buffer)
+        self._end = frames * 2
+        self._limit = self._end  # Writes stop here: the end, or the last drained view
+        self._read = 0
+        self._write = 0
+        self._drained = 0  # Start of the values the last drain() returned; they end at read
+        self.overflow_frames = 0
+
+    def __len__(self):
+        """Number of undrained frames."""
+        return (self._write - self._read) >> 1
+
+    def push(self, left, right):
+        """Clamp and append one (left, right) float frame."""
+        write = self._write
+        if write == self._limit:
+            write = self._make_room()
+            if write == self._limit:
+                self.overflow_frames += 1
+                return
+        # Comparisons rather than max()/min() calls: this runs ~48,000 times a second
+        if left > 1.0:
+            left = 1.0
+        elif left < -1.0:
+            left = -1.0
+        if right > 1.0:
+            right = 1.0
+        elif right < -1.0:
+            right = -1.0
+        buffer = self.buffer
+        buffer[write] = int(left * 32767)
+        buffer[write + 1] = int(right * 32767)
+        self._write = write + 2
+
+    def reserve(self, frames):
+        """Claim room for up to `frames` frames; return (first value index, frames claimed).
+
+        The caller writes the claimed frames into buffer starting at the
+        returned index. Frames that do not fit are counted as overflow.
+        """
+        write = self._write
+        if write + frames * 2 > self._limit:
+            write = self._make_room()
+        granted = min(frames, (self._limit - write) >> 1)
+        self.overflow_frames += frames - granted
+        self._write = write + granted * 2
+        return write, granted
+
+    def drain(self):
+        """Return the undrained frames as a memoryview of int16 values and mark them read."""
+        read = self._read
+        write = self._write
+        self._drained = read
+        self._read = write
+        self._limit = self._end
+        return self._view[read:write]
+
+    def clear(self):
+        """Discard undrained frames and release the last drained view."""
+        self._read = self._write = self._drained = 0
+        self._limit = self._end
+
+    def _make_room(self):
+        """Move the undrained values to the start of the buffer; return the new write cursor.
+
+        Below a last drained view, writes then stop at the view until the
+        next drain(). The values stay put if that leaves less room.
+        """
+        read = self._read
+        if not read:
+            return self._write
+        write = self._write
+        pending = write - read
+        drained = self._drained
+        limit = self._end if drained == read else drained
+        if limit - pending > self._limit - write:
+            view = self._view
+            view[:pending] = view[read:write]
+            self._limit = limit
+            self._read = self._drained = 0
+            self._write = write = pending
+        return write
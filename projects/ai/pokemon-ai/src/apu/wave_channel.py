@@ -34,19 +34,26 @@ class WaveChannel:
         self._length_enabled = False
 
     def tick(self, cycles):
-        """Advance the frequency timer by the given number of T-cycles."""
+        """Advance the frequency timer by the given number of T-cycles.
+
+        The position steps once per timer reload ((2048 - period) * 2
+        cycles), counted with one integer division. Only the sample at the
+        final position is read: wave RAM cannot change in between, since
+        the APU catches up before every register or wave RAM access.
+        """
         if not self._enabled:
             return
-        self._freq_timer -= cycles
-        while self._freq_timer <= 0:
-            self._freq_timer += (2048 - self._period) * 2
-            self._wave_pos = (self._wave_pos + 1) & 31
+        timer = self._freq_timer - cycles
+        if timer <= 0:
+            reload = (2048 - self._period) * 2
+            steps = -timer // reload + 1
+            timer += steps * reload
+            wave_pos = (self._wave_pos + steps) & 31
+            self._wave_pos = wave_pos
             # Read sample from wave RAM
-            byte_idx = self._wave_pos >> 1
-            if self._wave_pos & 1:
-                self._sample_buffer = self._wave_ram[byte_idx] & 0x0F
-            else:
-                self._sample_buffer = (self._wave_ram[byte_idx] >> 4) & 0x0F
+            byte = self._wave_ram[wave_pos >> 1]
+            self._sample_buffer = byte & 0x0F if wave_pos & 1 else (byte >> 4) & 0x0F
+        self._freq_timer = timer
 
     def clock_length(self):
         """Clock the length counter (called at 256 Hz by frame sequencer)."""
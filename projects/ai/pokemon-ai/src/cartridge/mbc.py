@@ -1,17 +1,55 @@
 import time
 
+ROM_BANK_SIZE = 0x4000
+RAM_BANK_SIZE = 0x2000
+
+# Shared view for ROM banks past the end of the ROM: open bus reads 0xFF
+_OPEN_BUS_BANK = memoryview(b"\xff" * ROM_BANK_SIZE)
+
+
+def rom_bank_view(rom_data, bank):
+    """Return a read view of 16 KiB ROM bank `bank`.
+
+    Zero-copy when the whole bank is present. Banks past the end of the ROM
+    share one 0xFF view; a bank cut short by the end of the file is padded
+    with 0xFF.
+    """
+    start = bank * ROM_BANK_SIZE
+    end = start + ROM_BANK_SIZE
+    if end <= len(rom_data):
+        return memoryview(rom_data)[start:end]
+    if start >= len(rom_data):
+        return _OPEN_BUS_BANK
+    return memoryview(bytes(rom_data[start:end]).ljust(ROM_BANK_SIZE, b"\xff"))
+
+
+def ram_bank_view(ram, bank):
+    """Return a writable view of 8 KiB RAM bank `bank`, or None if absent."""
+    if ram is None:
+        return None
+    start = bank * RAM_BANK_SIZE
+    if start + RAM_BANK_SIZE > len(ram):
+        return None
+    return memoryview(ram)[start:start + RAM_BANK_SIZE]
+
 
 class NoMBC:
     """ROM ONLY cartridge (type 0x00). No banking, no RAM."""
 
     def __init__(self, rom_data):
         self._rom_data = rom_data
+        # Fixed mapping, published like the banked MBCs' for the memory bus
+        self._rom_bank = 1
+        self._rom_view = rom_bank_view(rom_data, 1)
+        self._ram_view = None
 
     def read(self, address):
-        if address <= 0x7FFF:
+        if address <= 0x3FFF:
             if address < len(self._rom_data):
                 return self._rom_data[address]
             return 0xFF
+        if address <= 0x7FFF:
+            return self._rom_view[address - 0x4000]
         # 0xA000-0xBFFF: no external RAM
         return 0xFF
 
@@ -35,42 +73,52 @@ class MBC1:
         self._rom_bank = 1
         self._ram_bank = 0
         self._ram_enabled = False
+        # Views of the active banks, refreshed on bank switches: _rom_view
+        # backs 0x4000-0x7FFF, _ram_view 0xA000-0xBFFF (None when disabled)
+        self._rom_view = rom_bank_view(rom_data, 1)
+        self._ram_view = None
         self._banking_mode = 0
 
     def read(self, address):
         if address <= 0x3FFF:
             return self._rom_data[address]
         if address <= 0x7FFF:
-            offset = (self._rom_bank * 0x4000) + (address - 0x4000)
-            if offset < len(self._rom_data):
-                return self._rom_data[offset]
-            return 0xFF
+            return self._rom_view[address - 0x4000]
         # 0xA000-0xBFFF: external RAM
-        if self._ram is not None and self._ram_enabled:
-            ram_offset = (self._ram_bank * 0x2000) + (address - 0xA000)
-            if ram_offset < len(self._ram):
-                return self._ram[ram_offset]
+        ram_view = self._ram_view
+        if ram_view is not None:
+            return ram_view[address - 0xA000]
         return 0xFF
 
     def write(self, address, value):
         value = value & 0xFF
         if address <= 0x1FFF:
             self._ram_enabled = (value & 0x0F) == 0x0A
+            self._map_ram()
         elif address <= 0x3FFF:
             bank = value & 0x1F
             if bank == 0:
                 bank = 1
             self._rom_bank = bank % self._num_rom_banks
+            self._map_rom()
         elif address <= 0x5FFF:
             self._ram_bank = value & 0x03
+            self._map_ram()
         elif address <= 0x7FFF:
             self._banking_mode = value & 0x01
         elif 0xA000 <= address <= 0xBFFF:
-            if self._ram is not None and self._ram_enabled:
-                ram_offset = (self._ram_bank * 0x2000) + (address - 0xA000)
-                if ram_offset < len(self._ram):
-                    self._ram[ram_offset] = value
+            ram_view = self._ram_view
+            if ram_view is not None:
+                ram_view[address - 0xA000] = value
 
+    def _map_rom(self):
+        self._rom_view = rom_bank_view(self._rom_data, self._rom_bank)
+
+    def _map_ram(self):
+        if self._ram_enabled:
+            self._ram_view = ram_bank_view(self._ram, self._ram_bank)
+        else:
+            self._ram_view = None
 
     def save_state(self):
         state = {
@@ -90,6 +138,8 @@ class MBC1:
         self._banking_mode = state['banking_mode']
         if 'ram' in state and self._ram is not None:
             self._ram[:] = bytearray(state['ram'])
+        self._map_rom()
+        self._map_ram()
 
 
 class MBC3:
@@ -102,6 +152,10 @@ class MBC3:
         self._rom_bank = 1
         self._ram_bank = 0
         self._ram_enabled = False
+        # Views of the active banks, refreshed on bank switches: _rom_view
+        # backs 0x4000-0x7FFF, _ram_view 0xA000-0xBFFF (None when disabled)
+        self._rom_view = rom_bank_view(rom_data, 1)
+        self._ram_view = None
 
         # RTC state
         self._has_rtc = has_rtc
@@ -121,34 +175,29 @@ class MBC3:
         if address <= 0x3FFF:
             return self._rom_data[address]
         if address <= 0x7FFF:
-            offset = (self._rom_bank * 0x4000) + (address - 0x4000)
-            if offset < len(self._rom_data):
-                return self._rom_data[offset]
-            return 0xFF
+            return self._rom_view[address - 0x4000]
         # 0xA000-0xBFFF: RAM bank or RTC register
-        if not self._ram_enabled:
-            return 0xFF
-        if 0x08 <= self._ram_bank <= 0x0C:
-            if self._has_rtc:
-                return self._rtc_registers[self._ram_bank - 0x08]
-            return 0xFF
-        if self._ram is not None and self._ram_bank <= 0x03:
-            ram_offset = (self._ram_bank * 0x2000) + (address - 0xA000)
-            if ram_offset < len(self._ram):
-                return self._ram[ram_offset]
+        ram_view = self._ram_view
+        if ram_view is not None:
+            return ram_view[address - 0xA000]
+        if self._ram_enabled and 0x08 <= self._ram_bank <= 0x0C and self._has_rtc:
+            return self._rtc_registers[self._ram_bank - 0x08]
         return 0xFF
 
     def write(self, address, value):
         value = value & 0xFF
         if address <= 0x1FFF:
             self._ram_enabled = (value & 0x0F) == 0x0A
+            self._map_ram()
         elif address <= 0x3FFF:
             bank = value & 0x7F  # 7-bit bank number
             if bank == 0:
                 bank = 1
             self._rom_bank = bank % self._num_rom_banks
+            self._map_rom()
         elif address <= 0x5FFF:
             self._ram_bank = value  # 0x00-0x03 for RAM, 0x08-0x0C for RTC
+            self._map_ram()
         elif address <= 0x7FFF:
             # RTC latch: write 0x00 then 0x01
             if self._has_rtc:
@@ -156,15 +205,21 @@ class MBC3:
                     self._latch_rtc()
                 self._rtc_latch_state = value
         elif 0xA000 <= address <= 0xBFFF:
-            if not self._ram_enabled:
-                return
-            if 0x08 <= self._ram_bank <= 0x0C:
-                if self._has_rtc:
-                    self._write_rtc_register(self._ram_bank, value)
-            elif self._ram is not None and self._ram_bank <= 0x03:
-                ram_offset = (self._ram_bank * 0x2000) + (address - 0xA000)
-                if ram_offset < len(self._ram):
-                    self._ram[ram_offset] = value
+            ram_view = self._ram_view
+            if ram_view is not None:
+                ram_view[address - 0xA000] = value
+            elif self._ram_enabled and 0x08 <= self._ram_bank <= 0x0C and self._has_rtc:
+                self._write_rtc_register(self._ram_bank, value)
+
+    def _map_rom(self):
+        self._rom_view = rom_bank_view(self._rom_data, self._rom_bank)
+
+    def _map_ram(self):
+        # Banks 0x08-0x0C select RTC registers, which have no backing view
+        if self._ram_enabled and self._ram_bank <= 0x03:
+            self._ram_view = ram_bank_view(self._ram, self._ram_bank)
+        else:
+            self._ram_view = None
 
     def _latch_rtc(self):
         """Freeze current time into RTC registers."""
@@ -249,6 +304,8 @@ class MBC3:
             self._rtc_base_timestamp = None
         if 'ram' in state and self._ram is not None:
             self._ram[:] = bytearray(state['ram'])
+        self._map_rom()
+        self._map_ram()
 
 
 class MBC5:
@@ -261,6 +318,10 @@ class MBC5:
         self._rom_bank = 1
         self._ram_bank = 0
         self._ram_enabled = False
+        # Views of the active banks, refreshed on bank switches: _rom_view
+        # backs 0x4000-0x7FFF, _ram_view 0xA000-0xBFFF (None when disabled)
+        self._rom_view = rom_bank_view(rom_data, 1)
+        self._ram_view = None
         self._has_rumble = has_rumble
         self._rumble = False
 
@@ -268,40 +329,48 @@ class MBC5:
         if address <= 0x3FFF:
             return self._rom_data[address]
         if address <= 0x7FFF:
-            offset = (self._rom_bank * 0x4000) + (address - 0x4000)
-            if offset < len(self._rom_data):
-                return self._rom_data[offset]
-            return 0xFF
+            return self._rom_view[address - 0x4000]
         # 0xA000-0xBFFF: external RAM
-        if self._ram is not None and self._ram_enabled:
-            ram_offset = (self._ram_bank * 0x2000) + (address - 0xA000)
-            if ram_offset < len(self._ram):
-                return self._ram[ram_offset]
+        ram_view = self._ram_view
+        if ram_view is not None:
+            return ram_view[address - 0xA000]
         return 0xFF
 
     def write(self, address, value):
         value = value & 0xFF
         if address <= 0x1FFF:
             self._ram_enabled = (value & 0x0F) == 0x0A
+            self._map_ram()
         elif address <= 0x2FFF:
             # Lower 8 bits of ROM bank number
             self._rom_bank = (self._rom_bank & 0x100) | value
             self._rom_bank %= self._num_rom_banks
+            self._map_rom()
         elif address <= 0x3FFF:
             # Bit 8 (9th bit) of ROM bank number
             self._rom_bank = ((value & 0x01) << 8) | (self._rom_bank & 0xFF)
             self._rom_bank %= self._num_rom_banks
+            self._map_rom()
         elif address <= 0x5FFF:
             if self._has_rumble:
                 self._ram_bank = value & 0x07
                 self._rumble = bool(value & 0x08)
             else:
                 self._ram_bank = value & 0x0F
+            self._map_ram()
         elif 0xA000 <= address <= 0xBFFF:
-            if self._ram is not None and self._ram_enabled:
-                ram_offset = (self._ram_bank * 0x2000) + (address - 0xA000)
-                if ram_offset < len(self._ram):
-                    self._ram[ram_offset] = value
+            ram_view = self._ram_view
+            if ram_view is not None:
+                ram_view[address - 0xA000] = value
+
+    def _map_rom(self):
+        self._rom_view = rom_bank_view(self._rom_data, self._rom_bank)
+
+    def _map_ram(self):
+        if self._ram_enabled:
+            self._ram_view = ram_bank_view(self._ram, self._ram_bank)
+        else:
+            self._ram_view = None
 
     def save_state(self):
         state = {
@@ -321,3 +390,5 @@ class MBC5:
         self._rumble = state['rumble']
         if 'ram' in state and self._ram is not None:
             self._ram[:] = bytearray(state['ram'])
+        self._map_rom()
+        self._map_ram()
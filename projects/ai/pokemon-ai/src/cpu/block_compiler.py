@@ -0,0 +1,170 @@
+"""
+Basic-block compiler for the CPU interpreter.
+
+The interpreter loop in CPU.run() pays for the same work on every
+instruction: read the opcode through Memory.get_value(), look up the
+dispatch entry, fetch the immediate bytes, store them into the shared
+operand list and only then call the handler. For code that lives in ROM
+none of that changes between executions, so this module decodes a
+straight-line run of instructions once and turns it into a single Python
+function (via exec) that calls the run loop's handlers back to back with
+the immediates folded in as literals.
+
+Compiled blocks keep the interpreter's exact semantics:
+  - components (timer, PPU, APU) are still ticked after every instruction
+    with that instruction's cycle count, so every memory-mapped read sees the
+    same state it would under the interpreter;
+  - after every instruction the block returns early if the cycle budget is
+    used up or if IME is set and an interrupt became pending, so the caller
+    services interrupts at the same instruction boundary;
+  - after every instruction that can write memory the block returns early if
+    Memory flagged the write as code-relevant (an MBC bank switch, or a
+    write landing on a RAM page that holds compiled code).
+
+Blocks are keyed by (ROM bank, PC) and never cross a region boundary
+(0x0000-0x3FFF, 0x4000-0x7FFF, WRAM, HRAM). A block ends after the first
+control-flow instruction (JP/JR/CALL/RET/RETI/RST) and stops *before*
+instructions whose side effects the run loop has to see (HALT, STOP, EI,
+DI, unimplemented opcodes); those are executed by the interpreter.
+"""
+
+# Instructions that always end a block (included as the last instruction)
+_BLOCK_TERMINATORS = frozenset(("JP", "JR", "CALL", "RET", "RETI", "RST"))
+
+# Instructions the interpreter must execute itself (HALT/STOP change the run
+# state, EI/DI interact with the delayed IME promotion in the run loop)
+_INTERPRET_ONLY = frozenset(("HALT", "STOP", "EI", "DI"))
+
+# Instructions that write memory without naming a memory destination operand
+_IMPLICIT_WRITES = frozenset(("PUSH", "CALL", "RST"))
+
+# Upper bound on instructions per block — keeps compile cost and code size small
+MAX_BLOCK_INSTRUCTIONS = 32
+
+
+def code_region(memory, pc):
+    """Return the (start, end) address range a block at pc may span.
+
+    Returns None if code at pc should not be compiled (VRAM, external RAM,
+    echo RAM, OAM, I/O). With no cartridge loaded, 0x0000-0x7FFF is plain
+    writable memory and is treated as one RAM region.
+    """
+    if pc < 0x8000:
+        if memory._rom_data is None:
+            return (0x0000, 0x8000)
+        if pc < 0x4000:
+            return (0x0000, 0x4000)
+        return (0x4000, 0x8000)
+    if 0xC000 <= pc < 0xE000:
+        return (0xC000, 0xE000)
+    if 0xFF80 <= pc < 0xFFFF:
+        return (0xFF80, 0xFFFF)
+    return None
+
+
+def _writes_memory(opcode_info, is_cb):
+    """Return True if the instruction can write to the memory bus."""
+    mnemonic = opcode_info["mnemonic"]
+    if mnemonic in _IMPLICIT_WRITES:
+        return True
+    operands = opcode_info["operands"]
+    if not operands:
+        return False
+    if is_cb:
+        return mnemonic != "BIT" and not operands[-1]["immediate"]
+    return not operands[0]["immediate"]
+
+
+def compile_block(cpu, pc):
+    """Decode and compile the basic block starting at pc.
+
+    Returns (block_fn, end) where block_fn has the signature
+    block_fn(cpu, registers, memory, mem, budget, timer_tick, ppu_tick,
+    apu_tick) -> cycles and end is the address just past the last decoded
+    instruction. block_fn is None if the first instruction at pc cannot be
+    compiled.
+    """
+    memory = cpu.memory
+    region = code_region(memory, pc)
+    if region is None:
+        return None, pc
+    region_end = region[1]
+    memory_get = memory.get_value
+    dispatch = cpu._dispatch
+    cb_dispatch = cpu._cb_dispatch
+    unprefixed_info = cpu._unprefixed_info
+    cb_info = cpu._cbprefixed_info
+
+    namespace = {}
+    lines = [
+        "def block(cpu, registers, memory, mem, budget, timer_tick, ppu_tick, apu_tick):",
+        "    ime = cpu.interrupts.ime",
+        "    cycles = 0",
+    ]
+    count = 0
+    addr = pc
+
+    while count < MAX_BLOCK_INSTRUCTIONS:
+        opcode = memory_get(addr)
+        is_cb = opcode == 0xCB
+        if is_cb:
+            if addr + 1 >= region_end:
+                break
+            cb_opcode = memory_get(addr + 1)
+            entry = cb_dispatch[cb_opcode]
+            opcode_info = cb_info[cb_opcode]
+            length = 2
+        else:
+            entry = dispatch[opcode]
+            opcode_info = unprefixed_info[opcode]
+            length = 1
+        if entry is None:
+            break
+
+        fetch_size, handler = entry
+        mnemonic = opcode_info["mnemonic"]
+        if mnemonic in _INTERPRET_ONLY or mnemonic.startswith("ILLEGAL"):
+            break
+        length += fetch_size
+        if addr + length > region_end:
+            break
+
+        # Fold the immediate into the call as a literal
+        if fetch_size == 1:
+            imm = memory_get(addr + length - 1)
+        elif fetch_size == 2:
+            imm = memory_get(addr + 1) | (memory_get(addr + 2) << 8)
+        else:
+            imm = 0
+
+        namespace[f"H{count}"] = handler
+        next_pc = (addr + length) & 0xFFFF
+        lines += [
+            f"    # {addr:#06x} {mnemonic}",
+            f"    registers.PC = {next_pc:#06x}",
+            f"    c = H{count}(cpu, {imm:#x})",
+            "    cycles += c",
+            "    if timer_tick:",
+            "        timer_tick(c)",
+            "    if ppu_tick:",
+            "        ppu_tick(c)",
+            "    if apu_tick:",
+            "        apu_tick(c)",
+        ]
+        count += 1
+        addr += length
+
+        if mnemonic in _BLOCK_TERMINATORS or addr >= region_end:
+            break
+        lines.append("    if cycles >= budget or (ime and mem[0xFF0F] & mem[0xFFFF] & 0x1F):")
+        lines.append("        return cycles")
+        if _writes_memory(opcode_info, is_cb):
+            lines.append("    if memory._code_dirty:")
+            lines.append("        return cycles")
+
+    if count == 0:
+        return None, pc
+
+    lines.append("    return cycles")
+    exec(compile("\n".join(lines), f"<block {pc:#06x}>", "exec"), namespace)
+    return namespace["block"], addr
@@ -1,13 +1,4 @@
-class Registers:
-    AF: int = 0
-    BC: int = 0
-    DE: int = 0
-    HL: int = 0
-    SP: int = 0
-    PC: int = 0
-
-
-import json
+from src.cpu.registers import Registers, LazyFlagRegisters
 from src.cpu.handlers.ld_handlers import (
     ld_bc_n16,
     ld_bc_a,
@@ -232,6 +223,11 @@ from src.cpu.handlers.stack_handlers import (
     pop_hl,
 )
 from src.cpu.handlers.cb_handlers import build_cb_dispatch
+from src.cpu.handlers.codegen import build_specialized_handlers
+from src.cpu.block_compiler import compile_block
+from src.cpu.idle_loop import JP_HL, analyze_idle_loop
+from src.cpu.opcode_tables import get_opcode_tables
+from src.scheduler.scheduler import NEVER
 from src.cpu.handlers.jump_handlers import (
     jp_nn,
     jp_nz_nn,
@@ -351,41 +347,409 @@ class Interrupts:
         self._cpu.memory.memory[0xFFFF] = value & 0xFF
 
 
+# Hand-written (reference) handler for each implemented unprefixed opcode.
+# Shared by every CPU: the table never changes.
+_OPCODE_HANDLERS = {
+    0x00: nop,
+    0x10: stop,
+    0x01: ld_bc_n16,
+    0x02: ld_bc_a,
+    0x03: inc_bc,
+    0x04: inc_b,
+    0x05: dec_b,
+    0x08: ld_a16_sp,
+    0x09: add_hl_bc,
+    0x0A: ld_a_bc,
+    0x0B: dec_bc,
+    0x0C: inc_c,
+    0x0D: dec_c,
+    0x12: ld_de_a,
+    0x13: inc_de,
+    0x14: inc_d,
+    0x15: dec_d,
+    0x19: add_hl_de,
+    0x1A: ld_a_de,
+    0x1B: dec_de,
+    0x1C: inc_e,
+    0x1D: dec_e,
+    0x21: ld_hl_n16,
+    0x22: ld_hli_a,
+    0x23: inc_hl,
+    0x24: inc_h,
+    0x25: dec_h,
+    0x29: add_hl_hl,
+    0x2A: ld_a_hli,
+    0x2B: dec_hl,
+    0x2C: inc_l,
+    0x2D: dec_l,
+    0x31: ld_sp_n16,
+    0x32: ld_hld_a,
+    0x33: inc_sp,
+    0x34: inc_hl_indirect,
+    0x35: dec_hl_indirect,
+    0x39: add_hl_sp,
+    0x3A: ld_a_hld,
+    0x3B: dec_sp,
+    0x3C: inc_a,
+    0x3D: dec_a,
+    0x07: rlc_a,
+    0x0F: rrc_a,
+    0x17: rl_a,
+    0x1F: rr_a,
+    0x06: ld_b_n8,
+    0x0E: ld_c_n8,
+    0x11: ld_de_n16,
+    0x16: ld_d_n8,
+    0x1E: ld_e_n8,
+    0x26: ld_h_n8,
+    0x2E: ld_l_n8,
+    0x2F: cpl,
+    0x36: ld_hl_n8,
+    0x37: scf,
+    0x3F: ccf,
+    0x3E: ld_a_n8,
+    # Interrupt control instructions
+    0xF3: di,
+    0xFB: ei,
+    0x76: halt,
+    # LD r1, r2 instructions (register to register transfers)
+    0x40: ld_b_b,
+    0x41: ld_b_c,
+    0x42: ld_b_d,
+    0x43: ld_b_e,
+    0x44: ld_b_h,
+    0x45: ld_b_l,
+    0x46: ld_b_hl,
+    0x47: ld_b_a,
+    0x48: ld_c_b,
+    0x49: ld_c_c,
+    0x4A: ld_c_d,
+    0x4B: ld_c_e,
+    0x4C: ld_c_h,
+    0x4D: ld_c_l,
+    0x4E: ld_c_hl,
+    0x4F: ld_c_a,
+    0x50: ld_d_b,
+    0x51: ld_d_c,
+    0x52: ld_d_d,
+    0x53: ld_d_e,
+    0x54: ld_d_h,
+    0x55: ld_d_l,
+    0x56: ld_d_hl,
+    0x57: ld_d_a,
+    0x58: ld_e_b,
+    0x59: ld_e_c,
+    0x5A: ld_e_d,
+    0x5B: ld_e_e,
+    0x5C: ld_e_h,
+    0x5D: ld_e_l,
+    0x5E: ld_e_hl,
+    0x5F: ld_e_a,
+    0x60: ld_h_b,
+    0x61: ld_h_c,
+    0x62: ld_h_d,
+    0x63: ld_h_e,
+    0x64: ld_h_h,
+    0x65: ld_h_l,
+    0x66: ld_h_hl,
+    0x67: ld_h_a,
+    0x68: ld_l_b,
+    0x69: ld_l_c,
+    0x6A: ld_l_d,
+    0x6B: ld_l_e,
+    0x6C: ld_l_h,
+    0x6D: ld_l_l,
+    0x6E: ld_l_hl,
+    0x6F: ld_l_a,
+    0x70: ld_hl_b,
+    0x71: ld_hl_c,
+    0x72: ld_hl_d,
+    0x73: ld_hl_e,
+    0x74: ld_hl_h,
+    0x75: ld_hl_l,
+    0x77: ld_hl_a,
+    0x78: ld_a_b,
+    0x79: ld_a_c,
+    0x7A: ld_a_d,
+    0x7B: ld_a_e,
+    0x7C: ld_a_h,
+    0x7D: ld_a_l,
+    0x7E: ld_a_hl,
+    0x7F: ld_a_a,
+    0x80: add_a_b,
+    0x81: add_a_c,
+    0x82: add_a_d,
+    0x83: add_a_e,
+    0x84: add_a_h,
+    0x85: add_a_l,
+    0x86: add_a_hl,
+    0x87: add_a_a,
+    0x88: adc_a_b,
+    0x89: adc_a_c,
+    0x8A: adc_a_d,
+    0x8B: adc_a_e,
+    0x8C: adc_a_h,
+    0x8D: adc_a_l,
+    0x8E: adc_a_hl,
+    0x8F: adc_a_a,
+    0x90: sub_a_b,
+    0x91: sub_a_c,
+    0x92: sub_a_d,
+    0x93: sub_a_e,
+    0x94: sub_a_h,
+    0x95: sub_a_l,
+    0x96: sub_a_hl,
+    0x97: sub_a_a,
+    0x98: sbc_a_b,
+    0x99: sbc_a_c,
+    0x9A: sbc_a_d,
+    0x9B: sbc_a_e,
+    0x9C: sbc_a_h,
+    0x9D: sbc_a_l,
+    0x9E: sbc_a_hl,
+    0x9F: sbc_a_a,
+    0xA0: and_a_b,
+    0xA1: and_a_c,
+    0xA2: and_a_d,
+    0xA3: and_a_e,
+    0xA4: and_a_h,
+    0xA5: and_a_l,
+    0xA6: and_a_hl,
+    0xA7: and_a_a,
+    0xE6: and_a_n8,
+    0xB0: or_a_b,
+    0xB1: or_a_c,
+    0xB2: or_a_d,
+    0xB3: or_a_e,
+    0xB4: or_a_h,
+    0xB5: or_a_l,
+    0xB6: or_a_hl,
+    0xB7: or_a_a,
+    0xF6: or_a_n8,
+    0xA8: xor_a_b,
+    0xA9: xor_a_c,
+    0xAA: xor_a_d,
+    0xAB: xor_a_e,
+    0xAC: xor_a_h,
+    0xAD: xor_a_l,
+    0xAE: xor_a_hl,
+    0xAF: xor_a_a,
+    0xEE: xor_a_n8,
+    0xB8: cp_a_b,
+    0xB9: cp_a_c,
+    0xBA: cp_a_d,
+    0xBB: cp_a_e,
+    0xBC: cp_a_h,
+    0xBD: cp_a_l,
+    0xBE: cp_a_hl,
+    0xBF: cp_a_a,
+    0xFE: cp_a_n8,
+    # Stack operations
+    0xC1: pop_bc,
+    0xC5: push_bc,
+    0xD1: pop_de,
+    0xD5: push_de,
+    0xE1: pop_hl,
+    0xE5: push_hl,
+    0xF1: pop_af,
+    0xF5: push_af,
+    # Immediate value arithmetic operations
+    0xC6: add_a_n8,
+    0xD6: sub_a_n8,
+    0xDE: sbc_a_n8,
+    # LDH (Load Half) instructions for HRAM/I/O access
+    0xE0: ldh_ff_n_a,
+    0xF0: ldh_a_ff_n,
+    0xE2: ldh_ff_c_a,
+    0xF2: ldh_a_ff_c,
+    # Absolute address and SP-relative load/store instructions
+    0xEA: ld_a16_a,
+    0xFA: ld_a_a16,
+    0xF8: ld_hl_sp_e8,
+    0xF9: ld_sp_hl,
+    # Arithmetic with immediate
+    0xCE: adc_a_n8,
+    0xE8: add_sp_e8,
+    # Miscellaneous
+    0x27: daa,
+    # Jump instructions
+    0xC3: jp_nn,
+    0xC2: jp_nz_nn,
+    0xCA: jp_z_nn,
+    0xD2: jp_nc_nn,
+    0xDA: jp_c_nn,
+    0x18: jr_n,
+    0x20: jr_nz_n,
+    0x28: jr_z_n,
+    0x30: jr_nc_n,
+    0x38: jr_c_n,
+    0xE9: jp_hl,
+    # Call/Return instructions
+    0xCD: call_nn,
+    0xC4: call_nz_nn,
+    0xCC: call_z_nn,
+    0xD4: call_nc_nn,
+    0xDC: call_c_nn,
+    0xC9: ret,
+    0xC0: ret_nz,
+    0xC8: ret_z,
+    0xD0: ret_nc,
+    0xD8: ret_c,
+    0xD9: reti,
+    # Restart instructions
+    0xC7: rst_00h,
+    0xCF: rst_08h,
+    0xD7: rst_10h,
+    0xDF: rst_18h,
+    0xE7: rst_20h,
+    0xEF: rst_28h,
+    0xF7: rst_30h,
+    0xFF: rst_38h,
+}
+
+# CB-prefixed opcode dispatch table (256 entries)
+_CB_OPCODE_HANDLERS = build_cb_dispatch()
+
+
+# Sentinel for "no block cache entry yet" (None means "not compilable")
+_UNCOMPILED = object()
+
+# RAM code rewritten more often than this is left to the interpreter: exec()
+# costs far more than the handful of executions between rewrites.
+_MAX_RAM_RECOMPILES = 8
+
+
+def _reference_adapter(entry):
+    """Wrap a hand-written handler in the handler(cpu, imm) signature."""
+    opcode_info, _, pre_ops, fetch_idx, handler = entry
+
+    if fetch_idx < 0:
+        def run_reference(cpu, imm):
+            cpu.operand_values = pre_ops
+            return handler(cpu, opcode_info)
+    else:
+        def run_reference(cpu, imm):
+            pre_ops[fetch_idx]["value"] = imm
+            cpu.operand_values = pre_ops
+            return handler(cpu, opcode_info)
+    return run_reference
+
+
+def _build_dispatch(reference_dispatch, specialized, use_reference):
+    """Build a 256-entry (fetch_size, handler(cpu, imm)) dispatch list.
+
+    Only opcodes with a hand-written handler get an entry, so the set of
+    implemented opcodes is the same in both modes.
+    """
+    dispatch = [None] * 256
+    for i, entry in enumerate(reference_dispatch):
+        if entry is None:
+            continue
+        fetch_size = entry[1]
+        if use_reference or specialized[i] is None:
+            dispatch[i] = (fetch_size, _reference_adapter(entry))
+        else:
+            dispatch[i] = (fetch_size, specialized[i])
+    return dispatch
+
+
+# CPU attribute dicts keyed by (lazy_flags, reference_handlers)
+_tables = {}
+
+
+def _shared_tables(lazy_flags, reference_handlers):
+    """Return the opcode/dispatch table attributes for a CPU.
+
+    Everything here depends only on Opcodes.json, the handler modules and
+    the two options, so it is built on first use and then shared by every
+    CPU instance. The tables are never mutated after construction. (The
+    reference adapters fill the shared operand list right before each
+    handler call, which is safe as long as one thread runs a given set of
+    CPUs.)
+    """
+    key = (lazy_flags, reference_handlers)
+    tables = _tables.get(key)
+    if tables is not None:
+        return tables
+
+    opcodes = get_opcode_tables()
+
+    # Convert handler dicts to lists for faster indexed dispatch
+    handler_list = [_OPCODE_HANDLERS.get(i) for i in range(256)]
+    cb_handler_list = [_CB_OPCODE_HANDLERS.get(i) for i in range(256)]
+
+    # Combined meta+handler lookup for the hand-written (reference) handlers.
+    # Each meta entry is (opcode_info, fetch_size, operand_list, fetch_idx).
+    reference_dispatch = [None] * 256
+    cb_reference_dispatch = [None] * 256
+    for i in range(256):
+        meta = opcodes.unprefixed_meta[i]
+        handler = handler_list[i]
+        if meta is not None and handler is not None:
+            reference_dispatch[i] = (meta[0], meta[1], meta[2], meta[3], handler)
+        meta = opcodes.cbprefixed_meta[i]
+        handler = cb_handler_list[i]
+        if meta is not None and handler is not None:
+            cb_reference_dispatch[i] = (meta[0], meta[1], meta[2], meta[3], handler)
+
+    # Specialized handlers generated from Opcodes.json (handlers/codegen.py):
+    # handler(cpu, imm) -> cycles, with registers, flags and cycle counts
+    # resolved at generation time.
+    specialized, cb_specialized = build_specialized_handlers(opcodes.opcodes_db, lazy_flags)
+
+    tables = _tables[key] = {
+        "opcodes_db": opcodes.opcodes_db,
+        "_unprefixed_info": opcodes.unprefixed_info,
+        "_cbprefixed_info": opcodes.cbprefixed_info,
+        "_unprefixed_meta": opcodes.unprefixed_meta,
+        "_cbprefixed_meta": opcodes.cbprefixed_meta,
+        "opcode_handlers": _OPCODE_HANDLERS,
+        "cb_opcode_handlers": _CB_OPCODE_HANDLERS,
+        "_handler_list": handler_list,
+        "_cb_handler_list": cb_handler_list,
+        "_reference_dispatch": reference_dispatch,
+        "_cb_reference_dispatch": cb_reference_dispatch,
+        "_specialized": specialized,
+        "_cb_specialized": cb_specialized,
+        # Run-loop dispatch: (fetch_size, handler(cpu, imm)) per opcode. The
+        # reference handlers are wrapped to the same signature so both
+        # implementations run through one loop (reference_handlers=True is
+        # meant for differential testing).
+        "_dispatch": _build_dispatch(reference_dispatch, specialized, reference_handlers),
+        "_cb_dispatch": _build_dispatch(cb_reference_dispatch, cb_specialized,
+                                        reference_handlers),
+    }
+    return tables
+
+
 class CPU:
-    def __init__(self, memory=None):
-        self.registers = Registers()
+    def __init__(self, memory=None, compile_blocks=False, reference_handlers=False,
+                 lazy_flags=False, skip_idle_loops=False):
+        # Lazy-flags mode (see lazy_flags.py): ALU handlers defer computing F
+        # until something reads it. Off by default.
+        self.lazy_flags = lazy_flags
+        self.registers = LazyFlagRegisters() if lazy_flags else Registers()
         self.current_cycles = 0
         self.operand_values = []
 
+        # Basic-block compiler (see block_compiler.py). Off by default so the
+        # plain interpreter stays the reference implementation.
+        self.compile_blocks = compile_blocks
+        self._block_cache = {}      # ROM blocks keyed by (bank << 16) | PC
+        self._ram_block_cache = {}  # WRAM/HRAM blocks keyed by PC
+        self._ram_block_recompiles = {}  # PC -> times its RAM block was invalidated
+        self._ram_block_ends = {}   # PC -> end address of each compiled RAM block
+
+        # Idle-loop skipping (see idle_loop.py). Off by default, like the
+        # other run modes; idle_cycles_skipped counts the T-cycles fast-forwarded so far.
+        self.skip_idle_loops = skip_idle_loops
+        self.idle_cycles_skipped = 0
+        self._idle_loops = {}       # ROM loop heads keyed by (bank << 16) | PC
+        self._idle_arrival = None   # (key, state, cycle, wake) at the last pass
+
         # Minimal interrupts interface for RETI instruction
         self.interrupts = Interrupts(self)
 
-        self.opcodes_db = {}
-        with open("Opcodes.json", "r") as f:
-            self.opcodes_db = json.load(f)
-
-        # Pre-index opcode info into 256-element arrays for O(1) lookup
-        # (eliminates f-string formatting + nested dict lookup per instruction)
-        self._unprefixed_info = [None] * 256
-        for key, info in self.opcodes_db["unprefixed"].items():
-            self._unprefixed_info[int(key, 16)] = info
-        self._cbprefixed_info = [None] * 256
-        for key, info in self.opcodes_db["cbprefixed"].items():
-            self._cbprefixed_info[int(key, 16)] = info
-
-        # Pre-build operand metadata per opcode: eliminates per-instruction
-        # dict creation, list building, len() checks, and "bytes" in checks.
-        # Each entry is (opcode_info, fetch_size, operand_list, fetch_idx).
-        self._unprefixed_meta = [None] * 256
-        self._cbprefixed_meta = [None] * 256
-        for i in range(256):
-            info = self._unprefixed_info[i]
-            if info is not None:
-                self._unprefixed_meta[i] = self._build_opcode_meta(info)
-            info = self._cbprefixed_info[i]
-            if info is not None:
-                self._cbprefixed_meta[i] = self._build_opcode_meta(info)
-
         # Memory instance can be injected for testing or real use.
         if memory is None:
             from src.memory.gb_memory import Memory
@@ -410,285 +774,14 @@ class CPU:
         # APU reference — same pattern as timer/PPU.
         self._apu = self.memory._apu
 
-        # Initialize dispatch table for opcode handlers
-        self.opcode_handlers = {
-            0x00: nop,
-            0x10: stop,
-            0x01: ld_bc_n16,
-            0x02: ld_bc_a,
-            0x03: inc_bc,
-            0x04: inc_b,
-            0x05: dec_b,
-            0x08: ld_a16_sp,
-            0x09: add_hl_bc,
-            0x0A: ld_a_bc,
-            0x0B: dec_bc,
-            0x0C: inc_c,
-            0x0D: dec_c,
-            0x12: ld_de_a,
-            0x13: inc_de,
-            0x14: inc_d,
-            0x15: dec_d,
-            0x19: add_hl_de,
-            0x1A: ld_a_de,
-            0x1B: dec_de,
-            0x1C: inc_e,
-            0x1D: dec_e,
-            0x21: ld_hl_n16,
-            0x22: ld_hli_a,
-            0x23: inc_hl,
-            0x24: inc_h,
-            0x25: dec_h,
-            0x29: add_hl_hl,
-            0x2A: ld_a_hli,
-            0x2B: dec_hl,
-            0x2C: inc_l,
-            0x2D: dec_l,
-            0x31: ld_sp_n16,
-            0x32: ld_hld_a,
-            0x33: inc_sp,
-            0x34: inc_hl_indirect,
-            0x35: dec_hl_indirect,
-            0x39: add_hl_sp,
-            0x3A: ld_a_hld,
-            0x3B: dec_sp,
-            0x3C: inc_a,
-            0x3D: dec_a,
-            0x07: rlc_a,
-            0x0F: rrc_a,
-            0x17: rl_a,
-            0x1F: rr_a,
-            0x06: ld_b_n8,
-            0x0E: ld_c_n8,
-            0x11: ld_de_n16,
-            0x16: ld_d_n8,
-            0x1E: ld_e_n8,
-            0x26: ld_h_n8,
-            0x2E: ld_l_n8,
-            0x2F: cpl,
-            0x36: ld_hl_n8,
-            0x37: scf,
-            0x3F: ccf,
-            0x3E: ld_a_n8,
-            # Interrupt control instructions
-            0xF3: di,
-            0xFB: ei,
-            0x76: halt,
-            # LD r1, r2 instructions (register to register transfers)
-            0x40: ld_b_b,
-            0x41: ld_b_c,
-            0x42: ld_b_d,
-            0x43: ld_b_e,
-            0x44: ld_b_h,
-            0x45: ld_b_l,
-            0x46: ld_b_hl,
-            0x47: ld_b_a,
-            0x48: ld_c_b,
-            0x49: ld_c_c,
-            0x4A: ld_c_d,
-            0x4B: ld_c_e,
-            0x4C: ld_c_h,
-            0x4D: ld_c_l,
-            0x4E: ld_c_hl,
-            0x4F: ld_c_a,
-            0x50: ld_d_b,
-            0x51: ld_d_c,
-            0x52: ld_d_d,
-            0x53: ld_d_e,
-            0x54: ld_d_h,
-            0x55: ld_d_l,
-            0x56: ld_d_hl,
-            0x57: ld_d_a,
-            0x58: ld_e_b,
-            0x59: ld_e_c,
-            0x5A: ld_e_d,
-            0x5B: ld_e_e,
-            0x5C: ld_e_h,
-            0x5D: ld_e_l,
-            0x5E: ld_e_hl,
-            0x5F: ld_e_a,
-            0x60: ld_h_b,
-            0x61: ld_h_c,
-            0x62: ld_h_d,
-            0x63: ld_h_e,
-            0x64: ld_h_h,
-            0x65: ld_h_l,
-            0x66: ld_h_hl,
-            0x67: ld_h_a,
-            0x68: ld_l_b,
-            0x69: ld_l_c,
-            0x6A: ld_l_d,
-            0x6B: ld_l_e,
-            0x6C: ld_l_h,
-            0x6D: ld_l_l,
-            0x6E: ld_l_hl,
-            0x6F: ld_l_a,
-            0x70: ld_hl_b,
-            0x71: ld_hl_c,
-            0x72: ld_hl_d,
-            0x73: ld_hl_e,
-            0x74: ld_hl_h,
-            0x75: ld_hl_l,
-            0x77: ld_hl_a,
-            0x78: ld_a_b,
-            0x79: ld_a_c,
-            0x7A: ld_a_d,
-            0x7B: ld_a_e,
-            0x7C: ld_a_h,
-            0x7D: ld_a_l,
-            0x7E: ld_a_hl,
-            0x7F: ld_a_a,
-            0x80: add_a_b,
-            0x81: add_a_c,
-            0x82: add_a_d,
-            0x83: add_a_e,
-            0x84: add_a_h,
-            0x85: add_a_l,
-            0x86: add_a_hl,
-            0x87: add_a_a,
-            0x88: adc_a_b,
-            0x89: adc_a_c,
-            0x8A: adc_a_d,
-            0x8B: adc_a_e,
-            0x8C: adc_a_h,
-            0x8D: adc_a_l,
-            0x8E: adc_a_hl,
-            0x8F: adc_a_a,
-            0x90: sub_a_b,
-            0x91: sub_a_c,
-            0x92: sub_a_d,
-            0x93: sub_a_e,
-            0x94: sub_a_h,
-            0x95: sub_a_l,
-            0x96: sub_a_hl,
-            0x97: sub_a_a,
-            0x98: sbc_a_b,
-            0x99: sbc_a_c,
-            0x9A: sbc_a_d,
-            0x9B: sbc_a_e,
-            0x9C: sbc_a_h,
-            0x9D: sbc_a_l,
-            0x9E: sbc_a_hl,
-            0x9F: sbc_a_a,
-            0xA0: and_a_b,
-            0xA1: and_a_c,
-            0xA2: and_a_d,
-            0xA3: and_a_e,
-            0xA4: and_a_h,
-            0xA5: and_a_l,
-            0xA6: and_a_hl,
-            0xA7: and_a_a,
-            0xE6: and_a_n8,
-            0xB0: or_a_b,
-            0xB1: or_a_c,
-            0xB2: or_a_d,
-            0xB3: or_a_e,
-            0xB4: or_a_h,
-            0xB5: or_a_l,
-            0xB6: or_a_hl,
-            0xB7: or_a_a,
-            0xF6: or_a_n8,
-            0xA8: xor_a_b,
-            0xA9: xor_a_c,
-            0xAA: xor_a_d,
-            0xAB: xor_a_e,
-            0xAC: xor_a_h,
-            0xAD: xor_a_l,
-            0xAE: xor_a_hl,
-            0xAF: xor_a_a,
-            0xEE: xor_a_n8,
-            0xB8: cp_a_b,
-            0xB9: cp_a_c,
-            0xBA: cp_a_d,
-            0xBB: cp_a_e,
-            0xBC: cp_a_h,
-            0xBD: cp_a_l,
-            0xBE: cp_a_hl,
-            0xBF: cp_a_a,
-            0xFE: cp_a_n8,
-            # Stack operations
-            0xC1: pop_bc,
-            0xC5: push_bc,
-            0xD1: pop_de,
-            0xD5: push_de,
-            0xE1: pop_hl,
-            0xE5: push_hl,
-            0xF1: pop_af,
-            0xF5: push_af,
-            # Immediate value arithmetic operations
-            0xC6: add_a_n8,
-            0xD6: sub_a_n8,
-            0xDE: sbc_a_n8,
-            # LDH (Load Half) instructions for HRAM/I/O access
-            0xE0: ldh_ff_n_a,
-            0xF0: ldh_a_ff_n,
-            0xE2: ldh_ff_c_a,
-            0xF2: ldh_a_ff_c,
-            # Absolute address and SP-relative load/store instructions
-            0xEA: ld_a16_a,
-            0xFA: ld_a_a16,
-            0xF8: ld_hl_sp_e8,
-            0xF9: ld_sp_hl,
-            # Arithmetic with immediate
-            0xCE: adc_a_n8,
-            0xE8: add_sp_e8,
-            # Miscellaneous
-            0x27: daa,
-            # Jump instructions
-            0xC3: jp_nn,
-            0xC2: jp_nz_nn,
-            0xCA: jp_z_nn,
-            0xD2: jp_nc_nn,
-            0xDA: jp_c_nn,
-            0x18: jr_n,
-            0x20: jr_nz_n,
-            0x28: jr_z_n,
-            0x30: jr_nc_n,
-            0x38: jr_c_n,
-            0xE9: jp_hl,
-            # Call/Return instructions
-            0xCD: call_nn,
-            0xC4: call_nz_nn,
-            0xCC: call_z_nn,
-            0xD4: call_nc_nn,
-            0xDC: call_c_nn,
-            0xC9: ret,
-            0xC0: ret_nz,
-            0xC8: ret_z,
-            0xD0: ret_nc,
-            0xD8: ret_c,
-            0xD9: reti,
-            # Restart instructions
-            0xC7: rst_00h,
-            0xCF: rst_08h,
-            0xD7: rst_10h,
-            0xDF: rst_18h,
-            0xE7: rst_20h,
-            0xEF: rst_28h,
-            0xF7: rst_30h,
-            0xFF: rst_38h,
-        }
+        # Event scheduler (src/scheduler/scheduler.py) — same pattern. When
+        # present, the run loop advances it instead of ticking components.
+        self._scheduler = self.memory._scheduler
 
-        # CB-prefixed opcode dispatch table (256 entries)
-        self.cb_opcode_handlers = build_cb_dispatch()
-
-        # Convert handler dicts to lists for faster indexed dispatch
-        self._handler_list = [self.opcode_handlers.get(i) for i in range(256)]
-        self._cb_handler_list = [self.cb_opcode_handlers.get(i) for i in range(256)]
-
-        # Combined meta+handler lookup: single list index instead of two
-        self._dispatch = [None] * 256
-        for i in range(256):
-            meta = self._unprefixed_meta[i]
-            handler = self._handler_list[i]
-            if meta is not None and handler is not None:
-                self._dispatch[i] = (meta[0], meta[1], meta[2], meta[3], handler)
-        self._cb_dispatch = [None] * 256
-        for i in range(256):
-            meta = self._cbprefixed_meta[i]
-            handler = self._cb_handler_list[i]
-            if meta is not None and handler is not None:
-                self._cb_dispatch[i] = (meta[0], meta[1], meta[2], meta[3], handler)
+        # Opcode and dispatch tables (see _shared_tables): built once per
+        # process and shared read-only by every CPU with the same options.
+        self.reference_handlers = reference_handlers
+        self.__dict__.update(_shared_tables(lazy_flags, reference_handlers))
 
     def save_state(self):
         return {
@@ -726,37 +819,58 @@ class CPU:
         self.interrupts.halt_bug = irq['halt_bug']
         self.interrupts.ime_handled_by_instruction = irq['ime_handled_by_instruction']
         self.operand_values = []
+        self.invalidate_blocks()
+
+    def invalidate_blocks(self):
+        """Drop every compiled block (ROM and RAM)."""
+        self._block_cache.clear()
+        self.invalidate_ram_blocks()
+
+    def invalidate_ram_blocks(self):
+        """Drop compiled blocks decoded from writable memory.
+
+        Called after memory is replaced by load_state, and via
+        _on_code_write() when the program writes over compiled RAM code.
+        """
+        self._ram_block_cache.clear()
+        self._ram_block_ends.clear()
+        code_map = self.memory._code_map
+        code_map[:] = bytes(len(code_map))
+
+    def _on_code_write(self, address):
+        """A write landed on compiled RAM code at address (self-modifying
+        code, or a routine copied into WRAM/HRAM again). Drop only the blocks
+        covering address and count the rewrite against each, so code that is
+        patched constantly stops being recompiled while its neighbours stay
+        compiled."""
+        ends = self._ram_block_ends
+        hit = [(pc, end) for pc, end in ends.items() if pc <= address < end]
+        cache = self._ram_block_cache
+        recompiles = self._ram_block_recompiles
+        code_map = self.memory._code_map
+        for pc, end in hit:
+            recompiles[pc] = recompiles.get(pc, 0) + 1
+            del cache[pc], ends[pc]
+            code_map[pc:end] = bytes(end - pc)
+        # Blocks can overlap (a jump into the middle of another): re-mark
+        # the bytes the surviving ones still cover
+        for pc, end in ends.items():
+            for start, stop in hit:
+                if pc < stop and start < end:
+                    code_map[pc:end] = b"\x01" * (end - pc)
+                    break
+
+    # Register names accepted by get_register/set_register. Every name is an
+    # attribute of the register file (the pairs are computed properties).
+    _REGISTER_CODES = frozenset(("A", "B", "C", "D", "E", "H", "L",
+                                 "AF", "BC", "DE", "HL", "SP", "PC"))
+    _R8_CODES = frozenset(("A", "B", "C", "D", "E", "H", "L"))
 
     def get_register(self, code):
         """Return the value of a register or its high/low byte."""
-        if code == "AF":
-            return self.registers.AF
-        elif code == "A":
-            return (self.registers.AF >> 8) & 0xFF
-        elif code == "BC":
-            return self.registers.BC
-        elif code == "B":
-            return (self.registers.BC >> 8) & 0xFF
-        elif code == "C":
-            return self.registers.BC & 0xFF
-        elif code == "DE":
-            return self.registers.DE
-        elif code == "D":
-            return (self.registers.DE >> 8) & 0xFF
-        elif code == "E":
-            return self.registers.DE & 0xFF
-        elif code == "HL":
-            return self.registers.HL
-        elif code == "H":
-            return (self.registers.HL >> 8) & 0xFF
-        elif code == "L":
-            return self.registers.HL & 0xFF
-        elif code == "SP":
-            return self.registers.SP
-        elif code == "PC":
-            return self.registers.PC
-        else:
+        if code not in self._REGISTER_CODES:
             raise ValueError(f"Unknown register code: {code}")
+        return getattr(self.registers, code)
 
     def get_register_pair(self, pair_name):
         """Return the 16-bit value of a register pair.
@@ -798,32 +912,12 @@ class CPU:
 
     def set_register(self, code, value):
         """Set the value of a register or its high/low byte."""
-        if code == "AF":
+        if code in self._R8_CODES:
+            setattr(self.registers, code, value & 0xFF)
+        elif code == "AF":
             self.registers.AF = value & 0xFFF0  # Lower 4 bits of F are always 0
-        elif code == "A":
-            self.registers.AF = ((value & 0xFF) << 8) | (self.registers.AF & 0x00FF)
-        elif code == "BC":
-            self.registers.BC = value
-        elif code == "B":
-            self.registers.BC = ((value & 0xFF) << 8) | (self.registers.BC & 0x00FF)
-        elif code == "C":
-            self.registers.BC = (self.registers.BC & 0xFF00) | (value & 0xFF)
-        elif code == "DE":
-            self.registers.DE = value
-        elif code == "D":
-            self.registers.DE = ((value & 0xFF) << 8) | (self.registers.DE & 0x00FF)
-        elif code == "E":
-            self.registers.DE = (self.registers.DE & 0xFF00) | (value & 0xFF)
-        elif code == "HL":
-            self.registers.HL = value
-        elif code == "H":
-            self.registers.HL = ((value & 0xFF) << 8) | (self.registers.HL & 0x00FF)
-        elif code == "L":
-            self.registers.HL = (self.registers.HL & 0xFF00) | (value & 0xFF)
-        elif code == "SP":
-            self.registers.SP = value
-        elif code == "PC":
-            self.registers.PC = value
+        elif code in self._REGISTER_CODES:
+            setattr(self.registers, code, value)
         else:
             raise ValueError(f"Unknown register code: {code}")
 
@@ -833,15 +927,15 @@ class CPU:
 
     def get_flag(self, flag):
         """Get the value of a CPU flag."""
-        return (self.registers.AF & self._FLAG_BITS[flag]) != 0
+        return (self.registers.F & self._FLAG_BITS[flag]) != 0
 
     def set_flag(self, flag, value):
         """Set a CPU flag to a specific value."""
         bit = self._FLAG_BITS[flag]
         if value:
-            self.registers.AF |= bit
+            self.registers.F |= bit
         else:
-            self.registers.AF = (self.registers.AF & ~bit) & 0xFFFF
+            self.registers.F &= ~bit & 0xFF
 
     # Flag calculation helpers
 
@@ -972,46 +1066,6 @@ class CPU:
         high = self.memory.get_value(address + 1)
         return (high << 8) | low
 
-    def _build_opcode_meta(self, opcode_info):
-        """Pre-build operand metadata for a single opcode.
-
-        Returns (opcode_info, fetch_size, operand_list, fetch_idx) where:
-        - fetch_size: 0, 1, or 2 bytes to read from instruction stream
-        - operand_list: pre-built list of operand dicts (reused at runtime)
-        - fetch_idx: index into operand_list for the fetched-value operand (-1 if none)
-        """
-        operands = opcode_info["operands"]
-        is_conditional = len(opcode_info.get("cycles", [])) > 1
-
-        pre_ops = []
-        fetch_size = 0
-        fetch_idx = -1
-
-        for operand in operands:
-            name = operand["name"]
-            immediate = operand["immediate"]
-
-            if "bytes" in operand:
-                fetch_idx = len(pre_ops)
-                fetch_size = operand["bytes"]
-                pre_ops.append({
-                    "name": name,
-                    "value": 0,
-                    "immediate": immediate,
-                    "type": "immediate_address" if name == "a16" else "immediate_value",
-                })
-            else:
-                if is_conditional and name in ("Z", "NZ", "C", "NC"):
-                    continue
-                pre_ops.append({
-                    "name": name,
-                    "value": name,
-                    "immediate": immediate,
-                    "type": "register" if immediate else "register_indirect",
-                })
-
-        return (opcode_info, fetch_size, pre_ops, fetch_idx)
-
     def fetch(self):
         """Fetch the current opcode from memory at PC and increment PC."""
         opcode = self.fetch_byte(self.registers.PC)
@@ -1019,6 +1073,204 @@ class CPU:
         return opcode
 
     def run(self, max_cycles=-1):
+        run_loop = self._run_blocks if self.compile_blocks else self._run_interpreter
+        # Memory and joypad state may have changed since the last run
+        self._idle_arrival = None
+        scheduler = self._scheduler
+        if scheduler is None:
+            return run_loop(max_cycles)
+        scheduler.sync_all()
+        try:
+            return run_loop(max_cycles)
+        finally:
+            scheduler.sync_all()
+
+    def _component_ticks(self):
+        """Return the (timer, PPU, APU) tick functions for the run loop.
+
+        With an event scheduler the loop makes one advance() call per
+        instruction instead, and the scheduler catches components up.
+        """
+        if self._scheduler is not None:
+            return self._scheduler.advance, None, None
+        return (
+            self._timer.tick if self._timer else None,
+            self._ppu.tick if self._ppu else None,
+            self._apu.tick if self._apu else None,
+        )
+
+    def _cycles_until_wake(self):
+        """Return T-cycles until a component may next raise an interrupt.
+
+        Only the timer (TIMA overflow) and the PPU (mode change / LY
+        increment) raise interrupts from inside the run loop. The APU never
+        does, and joypad and serial interrupts come from outside it
+        (Joypad.press() between runs). Returns None if nothing is scheduled.
+        """
+        scheduler = self._scheduler
+        if scheduler is not None:
+            wake = scheduler.next_event - scheduler.now
+            return None if wake == NEVER else wake
+        wake = None
+        for component in (self._timer, self._ppu):
+            if component is not None:
+                cycles = component.next_event_cycles()
+                if cycles is not None and (wake is None or cycles < wake):
+                    wake = cycles
+        return wake
+
+    def _fast_forward_halt(self, budget, timer_tick, ppu_tick, apu_tick):
+        """Skip a HALT idle stretch in one batched tick; return the cycles.
+
+        The reference HALT loop advances 4 T-cycles at a time and checks
+        IF & IE before each step, so it wakes after the first 4-cycle step
+        that reaches the next interrupt point (or stops once the run budget
+        is used up). This jumps straight to the end of that step. Ticks are
+        additive, so components end up in exactly the same state; if the
+        event turns out not to raise an interrupt, the loop simply skips
+        ahead to the next one.
+        """
+        wake = self._cycles_until_wake()
+        if wake is None or wake > budget:
+            wake = budget
+        cycles = ((max(wake, 1) + 3) >> 2) << 2
+        if timer_tick:
+            timer_tick(cycles)
+        if ppu_tick:
+            ppu_tick(cycles)
+        if apu_tick:
+            apu_tick(cycles)
+        return cycles
+
+    def _skip_idle_loop(self, branch, current_cycles, max_cycles, timer_tick, ppu_tick, apu_tick):
+        """Fast-forward through repeats of an idle loop; return the cycles.
+
+        Called when a jump has just landed on registers.PC from `branch`
+        (None if the caller knows it came round a loop starting there).
+        Passes are only skipped once the CPU has made one full pass that
+        ended with the same registers it started with, with no timer/PPU
+        event and no pending interrupt during it, and the body only reads
+        stable addresses. Such a pass repeats exactly until the next event,
+        so whole passes up to that event (or the end of the run budget) are
+        skipped in one batched tick, leaving the CPU back at the loop head.
+        """
+        registers = self.registers
+        head = registers.PC
+        if head >= 0x8000:
+            return 0
+        key = ((self.memory._mbc._rom_bank << 16) | head) if head >= 0x4000 else head
+        loop = self._idle_loops.get(key, _UNCOMPILED)
+        if loop is _UNCOMPILED:
+            loop = self._idle_loops[key] = analyze_idle_loop(self, head)
+        if loop is None or (branch is not None and branch != loop.branch):
+            return 0
+
+        interrupts = self.interrupts
+        mem_array = self.memory.memory
+        if interrupts.ime_pending or interrupts.halt_bug or \
+                (interrupts.ime and mem_array[0xFF0F] & mem_array[0xFFFF] & 0x1F):
+            self._idle_arrival = None
+            return 0
+        state = (registers.A, registers.F, registers.B, registers.C, registers.D,
+                 registers.E, registers.H, registers.L, registers.SP, interrupts.ime)
+        wake = self._cycles_until_wake()
+        previous = self._idle_arrival
+        self._idle_arrival = (key, state, current_cycles, wake)
+        if previous is None or previous[0] != key or previous[1] != state:
+            return 0
+        period = current_cycles - previous[2]
+        if previous[3] is not None and period >= previous[3]:
+            return 0  # an event landed during the last pass
+        if not loop.reads_stable(registers):
+            return 0
+
+        limit = max_cycles - current_cycles
+        if wake is not None and wake < limit:
+            limit = wake
+        cycles = limit // period * period
+        if cycles <= 0:
+            return 0
+        if timer_tick:
+            timer_tick(cycles)
+        if ppu_tick:
+            ppu_tick(cycles)
+        if apu_tick:
+            apu_tick(cycles)
+        self.idle_cycles_skipped += cycles
+        self._idle_arrival = (key, state, current_cycles + cycles,
+                              None if wake is None else wake - cycles)
+        return cycles
+
+    def _run_blocks(self, max_cycles):
+        """Run loop for block mode: execute compiled blocks where possible.
+
+        Anything a block cannot express exactly — a pending EI, the HALT bug,
+        interrupt servicing, or code outside ROM/WRAM/HRAM — is handed to the
+        interpreter for a single instruction. HALT idle time is skipped to the
+        next wake-up point, as in the interpreter.
+        """
+        cycles_consumed = 0
+
+        registers = self.registers
+        interrupts = self.interrupts
+        memory = self.memory
+        mem_array = memory.memory
+        code_map = memory._code_map
+        mbc = memory._mbc
+        rom_blocks = self._block_cache
+        ram_blocks = self._ram_block_cache
+        ram_recompiles = self._ram_block_recompiles
+        ram_ends = self._ram_block_ends
+        run_interpreter = self._run_interpreter
+        skip_idle = self.skip_idle_loops and memory._rom_data is not None
+        current_cycles = self.current_cycles
+
+        timer_tick, ppu_tick, apu_tick = self._component_ticks()
+
+        while current_cycles < max_cycles:
+            block = None
+            if not (interrupts.halted or interrupts.ime_pending or interrupts.halt_bug
+                    or (interrupts.ime and mem_array[0xFF0F] & mem_array[0xFFFF] & 0x1F)):
+                pc = registers.PC
+                if mbc is not None and pc < 0x8000:
+                    key = ((mbc._rom_bank << 16) | pc) if pc >= 0x4000 else pc
+                    block = rom_blocks.get(key, _UNCOMPILED)
+                    if block is _UNCOMPILED:
+                        block = rom_blocks[key] = compile_block(self, pc)[0]
+                else:
+                    block = ram_blocks.get(pc, _UNCOMPILED)
+                    if block is _UNCOMPILED:
+                        if ram_recompiles.get(pc, 0) >= _MAX_RAM_RECOMPILES:
+                            block, end = None, pc
+                        else:
+                            block, end = compile_block(self, pc)
+                        ram_blocks[pc] = block
+                        if block is not None:
+                            ram_ends[pc] = end
+                            code_map[pc:end] = b"\x01" * (end - pc)
+
+            if block is None:
+                if interrupts.halted and not mem_array[0xFF0F] & mem_array[0xFFFF]:
+                    cycles = self._fast_forward_halt(
+                        max_cycles - current_cycles, timer_tick, ppu_tick, apu_tick)
+                else:
+                    self.current_cycles = current_cycles
+                    cycles = run_interpreter(current_cycles + 1)
+            else:
+                memory._code_dirty = False
+                cycles = block(self, registers, memory, mem_array, max_cycles - current_cycles,
+                               timer_tick, ppu_tick, apu_tick)
+                # A block that ends where it started may be an idle loop
+                if skip_idle and registers.PC == pc:
+                    cycles += self._skip_idle_loop(None, current_cycles + cycles, max_cycles,
+                                                   timer_tick, ppu_tick, apu_tick)
+            current_cycles += cycles
+            cycles_consumed += cycles
+
+        self.current_cycles = current_cycles
+        return cycles_consumed
+
+    def _run_interpreter(self, max_cycles):
         cycles_consumed = 0
 
         # Cache frequently accessed attributes as locals for speed
@@ -1026,16 +1278,12 @@ class CPU:
         interrupts = self.interrupts
         memory_get = self.memory.get_value
         mem_array = self.memory.memory
-        timer = self._timer
-        ppu = self._ppu
-        apu = self._apu
         dispatch = self._dispatch
         cb_dispatch = self._cb_dispatch
+        skip_idle = self.skip_idle_loops and self.memory._rom_data is not None
         current_cycles = self.current_cycles
 
-        timer_tick = timer.tick if timer else None
-        ppu_tick = ppu.tick if ppu else None
-        apu_tick = apu.tick if apu else None
+        timer_tick, ppu_tick, apu_tick = self._component_ticks()
 
         while current_cycles < max_cycles:
             # Handle HALT state: idle until an interrupt wakes CPU
@@ -1043,14 +1291,10 @@ class CPU:
                 if mem_array[0xFF0F] & mem_array[0xFFFF]:
                     interrupts.halted = False
                 else:
-                    current_cycles += 4
-                    cycles_consumed += 4
-                    if timer_tick:
-                        timer_tick(4)
-                    if ppu_tick:
-                        ppu_tick(4)
-                    if apu_tick:
-                        apu_tick(4)
+                    cycles_used = self._fast_forward_halt(
+                        max_cycles - current_cycles, timer_tick, ppu_tick, apu_tick)
+                    current_cycles += cycles_used
+                    cycles_consumed += cycles_used
                     continue
 
             # EI delay: snapshot pending state before instruction
@@ -1072,7 +1316,7 @@ class CPU:
                     continue
 
             # Inline fetch: read opcode from memory[PC], advance PC
-            pc = registers.PC
+            op_pc = pc = registers.PC
             opcode = memory_get(pc)
             registers.PC = (pc + 1) & 0xFFFF
 
@@ -1094,21 +1338,22 @@ class CPU:
                 self.current_cycles = current_cycles
                 raise NotImplementedError(f"Opcode {opcode:#04x} not implemented")
 
-            opcode_info, fetch_size, pre_ops, fetch_idx, handler = entry
-            self.operand_values = pre_ops
+            fetch_size, handler = entry
 
-            # Fetch operand bytes (0, 1, or 2) — no loop, no dict creation
+            # Fetch the immediate (0, 1, or 2 bytes) as a plain int
             if fetch_size == 1:
                 pc = registers.PC
-                pre_ops[fetch_idx]["value"] = memory_get(pc)
+                imm = memory_get(pc)
                 registers.PC = (pc + 1) & 0xFFFF
             elif fetch_size == 2:
                 pc = registers.PC
-                pre_ops[fetch_idx]["value"] = memory_get(pc) | (memory_get(pc + 1) << 8)
+                imm = memory_get(pc) | (memory_get(pc + 1) << 8)
                 registers.PC = (pc + 2) & 0xFFFF
+            else:
+                imm = 0
 
             # Dispatch and accumulate cycles
-            cycles_used = handler(self, opcode_info)
+            cycles_used = handler(self, imm)
             current_cycles += cycles_used
             cycles_consumed += cycles_used
             if timer_tick:
@@ -1123,5 +1368,14 @@ class CPU:
                 interrupts.ime = True
                 interrupts.ime_pending = False
 
+            # Backward jump: the CPU may have come round an idle loop. Only
+            # JR/JP with an operand or JP HL can close one (see idle_loop.py),
+            # so RET/RST targets are not analyzed.
+            if skip_idle and registers.PC <= op_pc and (fetch_size or opcode == JP_HL):
+                cycles_used = self._skip_idle_loop(op_pc, current_cycles, max_cycles,
+                                                   timer_tick, ppu_tick, apu_tick)
+                current_cycles += cycles_used
+                cycles_consumed += cycles_used
+
         self.current_cycles = current_cycles
         return cycles_consumed
@@ -0,0 +1,569 @@
+"""
+Import-time generator for specialized opcode handlers.
+
+The hand-written handlers in this package are written for clarity: they go
+through cpu.get_register("A"), cpu.set_flag("Z", ...) and
+opcode_info["cycles"][0] on every call, which costs a string if-chain, a
+dict lookup and a list index per access. This module reads Opcodes.json
+and emits one small Python function per opcode (unprefixed and CB tables)
+with everything that is known ahead of time baked in:
+
+  - 8-bit register reads/writes become plain attribute accesses on
+    cpu.registers; register pairs are assembled from/split into halves
+  - flag updates become a single F write; the mask of untouched flags and
+    the constant 0/1 flags come straight from the "flags" column
+  - cycle counts are returned as integer literals
+  - the fetched immediate is passed in as a plain int
+  - optionally (lazy_flags), ALU handlers defer the F computation entirely
+
+Generated handlers have the signature handler(cpu, imm) -> cycles. They
+must stay behaviour-identical to the hand-written ones, which remain the
+reference implementation (see tests/cpu/test_specialized_handlers.py).
+"""
+
+from src.cpu.lazy_flags import LAZY_ADD, LAZY_SUB, LAZY_AND, LAZY_OR, LAZY_INC, LAZY_DEC
+
+_FLAG_BITS = {"Z": 0x80, "N": 0x40, "H": 0x20, "C": 0x10}
+
+# 8-bit registers are plain attributes of the register file
+_R8 = ("A", "B", "C", "D", "E", "H", "L")
+
+_R16 = ("BC", "DE", "HL", "SP")
+
+# Branch conditions on the F register
+_CONDITIONS = {
+    "NZ": "not registers.F & 0x80",
+    "Z": "registers.F & 0x80",
+    "NC": "not registers.F & 0x10",
+    "C": "registers.F & 0x10",
+}
+
+# Flag expressions shared by several templates, in terms of the locals the
+# templates define (a, v, r, c, ...)
+_ADD_FLAGS = {"Z": "not r & 0xFF", "H": "(a & 0xF) + (v & 0xF) > 0xF", "C": "r > 0xFF"}
+_ADC_FLAGS = {"Z": "not r & 0xFF", "H": "(a & 0xF) + (v & 0xF) + c > 0xF", "C": "r > 0xFF"}
+_SUB_FLAGS = {"Z": "not r & 0xFF", "H": "(a & 0xF) < (v & 0xF)", "C": "r < 0"}
+_SBC_FLAGS = {"Z": "not r & 0xFF", "H": "(a & 0xF) - (v & 0xF) - c < 0", "C": "r < 0"}
+_LOGIC_FLAGS = {"Z": "not r"}
+_SP_E8_FLAGS = {"H": "(sp & 0xF) + (imm & 0xF) > 0xF", "C": "(sp & 0xFF) + imm > 0xFF"}
+
+
+def _flag_update(info, computed, a_expr=None):
+    """Return statements writing F (and optionally A) per the flags column.
+
+    computed maps flag name -> boolean expression for flags the JSON marks
+    as computed. Flags marked '-' and the low nibble of F are preserved,
+    matching the effect of consecutive CPU.set_flag() calls.
+    """
+    keep = 0x0F
+    const = 0
+    terms = []
+    for name, bit in _FLAG_BITS.items():
+        spec = info["flags"][name]
+        if spec == "-":
+            keep |= bit
+        elif spec == "1":
+            const |= bit
+        elif spec != "0":
+            terms.append(f"(0x{bit:02X} if {computed[name]} else 0)")
+    parts = [f"(registers.F & 0x{keep:02X})"] if keep != 0xFF else ["registers.F"]
+    if const:
+        parts.append(f"0x{const:02X}")
+    parts += terms
+    lines = [] if a_expr is None else [f"registers.A = {a_expr}"]
+    if len(parts) > 1 or a_expr is None:
+        lines.append("registers.F = " + " | ".join(parts))
+    return lines
+
+
+def _get16(name):
+    """Expression reading a 16-bit register (pairs are assembled from halves)."""
+    if name in ("SP", "PC"):
+        return f"registers.{name}"
+    return f"((registers.{name[0]} << 8) | registers.{name[1]})"
+
+
+def _set16(name, expr):
+    """Statements writing a 16-bit value (already masked) to a register."""
+    if name in ("SP", "PC"):
+        return [f"registers.{name} = {expr}"]
+    return [f"w = {expr}", f"registers.{name[0]} = w >> 8", f"registers.{name[1]} = w & 0xFF"]
+
+
+def _read8(operand):
+    """Expression reading an 8-bit source operand."""
+    name = operand["name"]
+    if name == "n8":
+        return "imm"
+    if not operand["immediate"]:
+        if name in ("HL", "BC", "DE"):
+            return f"memory.get_value({_get16(name)})"
+        if name == "a16":
+            return "memory.get_value(imm)"
+        raise KeyError(name)
+    if name not in _R8:
+        raise KeyError(name)
+    return f"registers.{name}"
+
+
+def _write8(operand, v):
+    """Statement writing an 8-bit value (already masked) to an operand."""
+    name = operand["name"]
+    if not operand["immediate"]:
+        if name in ("HL", "BC", "DE"):
+            return f"memory.set_value({_get16(name)}, {v})"
+        if name == "a16":
+            return f"memory.set_value(imm, {v})"
+        raise KeyError(name)
+    if name not in _R8:
+        raise KeyError(name)
+    return f"registers.{name} = {v}"
+
+
+def _push(expr):
+    """Statements pushing a 16-bit value (same write order as CPU.push_word)."""
+    return [
+        f"value = {expr}",
+        "sp = (registers.SP - 1) & 0xFFFF",
+        "registers.SP = sp",
+        "memory.set_value(sp, (value >> 8) & 0xFF)",
+        "sp = (sp - 1) & 0xFFFF",
+        "registers.SP = sp",
+        "memory.set_value(sp, value & 0xFF)",
+    ]
+
+
+def _pop():
+    """Statements popping a 16-bit value into `value` (as CPU.pop_word)."""
+    return [
+        "sp = registers.SP",
+        "low = memory.get_value(sp)",
+        "sp = (sp + 1) & 0xFFFF",
+        "registers.SP = sp",
+        "high = memory.get_value(sp)",
+        "registers.SP = (sp + 1) & 0xFFFF",
+        "value = (high << 8) | low",
+    ]
+
+
+def _conditional(info, cond_name, taken, lazy):
+    """Wrap `taken` statements in a condition; return taken/not-taken cycles."""
+    if lazy and cond_name in ("Z", "NZ"):
+        # Z is "low byte of r is zero" for every lazy record kind, so a
+        # pending record answers Z/NZ without being evaluated
+        lines = [
+            "lz = registers._lazy",
+            "z = not lz[3] & 0xFF if lz is not None else registers._f & 0x80",
+            f"if {'z' if cond_name == 'Z' else 'not z'}:",
+        ]
+    else:
+        lines = [f"if {_CONDITIONS[cond_name]}:"]
+    lines += ["    " + line for line in taken]
+    lines.append(f"    return {info['cycles'][0]}")
+    lines.append(f"return {info['cycles'][1]}")
+    return lines
+
+
+# --- Unprefixed templates ---------------------------------------------------
+
+def _gen_ld(info, lazy):
+    ops = info["operands"]
+    dst, src = ops[0], ops[1]
+    cycles = info["cycles"][0]
+    dname, sname = dst["name"], src["name"]
+
+    if len(ops) == 3:  # LD HL,SP+e8
+        return ["sp = registers.SP"] + \
+            _set16("HL", "(sp + (imm - 256 if imm > 127 else imm)) & 0xFFFF") + \
+            _flag_update(info, _SP_E8_FLAGS) + [f"return {cycles}"]
+    if dname in _R16 and dst["immediate"]:
+        if sname == "n16":  # LD rr,n16
+            return _set16(dname, "imm") + [f"return {cycles}"]
+        # LD SP,HL
+        return _set16(dname, _get16(sname)) + [f"return {cycles}"]
+    if dname == "a16" and sname == "SP":  # LD (a16),SP
+        return [
+            "sp = registers.SP",
+            "memory.set_value(imm, sp & 0xFF)",
+            "memory.set_value((imm + 1) & 0xFFFF, (sp >> 8) & 0xFF)",
+            f"return {cycles}",
+        ]
+
+    lines = [_write8(dst, _read8(src))] if dst["immediate"] else \
+        [f"value = {_read8(src)}", _write8(dst, "value")]
+    # LD (HL+),A / LD A,(HL+) and the decrement forms
+    for operand in (dst, src):
+        if operand.get("increment"):
+            lines += _set16("HL", f"({_get16('HL')} + 1) & 0xFFFF")
+        elif operand.get("decrement"):
+            lines += _set16("HL", f"({_get16('HL')} - 1) & 0xFFFF")
+    lines.append(f"return {cycles}")
+    return lines
+
+
+def _gen_ldh(info, lazy):
+    dst, src = info["operands"]
+    cycles = info["cycles"][0]
+    if dst["name"] == "A":
+        addr = "0xFF00 + imm" if src["name"] == "a8" else "0xFF00 + registers.C"
+        return [f"registers.A = memory.get_value({addr})", f"return {cycles}"]
+    addr = "0xFF00 + imm" if dst["name"] == "a8" else "0xFF00 + registers.C"
+    return [f"memory.set_value({addr}, registers.A)", f"return {cycles}"]
+
+
+def _lazy_alu(mnemonic):
+    """ALU result plus a pending flag record instead of an F update."""
+    if mnemonic in ("ADD", "ADC"):
+        expr, kind = "a + v + c" if mnemonic == "ADC" else "a + v", LAZY_ADD
+    elif mnemonic in ("SUB", "SBC", "CP"):
+        expr, kind = "a - v - c" if mnemonic == "SBC" else "a - v", LAZY_SUB
+    elif mnemonic == "AND":
+        expr, kind = "a & v", LAZY_AND
+    else:
+        expr, kind = f"a {'|' if mnemonic == 'OR' else '^'} v", LAZY_OR
+    lines = [f"r = {expr}"]
+    if mnemonic != "CP":
+        lines.append("registers.A = r & 0xFF")
+    lines.append(f"registers._lazy = ({kind}, a, v, r)")
+    return lines
+
+
+def _gen_alu(info, lazy):
+    mnemonic = info["mnemonic"]
+    src = info["operands"][1]
+    cycles = info["cycles"][0]
+    lines = ["a = registers.A", f"v = {_read8(src)}"]
+    if mnemonic in ("ADC", "SBC"):
+        lines.append("c = (registers.F >> 4) & 1")
+    if lazy:
+        return lines + _lazy_alu(mnemonic) + [f"return {cycles}"]
+    if mnemonic == "ADD":
+        lines += ["r = a + v"] + _flag_update(info, _ADD_FLAGS, "r & 0xFF")
+    elif mnemonic == "ADC":
+        lines += ["r = a + v + c"] + _flag_update(info, _ADC_FLAGS, "r & 0xFF")
+    elif mnemonic == "SUB":
+        lines += ["r = a - v"] + _flag_update(info, _SUB_FLAGS, "r & 0xFF")
+    elif mnemonic == "SBC":
+        lines += ["r = a - v - c"] + _flag_update(info, _SBC_FLAGS, "r & 0xFF")
+    elif mnemonic == "CP":
+        lines += ["r = a - v"] + _flag_update(info, _SUB_FLAGS)
+    else:
+        op = {"AND": "&", "OR": "|", "XOR": "^"}[mnemonic]
+        lines += [f"r = a {op} v"] + _flag_update(info, _LOGIC_FLAGS, "r")
+    lines.append(f"return {cycles}")
+    return lines
+
+
+def _gen_add(info, lazy):
+    dst = info["operands"][0]["name"]
+    if dst == "A":
+        return _gen_alu(info, lazy)
+    cycles = info["cycles"][0]
+    if dst == "SP":  # ADD SP,e8
+        return [
+            "sp = registers.SP",
+            "registers.SP = (sp + (imm - 256 if imm > 127 else imm)) & 0xFFFF",
+        ] + _flag_update(info, _SP_E8_FLAGS) + [f"return {cycles}"]
+    # ADD HL,rr
+    src = info["operands"][1]["name"]
+    return [f"hl = {_get16('HL')}", f"v = {_get16(src)}", "r = hl + v"] + \
+        _set16("HL", "r & 0xFFFF") + \
+        _flag_update(info, {"H": "(hl & 0xFFF) + (v & 0xFFF) > 0xFFF", "C": "r > 0xFFFF"}) + \
+        [f"return {cycles}"]
+
+
+def _gen_inc_dec(info, lazy):
+    operand = info["operands"][0]
+    name = operand["name"]
+    cycles = info["cycles"][0]
+    inc = info["mnemonic"] == "INC"
+    if name in _R16 and operand["immediate"]:
+        step = "+" if inc else "-"
+        return _set16(name, f"({_get16(name)} {step} 1) & 0xFFFF") + [f"return {cycles}"]
+    if lazy:
+        # INC/DEC keep C: resolve any pending record first so this one can
+        # be evaluated against a concrete F
+        return [
+            "if registers._lazy is not None:",
+            "    registers.F",
+            f"v = {_read8(operand)}",
+            f"r = (v {'+' if inc else '-'} 1) & 0xFF",
+            _write8(operand, "r"),
+            f"registers._lazy = ({LAZY_INC if inc else LAZY_DEC}, 0, v, r)",
+            f"return {cycles}",
+        ]
+    if inc:
+        lines = [f"v = {_read8(operand)}", "r = (v + 1) & 0xFF"]
+        flags = {"Z": "not r", "H": "(v & 0xF) == 0xF"}
+    else:
+        lines = [f"v = {_read8(operand)}", "r = (v - 1) & 0xFF"]
+        flags = {"Z": "not r", "H": "(v & 0xF) == 0"}
+    lines += [_write8(operand, "r")] + _flag_update(info, flags) + [f"return {cycles}"]
+    return lines
+
+
+def _gen_rotate_a(info, lazy):
+    mnemonic = info["mnemonic"]
+    lines = ["a = registers.A"]
+    if mnemonic == "RLCA":
+        lines += ["c = a >> 7", "r = ((a << 1) | c) & 0xFF"]
+    elif mnemonic == "RRCA":
+        lines += ["c = a & 1", "r = (a >> 1) | (c << 7)"]
+    elif mnemonic == "RLA":
+        lines += ["c = a >> 7", "r = ((a << 1) | ((registers.F >> 4) & 1)) & 0xFF"]
+    else:  # RRA
+        lines += ["c = a & 1", "r = (a >> 1) | (((registers.F >> 4) & 1) << 7)"]
+    lines += _flag_update(info, {"C": "c"}, "r") + [f"return {info['cycles'][0]}"]
+    return lines
+
+
+def _gen_daa(info, lazy):
+    # Mirrors misc_handlers.daa exactly (N kept, H cleared, Z from result)
+    return [
+        "a = registers.A",
+        "f = registers.F",
+        "c = f & 0x10",
+        "if not f & 0x40:",
+        "    if c or a > 0x99:",
+        "        a += 0x60",
+        "        c = 0x10",
+        "    if f & 0x20 or (a & 0x0F) > 0x09:",
+        "        a += 0x06",
+        "else:",
+        "    if c:",
+        "        a -= 0x60",
+        "    if f & 0x20:",
+        "        a -= 0x06",
+        "a &= 0xFF",
+    ] + _flag_update(info, {"Z": "not a", "C": "c"}, "a") + [f"return {info['cycles'][0]}"]
+
+
+def _gen_misc(info, lazy):
+    mnemonic = info["mnemonic"]
+    cycles = info["cycles"][0]
+    if mnemonic in ("NOP", "STOP"):
+        return [f"return {cycles}"]
+    if mnemonic == "CPL":
+        return _flag_update(info, {}, "~registers.A & 0xFF") + [f"return {cycles}"]
+    if mnemonic == "SCF":
+        return _flag_update(info, {}) + [f"return {cycles}"]
+    if mnemonic == "CCF":
+        return _flag_update(info, {"C": "not registers.F & 0x10"}) + [f"return {cycles}"]
+    if mnemonic == "DI":
+        return [
+            "interrupts = cpu.interrupts",
+            "interrupts.ime = False",
+            "interrupts.ime_pending = False",
+            f"return {cycles}",
+        ]
+    if mnemonic == "EI":
+        return ["cpu.interrupts.ime_pending = True", f"return {cycles}"]
+    if mnemonic == "HALT":
+        # Mirrors interrupt_handlers.halt (four IME/pending cases)
+        return [
+            "interrupts = cpu.interrupts",
+            "pending = memory.get_value(0xFF0F) & memory.get_value(0xFFFF)",
+            "ime_effective = interrupts.ime",
+            "if interrupts.ime_pending:",
+            "    interrupts.ime_pending = False",
+            "    interrupts.ime = True",
+            "    interrupts.ime_handled_by_instruction = True",
+            "    ime_effective = True",
+            "if pending and ime_effective:",
+            "    interrupts.halted = True",
+            "    for bit, addr in ((0x01, 0x40), (0x02, 0x48), (0x04, 0x50), (0x08, 0x58), (0x10, 0x60)):",
+            "        if pending & bit:",
+            f"            return {cycles} + interrupts.service_interrupt(cpu, addr, bit)",
+            "elif pending:",
+            "    interrupts.halt_bug = True",
+            "else:",
+            "    interrupts.halted = True",
+            f"return {cycles}",
+        ]
+    raise KeyError(mnemonic)
+
+
+def _gen_jump(info, lazy):
+    mnemonic = info["mnemonic"]
+    ops = info["operands"]
+    conditional = len(info["cycles"]) > 1
+    cond = ops[0]["name"] if conditional else None
+
+    if mnemonic == "JP":
+        if ops[-1]["name"] == "HL":
+            body = [f"registers.PC = {_get16('HL')}"]
+        else:
+            body = ["registers.PC = imm"]
+    elif mnemonic == "JR":
+        # No 16-bit mask, matching jump_handlers.jr_n
+        body = ["registers.PC = registers.PC + (imm - 256 if imm > 127 else imm)"]
+    elif mnemonic == "CALL":
+        body = _push("registers.PC") + ["registers.PC = imm"]
+    elif mnemonic in ("RET", "RETI"):
+        body = _pop() + ["registers.PC = value"]
+        if mnemonic == "RETI":
+            body.append("cpu.interrupts.ime = True")
+    else:  # RST
+        target = int(ops[0]["name"].lstrip("$"), 16)
+        body = _push("registers.PC & 0xFFFF") + [f"registers.PC = 0x{target:02X}"]
+
+    if conditional:
+        return _conditional(info, cond, body, lazy)
+    return body + [f"return {info['cycles'][0]}"]
+
+
+def _gen_stack(info, lazy):
+    name = info["operands"][0]["name"]
+    cycles = info["cycles"][0]
+    if info["mnemonic"] == "PUSH":
+        source = "(registers.A << 8) | registers.F" if name == "AF" else _get16(name)
+        return _push(source) + [f"return {cycles}"]
+    if name == "AF":  # set_register('AF') masks the low nibble of F
+        return _pop() + ["registers.A = high", "registers.F = low & 0xF0", f"return {cycles}"]
+    return _pop() + _set16(name, "value") + [f"return {cycles}"]
+
+
+_UNPREFIXED_TEMPLATES = {
+    "LD": _gen_ld,
+    "LDH": _gen_ldh,
+    "ADD": _gen_add,
+    "ADC": _gen_alu,
+    "SUB": _gen_alu,
+    "SBC": _gen_alu,
+    "AND": _gen_alu,
+    "XOR": _gen_alu,
+    "OR": _gen_alu,
+    "CP": _gen_alu,
+    "INC": _gen_inc_dec,
+    "DEC": _gen_inc_dec,
+    "RLCA": _gen_rotate_a,
+    "RRCA": _gen_rotate_a,
+    "RLA": _gen_rotate_a,
+    "RRA": _gen_rotate_a,
+    "DAA": _gen_daa,
+    "NOP": _gen_misc,
+    "STOP": _gen_misc,
+    "CPL": _gen_misc,
+    "SCF": _gen_misc,
+    "CCF": _gen_misc,
+    "DI": _gen_misc,
+    "EI": _gen_misc,
+    "HALT": _gen_misc,
+    "JP": _gen_jump,
+    "JR": _gen_jump,
+    "CALL": _gen_jump,
+    "RET": _gen_jump,
+    "RETI": _gen_jump,
+    "RST": _gen_jump,
+    "PUSH": _gen_stack,
+    "POP": _gen_stack,
+}
+
+
+# --- CB-prefixed templates --------------------------------------------------
+
+# Shift/rotate result and carry-out expressions in terms of v (and c_in)
+_CB_SHIFTS = {
+    "RLC": ("((v << 1) | (v >> 7)) & 0xFF", "v >> 7"),
+    "RRC": ("(v >> 1) | ((v & 1) << 7)", "v & 1"),
+    "RL": ("((v << 1) | ((registers.F >> 4) & 1)) & 0xFF", "v >> 7"),
+    "RR": ("(v >> 1) | (((registers.F >> 4) & 1) << 7)", "v & 1"),
+    "SLA": ("(v << 1) & 0xFF", "v >> 7"),
+    "SRA": ("(v >> 1) | (v & 0x80)", "v & 1"),
+    "SRL": ("v >> 1", "v & 1"),
+    "SWAP": ("((v << 4) | (v >> 4)) & 0xFF", "0"),
+}
+
+
+def _gen_cb(info, lazy):
+    mnemonic = info["mnemonic"]
+    ops = info["operands"]
+    target = ops[-1]
+    cycles = info["cycles"][0]
+    in_memory = not target["immediate"]
+    if in_memory:
+        lines = [f"hl = {_get16('HL')}", "v = memory.get_value(hl)"]
+        write = "memory.set_value(hl, {v})"
+    else:
+        lines = [f"v = registers.{target['name']}"]
+        write = f"registers.{target['name']} = {{v}}"
+
+    if mnemonic == "BIT":
+        mask = 1 << int(ops[0]["name"])
+        lines += _flag_update(info, {"Z": f"not v & 0x{mask:02X}"}) + [f"return {cycles}"]
+        return lines
+    if mnemonic in ("RES", "SET"):
+        mask = 1 << int(ops[0]["name"])
+        expr = f"v & 0x{~mask & 0xFF:02X}" if mnemonic == "RES" else f"v | 0x{mask:02X}"
+        lines += [f"r = {expr}", write.format(v="r"), f"return {cycles}"]
+        return lines
+    result, carry = _CB_SHIFTS[mnemonic]
+    lines += [f"r = {result}"]
+    lines += [write.format(v="r")] + _flag_update(info, {"Z": "not r", "C": carry}) + [f"return {cycles}"]
+    return lines
+
+
+# --- Assembly ----------------------------------------------------------------
+
+def _emit(name, body):
+    """Wrap a handler body in a def, binding registers/memory locals on demand."""
+    text = "\n".join(body)
+    prologue = []
+    if "registers." in text:
+        prologue.append("    registers = cpu.registers")
+    if "memory." in text:
+        prologue.append("    memory = cpu.memory")
+    return "\n".join(
+        [f"def {name}(cpu, imm):"] + prologue + ["    " + line for line in body]
+    )
+
+
+def generate_source(opcodes_db, lazy_flags=False):
+    """Return (source, unprefixed_names, cb_names) for all supported opcodes.
+
+    Name lists have 256 entries each; None marks opcodes with no template
+    (PREFIX and the ILLEGAL_* slots). With lazy_flags the 8-bit ALU and
+    INC/DEC handlers record pending flag work instead of writing F (see
+    src/cpu/lazy_flags.py); they require LazyFlagRegisters.
+    """
+    chunks = []
+    unprefixed = [None] * 256
+    cb = [None] * 256
+    for key, info in opcodes_db["unprefixed"].items():
+        template = _UNPREFIXED_TEMPLATES.get(info["mnemonic"])
+        if template is None:
+            continue
+        opcode = int(key, 16)
+        name = f"op_{opcode:02x}"
+        chunks.append(_emit(name, template(info, lazy_flags)))
+        unprefixed[opcode] = name
+    for key, info in opcodes_db["cbprefixed"].items():
+        opcode = int(key, 16)
+        name = f"cb_{opcode:02x}"
+        chunks.append(_emit(name, _gen_cb(info, lazy_flags)))
+        cb[opcode] = name
+    return "\n\n\n".join(chunks) + "\n", unprefixed, cb
+
+
+# Compiled handler tables keyed by generated source. Generating the source is
+# cheap; compiling it is not, and every CPU instance asks for the same tables.
+_compiled = {}
+
+
+def build_specialized_handlers(opcodes_db, lazy_flags=False):
+    """Generate and compile the specialized handlers.
+
+    Returns (unprefixed, cb): two 256-entry lists of handler(cpu, imm)
+    functions, with None for opcodes that have no handler. Handlers are
+    stateless, so the lists are shared by every CPU built from the same
+    opcode table.
+    """
+    source, unprefixed_names, cb_names = generate_source(opcodes_db, lazy_flags)
+    tables = _compiled.get(source)
+    if tables is None:
+        namespace = {}
+        exec(compile(source, "<specialized opcode handlers>", "exec"), namespace)
+        unprefixed = [namespace[name] if name else None for name in unprefixed_names]
+        cb = [namespace[name] if name else None for name in cb_names]
+        tables = _compiled[source] = (unprefixed, cb)
+    return tables
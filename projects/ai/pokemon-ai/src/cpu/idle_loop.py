@@ -0,0 +1,173 @@
+"""
+Idle-loop detection for the CPU run loops.
+
+Games often wait for something by polling in a tight loop:
+
+    wait:  LDH A,(0xFF44)     ; LY
+           CP 0x90
+           JR NZ,wait
+
+or by spinning on a WRAM flag that the V-Blank handler sets. Each pass
+re-reads the same values and leaves the CPU in the same state, so the
+interpreter burns millions of instructions that change nothing.
+
+analyze_idle_loop() decides, once per loop head, whether the code at the
+head is such a loop: a short straight-line body that writes no memory,
+touches no stack or interrupt state and ends in a JR/JP back to the head.
+The run loop then skips passes (CPU._skip_idle_loop) when it sees the CPU
+arrive at the head twice in a row with the same registers, with no timer
+or PPU event in between, and with every value the body reads being one
+that only changes at such an event (see is_stable_address). From that
+point every further pass is an exact repeat until the next event, so the
+cycle counter and components can jump straight past whole passes.
+"""
+
+# Longest loop body (head to end of the closing branch) considered, in bytes
+MAX_LOOP_BYTES = 16
+
+# Instructions that may close the loop: JR e8, JR cc,e8, JP a16, JP cc,a16
+_LOOP_BRANCHES = frozenset((0x18, 0x20, 0x28, 0x30, 0x38, 0xC2, 0xC3, 0xCA, 0xD2, 0xDA))
+
+# JP HL also closes a loop when HL holds the head. That is only known at run
+# time: the run loop applies an IdleLoop when the CPU lands on the head from
+# its branch, and two identical arrivals mean HL is the same every pass.
+JP_HL = 0xE9
+
+# Instructions a loop body may not contain: control flow, stack access and
+# instructions that change the run or interrupt state
+_BODY_EXCLUDED = frozenset(("JP", "JR", "CALL", "RET", "RETI", "RST", "PUSH", "POP",
+                            "HALT", "STOP", "EI", "DI"))
+
+# Instructions whose register operands are only read
+_READ_ONLY = frozenset(("CP", "BIT"))
+
+# Register operand name -> 8-bit registers it covers
+_REGISTER_PARTS = {
+    "A": ("A",), "B": ("B",), "C": ("C",), "D": ("D",), "E": ("E",), "H": ("H",), "L": ("L",),
+    "AF": ("A",), "BC": ("B", "C"), "DE": ("D", "E"), "HL": ("H", "L"), "SP": ("SP",),
+}
+
+
+class IdleLoop:
+    """A side-effect-free polling loop found at `head`.
+
+    `branch` is the address of the closing JR/JP. `reads` lists where the body
+    reads memory: an int for a fixed address, or the name of the register
+    (pair) holding the address — "HL", "BC", "DE", or "C" for LDH A,(C).
+    """
+
+    __slots__ = ("head", "branch", "reads")
+
+    def __init__(self, head, branch, reads):
+        self.head = head
+        self.branch = branch
+        self.reads = reads
+
+    def reads_stable(self, registers):
+        """Return True if every address the body reads is stable."""
+        for read in self.reads:
+            if read.__class__ is int:
+                address = read
+            elif read == "C":
+                address = 0xFF00 | registers.C
+            else:
+                address = getattr(registers, read)
+            if not is_stable_address(address):
+                return False
+        return True
+
+
+def is_stable_address(address):
+    """Return True if a read of address can only change at a timer/PPU event.
+
+    Within a run, memory only changes through CPU writes (none in an idle
+    loop, and interrupt handlers run only after an event) and component
+    ticks. LY/STAT change on PPU mode changes, IF on events, VRAM/OAM
+    accessibility follows the PPU mode, and the joypad only changes between
+    runs. DIV/TIMA count continuously and the APU status bits change when a
+    length counter expires, so polling those is never skipped.
+    """
+    if address < 0xFF00:
+        return True
+    return not (0xFF04 <= address <= 0xFF05 or 0xFF10 <= address <= 0xFF3F)
+
+
+def analyze_idle_loop(cpu, head):
+    """Decode the code at head and return an IdleLoop, or None.
+
+    The body is decoded straight through from head with the CPU's dispatch
+    table (for instruction sizes) and opcode metadata, up to the first JR/JP,
+    which must branch back to head (or be a JP HL, see JP_HL).
+    """
+    memory_get = cpu.memory.get_value
+    dispatch = cpu._dispatch
+    cb_dispatch = cpu._cb_dispatch
+    unprefixed_info = cpu._unprefixed_info
+    cb_info = cpu._cbprefixed_info
+
+    # Stay inside one ROM region, so the bank at head decides the whole body
+    region_end = 0x4000 if head < 0x4000 else 0x8000
+    reads = []
+    written = set()
+    address_registers = set()
+    addr = head
+    while addr - head < MAX_LOOP_BYTES:
+        opcode = memory_get(addr)
+        is_cb = opcode == 0xCB
+        if is_cb:
+            opcode = memory_get(addr + 1)
+            entry = cb_dispatch[opcode]
+            info = cb_info[opcode]
+            length = 2
+        else:
+            entry = dispatch[opcode]
+            info = unprefixed_info[opcode]
+            length = 1
+        if entry is None:
+            return None
+        length += entry[0]
+        if addr + length > region_end:
+            return None
+
+        if not is_cb and opcode == JP_HL:
+            if written & address_registers:
+                return None
+            return IdleLoop(head, addr, tuple(reads))
+        if not is_cb and opcode in _LOOP_BRANCHES:
+            if entry[0] == 1:
+                offset = memory_get(addr + 1)
+                target = (addr + 2 + (offset - 256 if offset > 127 else offset)) & 0xFFFF
+            else:
+                target = memory_get(addr + 1) | (memory_get(addr + 2) << 8)
+            if target != head or written & address_registers:
+                return None
+            return IdleLoop(head, addr, tuple(reads))
+
+        mnemonic = info["mnemonic"]
+        if mnemonic in _BODY_EXCLUDED or mnemonic.startswith("ILLEGAL"):
+            return None
+        operands = info["operands"]
+        if not operands and mnemonic in ("DAA", "CPL", "RLCA", "RRCA", "RLA", "RRA"):
+            written.add("A")
+        for i, operand in enumerate(operands):
+            name = operand["name"]
+            if operand["immediate"]:
+                if name in _REGISTER_PARTS and mnemonic not in _READ_ONLY:
+                    written.update(_REGISTER_PARTS[name])
+                continue
+            # Memory operand: the body may read memory but never write it
+            if operand.get("increment") or operand.get("decrement"):
+                return None
+            if (mnemonic != "BIT") if is_cb else (i == 0 and mnemonic != "CP"):
+                return None
+            if name == "a8":
+                reads.append(0xFF00 | memory_get(addr + length - 1))
+            elif name == "a16":
+                reads.append(memory_get(addr + length - 2) | (memory_get(addr + length - 1) << 8))
+            elif name in ("HL", "BC", "DE", "C"):
+                reads.append(name)
+                address_registers.update(_REGISTER_PARTS[name])
+            else:
+                return None
+        addr += length
+    return None
@@ -0,0 +1,66 @@
+"""
+Lazy flag evaluation for the CPU core.
+
+Most flag results are overwritten by the next ALU instruction before
+anything reads them. In lazy-flags mode the 8-bit ALU handlers (ADD, ADC,
+SUB, SBC, CP, AND, OR, XOR, INC, DEC) do not compute Z/N/H/C. Instead they
+record the operation, its operands and its result, and F is only derived
+when someone reads it through `registers.F`: conditional JP/JR/CALL/RET,
+PUSH AF, DAA, ADC/SBC (carry in), rotates through carry, get_flag(),
+get_register('AF'), save_state() and tests that inspect AF directly.
+
+The record is a 4-tuple (op, a, v, r):
+  a, v — the 8-bit operands (for INC/DEC, v is the old value)
+  r    — the unmasked result (a + v + carry, a - v - carry, a & v, ...)
+
+ADC/SBC fold their carry-in into r, so it can be recovered as r - a - v
+(or a - v - r) without storing a fifth field.
+
+Only one operation is ever pending. Every instruction that keeps some flags
+unchanged (INC/DEC keep C) reads F first, which resolves the previous
+record, so a record never depends on another record.
+"""
+
+LAZY_ADD = 0   # ADD / ADC
+LAZY_SUB = 1   # SUB / SBC / CP
+LAZY_AND = 2
+LAZY_OR = 3    # OR / XOR
+LAZY_INC = 4
+LAZY_DEC = 5
+
+
+def materialize_flags(f, record):
+    """Return F computed from a pending lazy record and the previous F.
+
+    The low nibble of F is kept as-is (set_flag() never touches it), and
+    INC/DEC keep the carry flag of the concrete F they were recorded on.
+    """
+    op, a, v, r = record
+    if op == LAZY_ADD:
+        flags = 0x80 if not r & 0xFF else 0
+        if (a & 0xF) + (v & 0xF) + (r - a - v) > 0xF:
+            flags |= 0x20
+        if r > 0xFF:
+            flags |= 0x10
+        return (f & 0x0F) | flags
+    if op == LAZY_SUB:
+        flags = 0xC0 if not r & 0xFF else 0x40
+        if (a & 0xF) - (v & 0xF) - (a - v - r) < 0:
+            flags |= 0x20
+        if r < 0:
+            flags |= 0x10
+        return (f & 0x0F) | flags
+    if op == LAZY_AND:
+        return (f & 0x0F) | (0xA0 if not r else 0x20)
+    if op == LAZY_OR:
+        return (f & 0x0F) | (0x80 if not r else 0)
+    if op == LAZY_INC:
+        flags = 0x80 if not r else 0
+        if (v & 0xF) == 0xF:
+            flags |= 0x20
+        return (f & 0x1F) | flags
+    # LAZY_DEC
+    flags = 0xC0 if not r else 0x40
+    if (v & 0xF) == 0:
+        flags |= 0x20
+    return (f & 0x1F) | flags
@@ -0,0 +1,146 @@
+"""
+Opcode metadata shared by every CPU instance.
+
+Opcodes.json describes every instruction (mnemonic, operands, size, cycle
+counts). The CPU turns it into 256-entry lookup tables: the raw opcode
+info per opcode, and the pre-built operand metadata the hand-written
+handlers consume. Those tables never change, so get_opcode_tables() builds
+them once per process and every CPU shares the same read-only lists.
+
+Opcodes.json is found relative to this file, not the working directory.
+The parsed database can also be kept in a versioned pickle next to the
+package (src/cpu/__pycache__, alongside Python's own bytecode cache). The
+cache is keyed by CACHE_VERSION and the JSON file's size and mtime, and is
+rebuilt when either changes. Writing it is best-effort: a read-only install
+just parses the JSON.
+"""
+
+import json
+import os
+import pickle
+
+# Opcodes.json lives at the project root, two levels above this package
+OPCODES_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Opcodes.json"))
+
+# Bump when the cached layout changes
+CACHE_VERSION = 1
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__",
+                          f"opcodes.v{CACHE_VERSION}.pickle")
+
+
+class OpcodeTables:
+    """Read-only opcode tables, shared by every CPU.
+
+    opcodes_db is the parsed Opcodes.json. unprefixed_info/cbprefixed_info
+    index its entries by opcode; unprefixed_meta/cbprefixed_meta hold the
+    build_opcode_meta() tuple per opcode (None for gaps).
+    """
+
+    __slots__ = ("opcodes_db", "unprefixed_info", "cbprefixed_info",
+                 "unprefixed_meta", "cbprefixed_meta")
+
+    def __init__(self, opcodes_db):
+        self.opcodes_db = opcodes_db
+
+        # Pre-index opcode info into 256-element arrays for O(1) lookup
+        # (eliminates f-string formatting + nested dict lookup per instruction)
+        self.unprefixed_info = [None] * 256
+        for key, info in opcodes_db["unprefixed"].items():
+            self.unprefixed_info[int(key, 16)] = info
+        self.cbprefixed_info = [None] * 256
+        for key, info in opcodes_db["cbprefixed"].items():
+            self.cbprefixed_info[int(key, 16)] = info
+
+        # Pre-build operand metadata per opcode: eliminates per-instruction
+        # dict creation, list building, len() checks, and "bytes" in checks.
+        self.unprefixed_meta = [None if info is None else build_opcode_meta(info)
+                                for info in self.unprefixed_info]
+        self.cbprefixed_meta = [None if info is None else build_opcode_meta(info)
+                                for info in self.cbprefixed_info]
+
+
+def build_opcode_meta(opcode_info):
+    """Pre-build operand metadata for a single opcode.
+
+    Returns (opcode_info, fetch_size, operand_list, fetch_idx) where:
+    - fetch_size: 0, 1, or 2 bytes to read from instruction stream
+    - operand_list: pre-built list of operand dicts (reused at runtime)
+    - fetch_idx: index into operand_list for the fetched-value operand (-1 if none)
+    """
+    operands = opcode_info["operands"]
+    is_conditional = len(opcode_info.get("cycles", [])) > 1
+
+    pre_ops = []
+    fetch_size = 0
+    fetch_idx = -1
+
+    for operand in operands:
+        name = operand["name"]
+        immediate = operand["immediate"]
+
+        if "bytes" in operand:
+            fetch_idx = len(pre_ops)
+            fetch_size = operand["bytes"]
+            pre_ops.append({
+                "name": name,
+                "value": 0,
+                "immediate": immediate,
+                "type": "immediate_address" if name == "a16" else "immediate_value",
+            })
+        else:
+            if is_conditional and name in ("Z", "NZ", "C", "NC"):
+                continue
+            pre_ops.append({
+                "name": name,
+                "value": name,
+                "immediate": immediate,
+                "type": "register" if immediate else "register_indirect",
+            })
+
+    return (opcode_info, fetch_size, pre_ops, fetch_idx)
+
+
+def load_opcodes_db(path=OPCODES_PATH, cache_path=CACHE_PATH):
+    """Return the parsed Opcodes.json, through the pickle cache if possible.
+
+    Pass cache_path=None to always parse the JSON.
+    """
+    stat = os.stat(path)
+    key = (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+    if cache_path is not None:
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached["key"] == key:
+                return cached["opcodes_db"]
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError):
+            pass
+
+    with open(path, "r") as f:
+        opcodes_db = json.load(f)
+
+    if cache_path is not None:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            # Write to a temporary name first so a concurrent reader never
+            # sees a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"key": key, "opcodes_db": opcodes_db}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return opcodes_db
+
+
+_tables = None
+
+
+def get_opcode_tables():
+    """Return the process-wide OpcodeTables, building them on first use."""
+    global _tables
+    if _tables is None:
+        _tables = OpcodeTables(load_opcodes_db())
+    return _tables
@@ -0,0 +1,90 @@
+"""
+CPU register file.
+
+Registers stores the eight 8-bit registers (A, F, B, C, D, E, H, L) and the
+16-bit SP and PC in __slots__. The register pairs AF/BC/DE/HL are not
+stored: they are properties computed from (and split back into) their two
+halves, so 8-bit accesses, by far the most common ones, are a plain
+attribute read or write.
+
+LazyFlagRegisters is the variant used in lazy-flags mode (see
+lazy_flags.py), where F may be pending as an unevaluated ALU record.
+"""
+
+from src.cpu.lazy_flags import materialize_flags
+
+
+class Registers:
+    __slots__ = ("A", "F", "B", "C", "D", "E", "H", "L", "SP", "PC")
+
+    def __init__(self):
+        self.A = self.F = 0
+        self.B = self.C = 0
+        self.D = self.E = 0
+        self.H = self.L = 0
+        self.SP = 0
+        self.PC = 0
+
+    @property
+    def AF(self):
+        return (self.A << 8) | self.F
+
+    @AF.setter
+    def AF(self, value):
+        self.A = (value >> 8) & 0xFF
+        self.F = value & 0xFF
+
+    @property
+    def BC(self):
+        return (self.B << 8) | self.C
+
+    @BC.setter
+    def BC(self, value):
+        self.B = (value >> 8) & 0xFF
+        self.C = value & 0xFF
+
+    @property
+    def DE(self):
+        return (self.D << 8) | self.E
+
+    @DE.setter
+    def DE(self, value):
+        self.D = (value >> 8) & 0xFF
+        self.E = value & 0xFF
+
+    @property
+    def HL(self):
+        return (self.H << 8) | self.L
+
+    @HL.setter
+    def HL(self, value):
+        self.H = (value >> 8) & 0xFF
+        self.L = value & 0xFF
+
+
+class LazyFlagRegisters(Registers):
+    """Register file whose F may be pending as a lazy ALU record.
+
+    `_f` holds the last concrete F; `_lazy` holds the pending record (or
+    None). Reading F (or AF) resolves the record; writing F discards it.
+    """
+
+    __slots__ = ("_f", "_lazy")
+
+    def __init__(self):
+        self._f = 0
+        self._lazy = None
+        super().__init__()
+
+    @property
+    def F(self):
+        lazy = self._lazy
+        if lazy is not None:
+            self._f = materialize_flags(self._f, lazy)
+            self._lazy = None
+        return self._f
+
+    @F.setter
+    def F(self, value):
+        self._f = value
+        self._lazy = None
@@ -0,0 +1,139 @@
+"""Keep audio in step with the sound card by nudging the APU's sample rate.
+
+The sound card plays samples by its own crystal, which never exactly
+matches the emulator's frame pacing. Trimming the queue whenever it grows
+(audible pops) or letting it run dry (gaps) are the two usual symptoms.
+With PygameFrontend(audio_sync=True) the audio device is the master
+clock instead:
+
+    MixerQueue  Feeds PCM to a pygame mixer Channel in fixed-size chunks
+                and estimates how many frames the device has left to
+                play: the fill level. Counts underruns (the device ran
+                out before the next chunk arrived).
+    AudioSync   Dynamic rate control. Compares a smoothed fill level with
+                the target and returns a rate adjustment of at most
+                ±APU.MAX_RATE_ADJUSTMENT for APU.set_rate_adjustment().
+                A queue running low makes the APU produce slightly more
+                samples per emulated frame, a full one slightly fewer.
+
+The main loop then waits for the fill level to drain back to the target
+(AudioSync.wait_time) rather than sleeping for a fixed frame time.
+"""
+
+import time
+
+from src.apu.apu import APU
+
+
+class MixerQueue:
+    """PCM on its way to one pygame mixer Channel, handed over in whole chunks.
+
+    A Channel plays one Sound and holds at most one more in its queue, and
+    the mixer pulls each into the device's buffer in bursts, so the
+    Channel's state alone says little about what is left to hear. The
+    queue keeps a timeline instead: each chunk plays for its duration
+    after the one before it, and the fill level is the pending PCM plus
+    what the timeline has left. What the Channel does show bounds the
+    timeline: an idle Channel has passed everything to the device (at most
+    a chunk left), and a queued Sound has not started (at least a chunk).
+    """
+
+    def __init__(self, channel, sample_rate, chunk_frames, make_sound, clock=time.perf_counter):
+        self._channel = channel
+        self._rate = sample_rate
+        self.chunk_frames = chunk_frames
+        self._chunk_bytes = chunk_frames * 4  # frames × 2 channels × 2 bytes
+        self._chunk_duration = chunk_frames / sample_rate
+        self._make_sound = make_sound
+        self._clock = clock
+        self._pending = bytearray()   # PCM not yet handed to the Channel
+        self._play_end = None         # clock() when the audio handed over runs out; None before any
+        self.underruns = 0
+        self.dropped_frames = 0
+
+    def write(self, pcm):
+        """Append PCM bytes and hand whole chunks to the Channel while it has room."""
+        self._pending += pcm
+        pending = self._pending
+        chunk_bytes = self._chunk_bytes
+        channel = self._channel
+        while len(pending) >= chunk_bytes:
+            if not channel.get_busy():
+                play = channel.play
+            elif channel.get_queue() is None:
+                play = channel.queue
+            else:
+                break
+            play(self._make_sound(buffer=bytes(pending[:chunk_bytes])))
+            del pending[:chunk_bytes]
+            now = self._clock()
+            if self._play_end is None:
+                self._play_end = now
+            elif self._play_end < now:
+                # The device played everything before this chunk arrived
+                self.underruns += 1
+                self._play_end = now
+            self._play_end += self._chunk_duration
+
+    def fill_frames(self):
+        """Estimated stereo frames the device has left before it runs dry."""
+        fill = len(self._pending) // 4
+        if self._play_end is not None:
+            now = self._clock()
+            channel = self._channel
+            if not channel.get_busy():
+                self._play_end = min(self._play_end, now + self._chunk_duration)
+            elif channel.get_queue() is not None:
+                self._play_end = max(self._play_end, now + self._chunk_duration)
+            fill += max(0, round((self._play_end - now) * self._rate))
+        return fill
+
+    def trim(self, max_frames):
+        """Drop the oldest pending frames beyond max_frames, counting them."""
+        excess = len(self._pending) // 4 - max_frames
+        if excess > 0:
+            del self._pending[:excess * 4]
+            self.dropped_frames += excess
+
+    def reset(self):
+        """Forget pending audio and the timeline (e.g. when muted): no underrun follows."""
+        self._pending.clear()
+        self._play_end = None
+
+
+class AudioSync:
+    """Dynamic rate control holding a MixerQueue's fill level at target_frames.
+
+    The adjustment is proportional to the smoothed distance from the
+    target, reaching max_adjustment when the queue is empty (or twice the
+    target), and comes in steps of 0.01% so the APU is only retuned when
+    it really changes.
+    """
+
+    def __init__(self, sample_rate, target_frames, max_adjustment=APU.MAX_RATE_ADJUSTMENT,
+                 smoothing=0.05):
+        self._rate = sample_rate
+        self.target_frames = target_frames
+        self._max_adjustment = max_adjustment
+        self._smoothing = smoothing   # Weight of each new fill level in the average
+        self._average = None
+        self.fill_frames = 0
+        self.rate_adjustment = 0.0
+
+    def update(self, fill_frames):
+        """Record a fill level; return the adjustment for APU.set_rate_adjustment()."""
+        self.fill_frames = fill_frames
+        average = self._average
+        if average is None:
+            average = float(fill_frames)
+        else:
+            average += (fill_frames - average) * self._smoothing
+        self._average = average
+        error = (self.target_frames - average) / self.target_frames
+        limit = self._max_adjustment
+        self.rate_adjustment = round(max(-limit, min(limit, error * limit)), 4)
+        return self.rate_adjustment
+
+    def wait_time(self, fill_frames):
+        """Seconds until the device has played the queue down to the target."""
+        return max(0.0, (fill_frames - self.target_frames) / self._rate)
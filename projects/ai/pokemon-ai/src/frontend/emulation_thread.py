@@ -0,0 +1,217 @@
+"""Run the GameBoy core on its own thread, apart from presentation.
+
+With PygameFrontend(threaded=True) the pygame thread only handles events,
+presents frames and feeds the mixer. An EmulationThread owns the GameBoy:
+
+    frames    At each V-Blank whose picture changed, the thread writes the
+              INDEX8 frame (see ppu/pixel_formats.py) and its palette into
+              the back slot of a FrameBuffers double buffer and swaps it to
+              the front. The presenter copies out of the front slot.
+    audio     The APU's 16-bit stereo PCM is drained after every frame and
+              copied into an AudioRing.
+    input     Joypad changes are queued as InputEvents stamped with the CPU
+              cycle they take effect at. The thread applies each one at the
+              first instruction boundary at or after its cycle and records
+              it in input_log, so replaying the log reproduces the run.
+
+Everything else that touches the GameBoy (save states, frameskip) is
+handed to the thread with call_soon() and runs between frames.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+from src.ppu import pixel_formats
+
+# Game Boy timing
+CYCLES_PER_FRAME = 70_224          # 154 scanlines × 456 T-cycles
+FRAME_DURATION = 70_224 / 4_194_304  # ~16.74ms → ~59.7 fps
+
+InputEvent = namedtuple("InputEvent", "cycle button pressed")
+
+
+class FrameBuffers:
+    """Two frame slots: the writer fills the back one, then swaps it to the front.
+
+    serial counts published frames. Readers hold the lock (via front())
+    while they copy a frame, so the writer never refills a slot being read.
+    """
+
+    def __init__(self, size=160 * 144):
+        self._slots = [bytearray(size), bytearray(size)]
+        self._colors = [None, None]
+        self._front = 0
+        self.serial = 0
+        self._ready = threading.Condition()
+
+    def publish(self, indices, colors):
+        """Write a frame into the back slot and make it the front one."""
+        back = 1 - self._front
+        self._slots[back][:] = indices
+        self._colors[back] = colors
+        with self._ready:
+            self._front = back
+            self.serial += 1
+            self._ready.notify_all()
+
+    def wait(self, serial, timeout):
+        """Wait up to timeout seconds for a frame newer than serial; return the latest serial."""
+        with self._ready:
+            if self.serial == serial:
+                self._ready.wait(timeout)
+            return self.serial
+
+    def front(self):
+        """Return a context manager yielding (indices, colors) of the front slot."""
+        return _FrontSlot(self)
+
+
+class _FrontSlot:
+    def __init__(self, buffers):
+        self._buffers = buffers
+
+    def __enter__(self):
+        buffers = self._buffers
+        buffers._ready.acquire()
+        return buffers._slots[buffers._front], buffers._colors[buffers._front]
+
+    def __exit__(self, *exc):
+        self._buffers._ready.release()
+        return False
+
+
+class AudioRing:
+    """Bounded FIFO of PCM bytes between the emulation and pygame threads.
+
+    When the reader falls behind by more than capacity bytes the oldest
+    audio is dropped and counted in dropped_bytes.
+    """
+
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._data = bytearray()
+        self._lock = threading.Lock()
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def write(self, pcm):
+        with self._lock:
+            data = self._data
+            data += pcm
+            excess = len(data) - self._capacity
+            if excess > 0:
+                # Keep whole stereo frames (4 bytes)
+                excess = (excess + 3) & ~3
+                del data[:excess]
+                self.dropped_bytes += excess
+
+    def read_all(self):
+        """Return and remove everything in the ring, as bytes."""
+        with self._lock:
+            pcm = bytes(self._data)
+            self._data.clear()
+        return pcm
+
+
+class EmulationThread(threading.Thread):
+    """Run a GameBoy in real time, publishing frames, audio and input logs.
+
+    `speed` frames are run per FRAME_DURATION (fast-forward runs several).
+    Call stop() and join() to end the thread; any exception from the core
+    is kept in error and ends the thread.
+    """
+
+    def __init__(self, gameboy, frames, audio, speed=1):
+        super().__init__(name="emulation", daemon=True)
+        self._gb = gameboy
+        self._frames = frames
+        self._audio = audio
+        self.speed = speed
+        self.input_log = []
+        self.error = None
+        self._inputs = deque()      # InputEvents posted by other threads
+        self._pending = []          # Events taken from _inputs, by cycle
+        self._calls = deque()       # (fn, args) to run between frames
+        self._stopping = threading.Event()
+        self._published_colors = None
+        # The cycle the next frame starts at, for stamping input
+        self.frame_start_cycle = gameboy.cpu.current_cycles
+
+    def post_input(self, button, pressed, cycle=None):
+        """Queue a joypad change; it applies at `cycle` (default: the next frame start)."""
+        if cycle is None:
+            cycle = self.frame_start_cycle
+        self._inputs.append(InputEvent(cycle, button, pressed))
+
+    def call_soon(self, fn, *args):
+        """Run fn(*args) on the emulation thread before its next frame."""
+        self._calls.append((fn, args))
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        ppu = self._gb.ppu
+        ppu.on_vblank = self._publish_frame
+        try:
+            deadline = time.perf_counter()
+            while not self._stopping.is_set():
+                speed = self.speed
+                for _ in range(speed):
+                    self._run_frame()
+                self._audio.write(self._gb.apu.drain_samples())
+
+                deadline += FRAME_DURATION
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    self._stopping.wait(remaining)
+                elif remaining < -FRAME_DURATION:
+                    deadline = time.perf_counter()  # Too far behind: don't race to catch up
+        except Exception as e:  # Surface it on the pygame thread instead of dying silently
+            self.error = e
+        finally:
+            ppu.on_vblank = None
+
+    def _run_frame(self):
+        """Run one frame's worth of cycles, applying input at its stamped cycles."""
+        calls = self._calls
+        while calls:
+            fn, args = calls.popleft()
+            fn(*args)
+
+        cpu = self._gb.cpu
+        start = cpu.current_cycles
+        end = start + CYCLES_PER_FRAME
+        self.frame_start_cycle = end
+        pending = self._pending
+        inputs = self._inputs
+        if inputs:
+            while inputs:
+                pending.append(inputs.popleft())
+            pending.sort(key=lambda event: event.cycle)
+
+        while True:
+            while pending and pending[0].cycle <= cpu.current_cycles:
+                self._apply(pending.pop(0))
+            target = pending[0].cycle if pending and pending[0].cycle < end else end
+            self._gb.run(max_cycles=target)
+            if cpu.current_cycles >= end:
+                break
+
+    def _apply(self, event):
+        joypad = self._gb.joypad
+        if event.pressed:
+            joypad.press(event.button)
+        else:
+            joypad.release(event.button)
+        self.input_log.append(InputEvent(self._gb.cpu.current_cycles, event.button, event.pressed))
+
+    def _publish_frame(self):
+        ppu = self._gb.ppu
+        colors = ppu.get_palette_colors()
+        if ppu.frame_changed or colors != self._published_colors:
+            self._published_colors = colors
+            self._frames.publish(ppu.get_frame(pixel_formats.INDEX8), colors)
@@ -1,18 +1,25 @@
 import os
 import pickle
-import struct
 import time
 import wave
 
 import pygame
 
+from src.apu.apu import APU
+from src.frontend.audio_sync import AudioSync, MixerQueue
+from src.frontend.emulation_thread import (
+    CYCLES_PER_FRAME,
+    FRAME_DURATION,
+    AudioRing,
+    EmulationThread,
+    FrameBuffers,
+)
+from src.ppu import pixel_formats
+
 # Game Boy LCD resolution
 GB_WIDTH = 160
 GB_HEIGHT = 144
 
-# Game Boy timing
-CYCLES_PER_FRAME = 70_224          # 154 scanlines × 456 T-cycles
-FRAME_DURATION = 70_224 / 4_194_304  # ~16.74ms → ~59.7 fps
 FAST_FORWARD_MULTIPLIER = 3        # Hold Space for 3x speed
 
 # Keyboard → joypad button mapping
@@ -34,31 +41,59 @@ class PygameFrontend:
     Thin rendering layer: owns the pygame window and event loop,
     delegates all emulation to the GameBoy instance passed at construction.
     The GameBoy core has no knowledge of this class.
+
+    With threaded=True the GameBoy runs on an EmulationThread (see
+    emulation_thread.py) and this thread only handles events, presents the
+    frames it publishes and feeds the mixer, so a slow present or a busy
+    event queue does not stall emulation or audio.
+
+    With audio_sync=True the sound card is the master clock (see
+    audio_sync.py): the APU's sample rate is nudged to hold the mixer
+    queue at a target latency, and the unthreaded loop paces itself by
+    the queue instead of by time.sleep(FRAME_DURATION).
     """
 
-    def __init__(self, gameboy, scale=3, wav_path=None, rom_path=None):
+    def __init__(self, gameboy, scale=3, wav_path=None, rom_path=None, threaded=False,
+                 audio_sync=False):
         self._gb = gameboy
         self._scale = scale
+        self._threaded = threaded
+        self._emulation = None   # EmulationThread while running threaded
+        self._audio_ring = None  # PCM from the emulation thread
         self._running = False
         self._fast_forward = False
         self._audio_enabled = True
         self._wav_path = wav_path
         self._wav_file = None
         self._rom_path = rom_path
+        self._presented_key = None  # (frame_hash(), palette colors) of the picture on screen
 
-        pygame.mixer.pre_init(frequency=48000, size=-16, channels=2, buffer=2048)
+        # The APU's output rate; None when its audio_mode is "off"
+        self._sample_rate = gameboy.apu.sample_rate
+        if self._sample_rate:
+            pygame.mixer.pre_init(frequency=self._sample_rate, size=-16, channels=2, buffer=2048)
         pygame.init()
-        try:
-            pygame.mixer.init()
-            self._audio_channel = pygame.mixer.Channel(0)
-        except pygame.error:
+        self._audio_channel = None
+        if self._sample_rate:
+            try:
+                pygame.mixer.init()
+                self._audio_channel = pygame.mixer.Channel(0)
+            except pygame.error:
+                self._audio_enabled = False
+        else:
             self._audio_enabled = False
-            self._audio_channel = None
 
         # Audio streaming: accumulate PCM bytes and feed chunks to the mixer.
-        # ~42ms chunks (2048 stereo frames) balance latency vs gap risk.
-        self._audio_buffer = bytearray()
-        self._audio_chunk_bytes = 2048 * 4  # 2048 frames × 2 channels × 2 bytes
+        # ~42ms chunks (2048 stereo frames at 48 kHz) balance latency vs gap risk.
+        self._audio_queue = None
+        self._audio_sync = None
+        if self._audio_channel is not None:
+            chunk_frames = 2048 * self._sample_rate // APU.SAMPLE_RATE
+            self._audio_queue = MixerQueue(self._audio_channel, self._sample_rate, chunk_frames,
+                                           pygame.mixer.Sound)
+            if audio_sync:
+                # One chunk playing and one queued keep the Channel busy
+                self._audio_sync = AudioSync(self._sample_rate, 2 * chunk_frames)
 
         self._screen = pygame.display.set_mode(
             (GB_WIDTH * scale, GB_HEIGHT * scale)
@@ -68,19 +103,33 @@ class PygameFrontend:
         # Pre-allocate a native-res surface matching the screen's pixel format
         # so we can scale directly into the screen each frame (no allocation).
         self._native_surface = pygame.Surface((GB_WIDTH, GB_HEIGHT)).convert()
+        # The PPU's INDEX8 frame (one palette index per pixel) is written
+        # straight into this 8-bit surface's pixels; SDL's blit converts it
+        # to the screen's native format in C.
+        self._index_surface = pygame.Surface((GB_WIDTH, GB_HEIGHT), depth=8)
+        self._index_palette = None  # palette last loaded into _index_surface
 
+        # Present-time metric: seconds spent in _render_frame per shown frame
+        self.last_present_time = 0.0
+        self._present_total = 0.0
+        self._present_count = 0
 
     def run(self):
         """Main emulation loop: run one frame, render, handle input, repeat."""
         self._running = True
 
-        if self._wav_path:
+        if self._wav_path and not self._sample_rate:
+            print("Audio is off: not recording a WAV file")
+        elif self._wav_path:
             self._wav_file = wave.open(self._wav_path, 'wb')
             self._wav_file.setnchannels(2)
             self._wav_file.setsampwidth(2)  # 16-bit
-            self._wav_file.setframerate(48000)
+            self._wav_file.setframerate(self._sample_rate)
 
         try:
+            if self._threaded:
+                self._run_threaded()
+                return
             while self._running:
                 frame_start = time.perf_counter()
 
@@ -88,8 +137,8 @@ class PygameFrontend:
                 self._handle_events()
 
                 # 2. Run emulation frames
-                #    Normal: 1 frame, then render. Fast-forward: run N frames,
-                #    only render the last one (rendering is the bottleneck).
+                #    Normal: 1 frame, then render. Fast-forward: run N frames;
+                #    the PPU's frameskip draws only one of them.
                 frames_to_run = FAST_FORWARD_MULTIPLIER if self._fast_forward else 1
                 for _ in range(frames_to_run):
                     target = self._gb.cpu.current_cycles + CYCLES_PER_FRAME
@@ -101,17 +150,87 @@ class PygameFrontend:
                 # 4. Render framebuffer to the window
                 self._render_frame()
 
-                # 5. Throttle to real-time
-                elapsed = time.perf_counter() - frame_start
-                remaining = FRAME_DURATION - elapsed
+                # 5. Throttle to real-time: by the sound card when synced to it
+                if self._audio_synced():
+                    fill = self._audio_queue.fill_frames()
+                    remaining = min(self._audio_sync.wait_time(fill), 2 * FRAME_DURATION)
+                else:
+                    elapsed = time.perf_counter() - frame_start
+                    remaining = FRAME_DURATION - elapsed
                 if remaining > 0:
                     time.sleep(remaining)
         finally:
+            if self._emulation is not None:
+                self._emulation.stop()
+                self._emulation.join()
+            if self._present_count:
+                stats = self.present_stats()
+                print(f"Present: {stats['frames']} frames, avg {stats['avg_ms']:.3f} ms, "
+                      f"last {stats['last_ms']:.3f} ms")
+            if self._audio_queue is not None:
+                stats = self.audio_stats()
+                print(f"Audio: latency {stats['latency_ms']:.1f} ms, {stats['underruns']} underruns, "
+                      f"{stats['dropped_frames']} frames dropped, "
+                      f"rate {stats['rate_adjustment'] * 100:+.2f}%")
+                self._audio_queue.reset()  # The mixer goes away with pygame
             if self._wav_file:
                 self._wav_file.close()
                 print(f"Audio saved to {self._wav_path}")
             pygame.quit()
 
+    def _run_threaded(self):
+        """Threaded main loop: the GameBoy runs on an EmulationThread."""
+        frames = FrameBuffers(GB_WIDTH * GB_HEIGHT)
+        # ~1s of PCM: the mixer side trims to 100ms itself, and a WAV
+        # recording should not lose audio to one slow present
+        self._audio_ring = AudioRing((self._sample_rate or 0) * 4)
+        emulation = self._emulation = EmulationThread(self._gb, frames, self._audio_ring)
+        emulation.start()
+
+        serial = 0
+        while self._running:
+            self._handle_events()
+            self._drain_audio()
+
+            # Sleeps until the emulation thread publishes a changed frame
+            latest = frames.wait(serial, FRAME_DURATION)
+            if latest != serial:
+                serial = latest
+                start = time.perf_counter()
+                # Copy out under the lock; blit, scale and flip after it
+                with frames.front() as (indices, colors):
+                    self._load_frame(indices, colors)
+                self._show_frame(start)
+
+            if not emulation.is_alive():
+                if emulation.error is not None:
+                    raise emulation.error
+                break
+
+    def _on_emulation_thread(self, fn, *args):
+        """Call fn(*args) where the GameBoy runs: between frames when threaded."""
+        if self._emulation is not None:
+            self._emulation.call_soon(fn, *args)
+        else:
+            fn(*args)
+
+    def _set_fast_forward(self, enabled):
+        self._fast_forward = enabled
+        # Only one of the frames run per present is shown
+        multiplier = FAST_FORWARD_MULTIPLIER if enabled else 1
+        if self._emulation is not None:
+            self._emulation.speed = multiplier
+        self._on_emulation_thread(self._gb.set_frameskip, multiplier)
+
+    def _set_button(self, button, pressed):
+        if self._emulation is not None:
+            # Stamped with the next frame's start cycle, so input is deterministic
+            self._emulation.post_input(button, pressed)
+        elif pressed:
+            self._gb.joypad.press(button)
+        else:
+            self._gb.joypad.release(button)
+
     def _handle_events(self):
         """Process pygame events: window close, key press/release."""
         for event in pygame.event.get():
@@ -121,27 +240,27 @@ class PygameFrontend:
                 if event.key == pygame.K_ESCAPE:
                     self._running = False
                 elif event.key == pygame.K_SPACE:
-                    self._fast_forward = True
+                    self._set_fast_forward(True)
                 elif event.key == pygame.K_m:
                     self._audio_enabled = not self._audio_enabled
                 elif event.key == pygame.K_F12:
                     self._take_screenshot()
                 elif (event.mod & pygame.KMOD_CTRL) and pygame.K_1 <= event.key <= pygame.K_9:
-                    self._save_state(event.key - pygame.K_1 + 1)
+                    self._on_emulation_thread(self._save_state, event.key - pygame.K_1 + 1)
                 elif not (event.mod & (pygame.KMOD_CTRL | pygame.KMOD_ALT | pygame.KMOD_SHIFT)) \
                         and pygame.K_1 <= event.key <= pygame.K_9:
-                    self._load_state(event.key - pygame.K_1 + 1)
+                    self._on_emulation_thread(self._load_state, event.key - pygame.K_1 + 1)
                 else:
                     button = KEY_MAP.get(event.key)
                     if button:
-                        self._gb.joypad.press(button)
+                        self._set_button(button, True)
             elif event.type == pygame.KEYUP:
                 if event.key == pygame.K_SPACE:
-                    self._fast_forward = False
+                    self._set_fast_forward(False)
                 else:
                     button = KEY_MAP.get(event.key)
                     if button:
-                        self._gb.joypad.release(button)
+                        self._set_button(button, False)
 
     def _take_screenshot(self):
         """Save the current screen to a screenshots directory next to the ROM."""
@@ -188,51 +307,113 @@ class PygameFrontend:
             print(f"Failed to load state slot {slot}: {e}")
 
     def _drain_audio(self):
-        """Convert APU sample buffer to PCM for playback and/or WAV export."""
-        samples = self._gb.apu.drain_samples()
-        if not samples:
+        """Queue the APU's PCM for playback and/or WAV export."""
+        if self._audio_ring is not None:
+            pcm_bytes = self._audio_ring.read_all()
+        else:
+            pcm_bytes = self._gb.apu.drain_samples()
+        if not pcm_bytes:
             return
 
-        # Batch-convert float pairs to interleaved int16 PCM bytes.
-        # clamp to [-1, 1] then scale to int16 range.
-        clamp = max
-        pcm_values = []
-        for left, right in samples:
-            pcm_values.append(int(clamp(-1.0, min(1.0, left)) * 32767))
-            pcm_values.append(int(clamp(-1.0, min(1.0, right)) * 32767))
-        pcm_bytes = struct.pack(f'<{len(pcm_values)}h', *pcm_values)
-
         if self._wav_file:
             self._wav_file.writeframes(pcm_bytes)
 
-        audio_buf = self._audio_buffer
-        audio_buf.extend(pcm_bytes)
-
-        if self._audio_enabled and self._audio_channel is not None:
-            # Cap buffer to ~100ms to prevent latency buildup during fast-forward
-            max_bytes = 48000 * 4 // 10  # 100ms of stereo int16
-            if len(audio_buf) > max_bytes:
-                del audio_buf[:len(audio_buf) - max_bytes]
-
-            chunk_bytes = self._audio_chunk_bytes
-            while len(audio_buf) >= chunk_bytes:
-                chunk = bytes(audio_buf[:chunk_bytes])
-                del audio_buf[:chunk_bytes]
-                sound = pygame.mixer.Sound(buffer=chunk)
-                if not self._audio_channel.get_busy():
-                    self._audio_channel.play(sound)
-                else:
-                    self._audio_channel.queue(sound)
-                    break
+        queue = self._audio_queue
+        if queue is None:
+            return
+        if not self._audio_enabled:
+            queue.reset()  # Muted: start afresh when unmuted
+            return
+        queue.write(pcm_bytes)
+
+        if self._audio_synced():
+            sync = self._audio_sync
+            previous = sync.rate_adjustment
+            adjustment = sync.update(queue.fill_frames())
+            if adjustment != previous:
+                self._on_emulation_thread(self._gb.apu.set_rate_adjustment, adjustment)
+        else:
+            # Cap pending audio to ~100ms to prevent latency buildup during fast-forward
+            queue.trim(self._sample_rate // 10)
+
+    def _audio_synced(self):
+        """Whether the sound card paces audio now (not muted or fast-forwarding)."""
+        return self._audio_sync is not None and self._audio_enabled and not self._fast_forward
+
+    def audio_stats(self):
+        """Return audio queue metrics.
+
+        fill_frames and latency_ms are what the sound card has left to play,
+        underruns counts the times it ran dry, dropped_frames the frames
+        trimmed from the queue, and rate_adjustment the APU's current nudge
+        (0.001 = 0.1% more samples).
+        """
+        queue = self._audio_queue
+        if queue is None:
+            return {'fill_frames': 0, 'latency_ms': 0.0, 'underruns': 0,
+                    'dropped_frames': 0, 'rate_adjustment': 0.0}
+        fill = queue.fill_frames()
+        return {
+            'fill_frames': fill,
+            'latency_ms': fill * 1000 / self._sample_rate,
+            'underruns': queue.underruns,
+            'dropped_frames': queue.dropped_frames,
+            'rate_adjustment': self._audio_sync.rate_adjustment if self._audio_sync else 0.0,
+        }
 
     def _render_frame(self):
         """Blit the GB framebuffer onto the pygame window."""
-        buf = self._gb.ppu.get_color_buffer()
-        image = pygame.image.frombuffer(buf, (GB_WIDTH, GB_HEIGHT), 'RGB')
-        # Blit native-res image into the pre-allocated surface (matching the
-        # screen's pixel format) so we can scale directly into the screen.
-        self._native_surface.blit(image, (0, 0))
+        # Menus and text boxes often sit on the same picture for many frames.
+        # The hash covers the pixel codes only: a color palette change with
+        # the same codes is a new picture too.
+        ppu = self._gb.ppu
+        colors = ppu.get_palette_colors()
+        key = (ppu.frame_hash(), colors)
+        if key == self._presented_key:
+            return
+        self._presented_key = key
+        start = time.perf_counter()
+        self._load_frame(ppu.get_frame(pixel_formats.INDEX8), colors)
+        self._show_frame(start)
+
+    def _load_frame(self, indices, colors):
+        """Write an INDEX8 frame and its palette into the 8-bit surface."""
+        surface = self._index_surface
+        if colors != self._index_palette:
+            self._index_palette = colors
+            surface.set_palette(colors)
+        indices = bytes(indices)  # write() takes read-only buffers; free for bytes
+        pixels = surface.get_buffer()
+        pitch = surface.get_pitch()
+        if pitch == GB_WIDTH:
+            pixels.write(indices, 0)
+        else:
+            for y in range(GB_HEIGHT):
+                pixels.write(indices[y * GB_WIDTH:(y + 1) * GB_WIDTH], y * pitch)
+        del pixels  # unlock the surface before blitting
+
+    def _show_frame(self, start):
+        """Scale the loaded frame onto the window; start is when presenting began."""
+        self._native_surface.blit(self._index_surface, (0, 0))
+        # Integer factor: every GB pixel becomes a scale x scale block
         pygame.transform.scale(self._native_surface,
                                (GB_WIDTH * self._scale, GB_HEIGHT * self._scale),
                                self._screen)
         pygame.display.flip()
+
+        self.last_present_time = elapsed = time.perf_counter() - start
+        self._present_total += elapsed
+        self._present_count += 1
+
+    def present_stats(self):
+        """Return present-time statistics for the frames shown so far.
+
+        A dict with 'frames' (frames presented; unchanged frames are not
+        presented), 'last_ms' and 'avg_ms'.
+        """
+        count = self._present_count
+        return {
+            'frames': count,
+            'last_ms': self.last_present_time * 1000,
+            'avg_ms': self._present_total / count * 1000 if count else 0.0,
+        }
@@ -6,6 +6,7 @@ from src.ppu.ppu import PPU
 from src.joypad.joypad import Joypad
 from src.apu.apu import APU
 from src.cartridge.gb_cartridge import Cartridge
+from src.scheduler.scheduler import Scheduler
 from src.ppu.dmg_palettes import get_palette
 
 
@@ -41,18 +42,27 @@ class GameBoy:
        cross-references to other components, so it could technically be loaded
        at any point after Memory, but we keep it here for consistency.
 
-    5. Cartridge LAST (via load_cartridge) — optional, loaded at runtime when a
+    5. Joypad, PPU and APU next, then the optional event scheduler, which
+       needs references to the timer, PPU and APU.
+
+    6. Cartridge LAST (via load_cartridge) — optional, loaded at runtime when a
        ROM file is provided. On real hardware, the cartridge is inserted before
        power-on, but in our emulator it can be loaded at any time since it only
        affects Memory's read/write dispatch for the ROM range (0x0000-0x7FFF).
     """
 
-    def __init__(self):
+    def __init__(self, compile_blocks=False, lazy_flags=False, event_scheduler=False,
+                 skip_idle_loops=False, numpy_renderer=False, numpy_audio=False,
+                 audio_mode="full", low_audio_rate=22050):
         # Step 1: Memory is the shared bus — must be created first.
         self.memory = Memory()
 
         # Step 2: CPU — constructor wires memory._cpu = self for interrupt dispatch.
-        self.cpu = CPU(memory=self.memory)
+        # compile_blocks enables the basic-block compiler (see cpu/block_compiler.py);
+        # lazy_flags defers ALU flag computation (see cpu/lazy_flags.py);
+        # skip_idle_loops fast-forwards polling loops (see cpu/idle_loop.py).
+        self.cpu = CPU(memory=self.memory, compile_blocks=compile_blocks, lazy_flags=lazy_flags,
+                       skip_idle_loops=skip_idle_loops)
 
         # Step 3: Timer — load_timer() wires the bidirectional references:
         #   memory._timer (I/O dispatch), timer._memory (IF writes), cpu._timer (tick calls)
@@ -68,13 +78,25 @@ class GameBoy:
         self.memory.load_joypad(self.joypad)
 
         # Step 6: PPU — load_ppu() wires memory._ppu (I/O dispatch for 0xFF40-0xFF4B).
-        self.ppu = PPU()
+        # numpy_renderer draws whole frames at V-Blank (see ppu/frame_renderer.py).
+        self.ppu = PPU(numpy_renderer=numpy_renderer)
         self.memory.load_ppu(self.ppu)
 
         # Step 7: APU — load_apu() wires memory._apu (I/O dispatch), cpu._apu (tick calls).
-        self.apu = APU()
+        # numpy_audio synthesizes samples in blocks (see apu/block_synth.py);
+        # audio_mode "off" / "low" / "full" trades sound for speed (see APU).
+        self.apu = APU(numpy_synthesis=numpy_audio, audio_mode=audio_mode,
+                       low_sample_rate=low_audio_rate)
         self.memory.load_apu(self.apu)
 
+        # Step 8 (optional): event scheduler — replaces the per-instruction
+        # timer/PPU/APU ticks with catch-up on events and register access.
+        # Needs all three components, so it is wired last.
+        self.scheduler = None
+        if event_scheduler:
+            self.scheduler = Scheduler(self.timer, self.ppu, self.apu)
+            self.memory.load_scheduler(self.scheduler)
+
         # Cartridge is not loaded here — call load_cartridge() with a ROM path.
         self.cartridge = None
 
@@ -147,7 +169,24 @@ class GameBoy:
         self.apu.load_state(state['apu'])
         if self.cartridge and state['cartridge'] is not None:
             self.cartridge.load_state(state['cartridge'])
+            self.memory.map_banks()
+
+    def set_rendering(self, enabled):
+        """Turn PPU drawing on or off; timing and interrupts are unaffected."""
+        self.ppu.set_rendering(enabled)
+
+    def set_frameskip(self, n):
+        """Draw only one frame in every n (1 = every frame)."""
+        self.ppu.set_frameskip(n)
 
     def get_framebuffer(self):
-        """Return the PPU's 160x144 framebuffer (shade values 0-3)."""
+        """Return the PPU's 160x144 framebuffer view (shade values 0-3, [y, x])."""
         return self.ppu.get_framebuffer()
+
+    def get_semantic_observation(self):
+        """Return tile grids and sprites on screen (see PPU.get_semantic_observation())."""
+        return self.ppu.get_semantic_observation()
+
+    def get_frame(self, pixel_format="RGB24", downscale=False):
+        """Return the current frame as bytes (see PPU.get_frame() for formats)."""
+        return self.ppu.get_frame(pixel_format, downscale)
@@ -1,3 +1,11 @@
+from src.cartridge.mbc import rom_bank_view
+
+
+def _split_pages(view):
+    """Split a bank view into its 256-byte page views."""
+    return [view[offset:offset + 0x100] for offset in range(0, len(view), 0x100)]
+
+
 class Memory:
     """
     Minimal GameBoy memory model following the official memory map.
@@ -16,6 +24,16 @@ class Memory:
       * 0xFF00-0xFF7F : I/O Registers
       * 0xFF80-0xFFFE : High RAM (HRAM)
       * 0xFFFF       : Interrupt Enable register
+
+    Accesses are dispatched through a page table: one entry per 256-byte
+    page, holding a memoryview when the page can be read (or written)
+    directly — ROM in the current bank, WRAM, echo RAM — or None when a
+    handler has to run: MBC registers, external RAM, VRAM/OAM (whose
+    accessibility follows the PPU mode) and the I/O page. 0xFFxx accesses
+    go through a second 256-entry table with one handler per register.
+    The tables are rebuilt when a component is loaded. The switchable ROM
+    and external RAM pages are re-pointed at the MBC's active bank views
+    when it changes bank (see map_banks()).
     """
 
     def __init__(self):
@@ -30,6 +48,15 @@ class Memory:
         self._ppu = None
         self._joypad = None
         self._apu = None
+        self._scheduler = None  # Event scheduler, if enabled (load_scheduler)
+        # Block compiler support: one byte per address, non-zero where a
+        # compiled RAM block was decoded from. Writes to those bytes drop the
+        # CPU's RAM block cache. _code_dirty tells a running block to return
+        # after a write that may change the code it was compiled from.
+        self._code_map = bytearray(0x10000)
+        self._code_dirty = False
+        self._cpu = None  # Set by CPU.__init__
+        self._build_pages()
 
     def load_cartridge(self, cartridge):
         """Load a cartridge into the memory bus.
@@ -41,6 +68,7 @@ class Memory:
         self._cartridge = cartridge
         self._mbc = cartridge._mbc
         self._rom_data = cartridge._mbc._rom_data
+        self._build_pages()
 
     def load_serial(self, serial):
         """Load a serial port handler into the memory bus.
@@ -48,6 +76,7 @@ class Memory:
         Reads/writes to 0xFF01-0xFF02 are delegated to the serial handler.
         """
         self._serial = serial
+        self._build_pages()
 
     def load_timer(self, timer):
         """Load a timer into the memory bus.
@@ -62,6 +91,7 @@ class Memory:
         """
         self._timer = timer
         self._timer._memory = self
+        self._build_pages()
         # Wire CPU's timer reference if CPU has already been created.
         # In normal usage (via GameBoy class), CPU always exists by this point.
         # The guard handles the edge case of unit tests that create Memory + Timer
@@ -78,6 +108,7 @@ class Memory:
         """
         self._joypad = joypad
         self._joypad._memory = self
+        self._build_pages()
 
     def load_ppu(self, ppu):
         """Load a PPU into the memory bus.
@@ -88,6 +119,7 @@ class Memory:
         """
         self._ppu = ppu
         self._ppu._memory = self
+        self._build_pages()
         if hasattr(self, '_cpu') and self._cpu:
             self._cpu._ppu = ppu
 
@@ -98,14 +130,40 @@ class Memory:
         The CPU gets a reference for tick() calls.
         """
         self._apu = apu
+        self._build_pages()
         if hasattr(self, '_cpu') and self._cpu:
             self._cpu._apu = apu
 
+    def load_scheduler(self, scheduler):
+        """Load an event scheduler into the memory bus.
+
+        With a scheduler the timer, PPU and APU are no longer ticked after
+        every instruction; they are caught up to the current cycle here,
+        before the CPU accesses their registers (or VRAM/OAM, whose access
+        depends on the PPU mode). See src/scheduler/scheduler.py.
+        """
+        self._scheduler = scheduler
+        self._build_pages()
+        if hasattr(self, '_cpu') and self._cpu:
+            self._cpu._scheduler = scheduler
+
     def save_state(self):
         return {'memory': bytes(self.memory)}
 
     def load_state(self, state):
-        self.memory = bytearray(state['memory'])
+        # Copy in place: the page tables hold views of this array
+        self.memory[:] = state['memory']
+        if self._ppu is not None:
+            self._ppu.invalidate_tiles()
+            self._ppu.invalidate_sprites()
+        if getattr(self, '_cpu', None):
+            self._cpu.invalidate_ram_blocks()
+
+    def _invalidate_code(self, address):
+        """A write hit compiled code at address: drop the RAM blocks covering
+        it, stop the running block."""
+        self._code_dirty = True
+        self._cpu._on_code_write(address)
 
     def _map_address(self, address: int) -> int:
         """
@@ -128,56 +186,14 @@ class Memory:
         """
         if not 0 <= address <= 0xFFFF:
             raise ValueError(f"Address out of range: {address:#06X}")
-        # Fast path: ROM range (most frequent — instruction fetches)
-        if address <= 0x7FFF:
-            rom_data = self._rom_data
-            if rom_data is not None:
-                if address <= 0x3FFF:
-                    return rom_data[address]
-                offset = (self._mbc._rom_bank * 0x4000) + (address - 0x4000)
-                return rom_data[offset] if offset < len(rom_data) else 0xFF
-            return self.memory[address]
-
-        # Fast path: WRAM, HRAM, and most RAM reads
-        if address < 0xFE00:
-            if 0xA000 <= address <= 0xBFFF and self._cartridge is not None:
-                return self._cartridge.read(address)
-            # VRAM access restriction (mode 3)
-            if 0x8000 <= address <= 0x9FFF and self._ppu is not None \
-                    and (self._ppu._lcdc & 0x80) and self._ppu._mode == 3:
-                return 0xFF
-            # Echo RAM
-            if 0xE000 <= address <= 0xFDFF:
-                return self.memory[address - 0x2000]
-            return self.memory[address]
-
-        # OAM access restriction (modes 2/3)
-        if 0xFE00 <= address <= 0xFE9F:
-            if self._ppu is not None and (self._ppu._lcdc & 0x80) \
-                    and self._ppu._mode in (2, 3):
-                return 0xFF
-            return self.memory[address]
-
-        # I/O registers (0xFF00-0xFF4B) and special registers
-        if address == 0xFF0F:
-            # IF register: mask to 5 bits only when CPU is wired up
-            if self._cpu:
-                return self.memory[0xFF0F] & 0x1F
-            return self.memory[0xFF0F]
-        if address == 0xFFFF:
-            return self.memory[0xFFFF]
-        if address == 0xFF00 and self._joypad is not None:
-            return self._joypad.read(address)
-        if 0xFF01 <= address <= 0xFF02 and self._serial is not None:
-            return self._serial.read(address)
-        if 0xFF04 <= address <= 0xFF07 and self._timer is not None:
-            return self._timer.read(address)
-        if 0xFF10 <= address <= 0xFF3F and self._apu is not None:
-            return self._apu.read(address)
-        if 0xFF40 <= address <= 0xFF4B and self._ppu is not None:
-            return self._ppu.read(address)
-
-        return self.memory[address]
+        # Fast path: ROM, WRAM, echo RAM — one page lookup and one index
+        page = self._read_pages[address >> 8]
+        if page is not None:
+            return page[address & 0xFF]
+        # I/O registers, HRAM and IE: per-register handler or direct read
+        if address >= 0xFF00:
+            return self._io_read[address & 0xFF](address)
+        return self._read_handlers[address >> 8](address)
 
     def set_value(self, address: int, value: int):
         """
@@ -185,61 +201,241 @@ class Memory:
         """
         if not 0 <= address <= 0xFFFF:
             raise ValueError(f"Address out of range: {address:#06X}")
-        value = value & 0xFF
-
-        # ROM range: forward to cartridge for MBC register handling
-        if address <= 0x7FFF:
-            if self._cartridge is not None:
-                self._cartridge.write(address, value)
-            else:
-                self.memory[address] = value
+        # Fast path: WRAM (and ROM/external RAM without a cartridge)
+        page = self._write_pages[address >> 8]
+        if page is not None:
+            page[address & 0xFF] = value & 0xFF
+            if self._code_map[address]:
+                self._invalidate_code(address)
             return
+        if address >= 0xFF00:
+            self._io_write[address & 0xFF](address, value & 0xFF)
+            return
+        self._write_handlers[address >> 8](address, value & 0xFF)
 
-        # Fast path: WRAM, VRAM, external RAM
-        if address < 0xFE00:
-            if 0xA000 <= address <= 0xBFFF and self._cartridge is not None:
-                self._cartridge.write(address, value)
-                return
-            # VRAM access restriction (mode 3)
-            if 0x8000 <= address <= 0x9FFF and self._ppu is not None \
-                    and (self._ppu._lcdc & 0x80) and self._ppu._mode == 3:
-                return
-            # Echo RAM
-            if 0xE000 <= address <= 0xFDFF:
-                self.memory[address - 0x2000] = value
-                return
-            self.memory[address] = value
+    # ------------------------------------------------------------------ #
+    #  Page tables
+    # ------------------------------------------------------------------ #
+
+    def _build_pages(self):
+        """Rebuild the page and I/O tables from the loaded components.
+
+        Each of the 256 pages gets a memoryview to read (and to write) it
+        directly, or None and a handler. Called whenever a component is
+        loaded; map_banks() re-points just the banked cartridge pages.
+        """
+        mem = memoryview(self.memory)
+        ram_pages = [mem[p << 8:(p + 1) << 8] for p in range(0x100)]
+        read_pages = list(ram_pages)
+        write_pages = list(ram_pages)
+        read_handlers = [None] * 0x100
+        write_handlers = [None] * 0x100
+
+        # 0x0000-0x7FFF: cartridge ROM, MBC registers on write
+        if self._rom_data is not None:
+            read_pages[0x00:0x40] = _split_pages(rom_bank_view(self._rom_data, 0))
+            for p in range(0x80):
+                write_pages[p] = None
+                write_handlers[p] = self._write_rom
+            self._bank_pages = {}
+
+        # 0x8000-0x9FFF: VRAM, inaccessible in mode 3
+        if self._ppu is not None:
+            for p in range(0x80, 0xA0):
+                read_pages[p] = write_pages[p] = None
+                read_handlers[p] = self._read_vram
+                write_handlers[p] = self._write_vram
+
+        # 0xA000-0xBFFF: external RAM (and RTC), banked by the MBC. These
+        # handlers cover disabled RAM and RTC registers; map_banks() maps
+        # an enabled RAM bank directly.
+        if self._cartridge is not None:
+            for p in range(0xA0, 0xC0):
+                read_pages[p] = write_pages[p] = None
+                read_handlers[p] = self._cartridge.read
+                write_handlers[p] = self._cartridge.write
+
+        # 0xE000-0xFDFF: echo RAM mirrors C000-DDFF
+        for p in range(0xE0, 0xFE):
+            read_pages[p] = ram_pages[p - 0x20]
+            write_pages[p] = None
+            write_handlers[p] = self._write_echo
+
+        # 0xFE00-0xFEFF: OAM, inaccessible in modes 2/3
+        if self._ppu is not None:
+            read_pages[0xFE] = write_pages[0xFE] = None
+            read_handlers[0xFE] = self._read_oam
+            write_handlers[0xFE] = self._write_oam
+
+        # 0xFF00-0xFFFF: I/O registers, HRAM, IE
+        read_pages[0xFF] = write_pages[0xFF] = None
+        self._io_read, self._io_write = self._build_io_tables()
+
+        self._read_pages = read_pages
+        self._write_pages = write_pages
+        self._read_handlers = read_handlers
+        self._write_handlers = write_handlers
+        self._mapped_ram_view = None
+        self.map_banks()
+
+    def _build_io_tables(self):
+        """Return the 0xFFxx (read, write) handler tables.
+
+        Registers without a component read and write the memory array;
+        with a scheduler, timer/APU/PPU registers catch up first.
+        """
+        io_read = [self.memory.__getitem__] * 0x100
+        io_write = [self._write_ram] * 0x100
+        io_read[0x0F] = self._read_if
+        io_write[0x0F] = self._write_if
+        if self._joypad is not None:
+            io_read[0x00] = self._joypad.read
+            io_write[0x00] = self._joypad.write
+        if self._serial is not None:
+            io_read[0x01] = io_read[0x02] = self._serial.read
+            io_write[0x01] = io_write[0x02] = self._serial.write
+        scheduled = self._scheduler is not None
+        if self._timer is not None:
+            for r in range(0x04, 0x08):
+                io_read[r] = self._read_timer if scheduled else self._timer.read
+                io_write[r] = self._write_timer if scheduled else self._timer.write
+        if self._apu is not None:
+            for r in range(0x10, 0x40):
+                io_read[r] = self._read_apu if scheduled else self._apu.read
+                io_write[r] = self._write_apu if scheduled else self._apu.write
+        if self._ppu is not None:
+            for r in range(0x40, 0x4C):
+                io_read[r] = self._read_ppu if scheduled else self._ppu.read
+                io_write[r] = self._write_ppu if scheduled else self._ppu.write
+        return io_read, io_write
+
+    def map_banks(self):
+        """Point the banked cartridge pages at the MBC's active banks.
+
+        Pages 0x40-0x7F follow the MBC's ROM bank view, and pages 0xA0-0xBF
+        its RAM bank view while one is mapped. Runs after every MBC register
+        write; anything else that may switch banks (restoring the cartridge
+        state) must call it too.
+        """
+        mbc = self._mbc
+        if mbc is None:
             return
+        bank = mbc._rom_bank
+        pages = self._bank_pages.get(bank)
+        if pages is None:
+            pages = self._bank_pages[bank] = _split_pages(mbc._rom_view)
+        self._read_pages[0x40:0x80] = pages
+
+        ram_view = mbc._ram_view
+        if ram_view is not self._mapped_ram_view:
+            self._mapped_ram_view = ram_view
+            pages = [None] * 0x20 if ram_view is None else _split_pages(ram_view)
+            self._read_pages[0xA0:0xC0] = pages
+            self._write_pages[0xA0:0xC0] = pages
+
+    # ------------------------------------------------------------------ #
+    #  Page handlers
+    # ------------------------------------------------------------------ #
+
+    def _write_rom(self, address, value):
+        self._cartridge.write(address, value)
+        self.map_banks()
+        # MBC register write: may switch the bank a block runs from
+        self._code_dirty = True
+
+    def _read_vram(self, address):
+        ppu = self._ppu
+        if ppu._lcdc & 0x80:
+            if self._scheduler is not None:
+                self._scheduler.sync_ppu()
+            if ppu._mode == 3:
+                return 0xFF
+        return self.memory[address]
 
-        # OAM access restriction (modes 2/3)
-        if 0xFE00 <= address <= 0xFE9F:
-            if self._ppu is not None and (self._ppu._lcdc & 0x80) \
-                    and self._ppu._mode in (2, 3):
+    def _write_vram(self, address, value):
+        ppu = self._ppu
+        if ppu._lcdc & 0x80:
+            if self._scheduler is not None:
+                self._scheduler.sync_ppu()
+            if ppu._mode == 3:
                 return
-            self.memory[address] = value
-            return
+        if self.memory[address] != value:
+            # Lines the PPU deferred must be drawn from the old contents
+            if ppu._pending_first != ppu._pending_end:
+                ppu.flush_lines()
+            # Tile data: drop the PPU's decoded copy of the row
+            if address < 0x9800:
+                ppu.invalidate_tile_row(address)
+            else:
+                ppu.invalidate_lines()
+        self._write_ram(address, value)
 
-        # I/O registers and special registers
-        if address == 0xFF0F:
-            self.memory[0xFF0F] = value & 0x1F
-            return
-        if address == 0xFFFF:
-            self.memory[0xFFFF] = value
-            return
-        if address == 0xFF00 and self._joypad is not None:
-            self._joypad.write(address, value)
-            return
-        if 0xFF01 <= address <= 0xFF02 and self._serial is not None:
-            self._serial.write(address, value)
-            return
-        if 0xFF04 <= address <= 0xFF07 and self._timer is not None:
-            self._timer.write(address, value)
-            return
-        if 0xFF10 <= address <= 0xFF3F and self._apu is not None:
-            self._apu.write(address, value)
-            return
-        if 0xFF40 <= address <= 0xFF4B and self._ppu is not None:
-            self._ppu.write(address, value)
+    def _write_echo(self, address, value):
+        self._write_ram(address - 0x2000, value)
+
+    def _read_oam(self, address):
+        ppu = self._ppu
+        if address <= 0xFE9F and ppu._lcdc & 0x80:
+            if self._scheduler is not None:
+                self._scheduler.sync_ppu()
+            if ppu._mode in (2, 3):
+                return 0xFF
+        return self.memory[address]
+
+    def _write_oam(self, address, value):
+        if address > 0xFE9F:
+            self._write_ram(address, value)
             return
+        ppu = self._ppu
+        if ppu._lcdc & 0x80:
+            if self._scheduler is not None:
+                self._scheduler.sync_ppu()
+            if ppu._mode in (2, 3):
+                return
+        if self.memory[address] != value:
+            if ppu._pending_first != ppu._pending_end:
+                ppu.flush_lines()
+            ppu.invalidate_sprites()
+        self.memory[address] = value
 
+    def _write_ram(self, address, value):
         self.memory[address] = value
+        if self._code_map[address]:
+            self._invalidate_code(address)
+
+    def _read_if(self, address):
+        # IF register: mask to 5 bits only when CPU is wired up
+        if self._cpu:
+            return self.memory[0xFF0F] & 0x1F
+        return self.memory[0xFF0F]
+
+    def _write_if(self, address, value):
+        self.memory[0xFF0F] = value & 0x1F
+
+    def _read_timer(self, address):
+        self._scheduler.sync_timer()
+        return self._timer.read(address)
+
+    def _write_timer(self, address, value):
+        scheduler = self._scheduler
+        scheduler.sync_timer()
+        self._timer.write(address, value)
+        scheduler.sync_timer()  # the write may move the next overflow
+
+    def _read_apu(self, address):
+        self._scheduler.sync_apu()
+        return self._apu.read(address)
+
+    def _write_apu(self, address, value):
+        self._scheduler.sync_apu()
+        self._apu.write(address, value)
+
+    def _read_ppu(self, address):
+        self._scheduler.sync_ppu()
+        return self._ppu.read(address)
+
+    def _write_ppu(self, address, value):
+        scheduler = self._scheduler
+        scheduler.sync_ppu()
+        self._ppu.write(address, value)
+        scheduler.sync_ppu()  # LCDC on/off or an LY reset moves the next event
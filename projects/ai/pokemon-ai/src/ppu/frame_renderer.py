@@ -0,0 +1,161 @@
+"""
+Deferred whole-frame renderer for the PPU, built on NumPy (optional).
+
+The scanline renderer draws each line in Python at its mode-0 transition.
+With a FrameRenderer the PPU only records which lines have reached that
+point. The lines are drawn together, with array operations, when the
+frame reaches V-Blank:
+
+    tile ids   = tile_map[rows >> 3][:, cols >> 3]        # gather
+    pixels     = tiles[tile ids, rows & 7, cols & 7]      # decoded bitplanes
+    shades     = palette table[pixels]                    # lookup
+
+A line must look as it would have at its own mode-0 point, so anything the
+renderer reads (the PPU registers it uses, VRAM, OAM, the color palettes)
+may not change while lines are pending. The PPU and the memory bus
+therefore flush the pending lines first, when such a write changes a
+value mid-frame. A frame with mid-frame changes is drawn as one line range
+per change. A frame without them, which is most of them, is one range.
+
+NumPy is optional: without it GameBoy(numpy_renderer=True) falls back to
+the scanline renderer (see AVAILABLE).
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+AVAILABLE = np is not None
+
+
+class FrameRenderer:
+    """Draws ranges of deferred scanlines for a PPU."""
+
+    def __init__(self, ppu):
+        self._ppu = ppu
+        self._tiles = None  # (384, 8, 8) color indices, rebuilt when VRAM tile data changes
+        self._cols = np.arange(160)
+
+    def _decoded_tiles(self, mem):
+        """Return all 384 tiles as (tile, row, column) color indices."""
+        ppu = self._ppu
+        if self._tiles is None or ppu._tiles_dirty:
+            data = mem[0x8000:0x9800].reshape(384, 8, 2)
+            # unpackbits is MSB first, i.e. leftmost pixel first
+            self._tiles = ((np.unpackbits(data[:, :, 1:2], axis=2) << 1)
+                           | np.unpackbits(data[:, :, 0:1], axis=2))
+            ppu._tiles_dirty = False
+        return self._tiles
+
+    @staticmethod
+    def _tile_numbers(tile_ids, unsigned_mode):
+        """Map tile map entries to tile numbers 0-383."""
+        tile_ids = tile_ids.astype(np.intp)
+        if unsigned_mode:
+            return tile_ids
+        # Signed addressing: ids 0-127 are tiles 256-383 (0x9000-0x97FF)
+        return tile_ids + (tile_ids < 128) * 256
+
+    def render(self, first, end):
+        """Draw lines first..end-1 with the PPU's current state."""
+        ppu = self._ppu
+        if ppu._memory is None:
+            return
+        mem = np.frombuffer(ppu._memory.memory, dtype=np.uint8)
+        tiles = self._decoded_tiles(mem)
+        lcdc = ppu._lcdc
+        unsigned_mode = bool(lcdc & 0x10)
+        cols = self._cols
+        lines = np.arange(first, end)
+
+        # --- Background ---
+        ys = (lines + ppu._scy) & 0xFF
+        xs = (cols + ppu._scx) & 0xFF
+        bg_map_base = 0x9C00 if lcdc & 0x08 else 0x9800
+        bg_map = mem[bg_map_base:bg_map_base + 0x400].reshape(32, 32)
+        tile_ids = bg_map[(ys >> 3)[:, None], (xs >> 3)[None, :]]
+        indices = tiles[self._tile_numbers(tile_ids, unsigned_mode),
+                        (ys & 7)[:, None], (xs & 7)[None, :]]
+
+        # --- Window ---
+        if lcdc & 0x20:
+            win_x_start = ppu._wx - 7
+            drawn = lines >= ppu._wy
+            if win_x_start < 160 and drawn.any():
+                # Internal window line counter: advances on each drawn line
+                win_ys = ppu._window_line + np.cumsum(drawn)[drawn] - 1
+                ppu._window_line += int(np.count_nonzero(drawn))
+                start = max(0, win_x_start)
+                win_xs = cols[start:] - win_x_start
+                win_map_base = 0x9C00 if lcdc & 0x40 else 0x9800
+                win_map = mem[win_map_base:win_map_base + 0x400].reshape(32, 32)
+                tile_ids = win_map[(win_ys >> 3)[:, None], (win_xs >> 3)[None, :]]
+                indices[drawn, start:] = tiles[self._tile_numbers(tile_ids, unsigned_mode),
+                                               (win_ys & 7)[:, None], (win_xs & 7)[None, :]]
+
+        # Pixel codes: shade | layer (0 = BG, 4 = OBJ0, 8 = OBJ1), the same
+        # split the PPU keeps in its shade and layer buffers
+        codes = _shade_table(ppu._bgp)[indices]
+
+        # --- Sprites ---
+        if lcdc & 0x02:
+            self._render_sprites(mem, tiles, lines, indices, codes)
+
+        # --- Output ---
+        ppu._shades[first * 160:end * 160] = (codes & 0x03).tobytes()
+        ppu._layers[first * 160:end * 160] = (codes & 0x0C).tobytes()
+        ppu._colors_stale = True
+
+    def _render_sprites(self, mem, tiles, lines, bg_indices, codes):
+        """Draw the sprites of lines into codes, as _render_sprites() does per line."""
+        ppu = self._ppu
+        oam = mem[0xFE00:0xFEA0].reshape(40, 4).astype(np.intp)
+        height = 16 if ppu._lcdc & 0x04 else 8
+        top = oam[:, 0] - 16
+        on_line = (lines[None, :] >= top[:, None]) & (lines[None, :] < top[:, None] + height)
+        # Up to 10 sprites per line, in OAM order
+        selected = on_line & (np.cumsum(on_line, axis=0) <= 10)
+        if not selected.any():
+            return
+
+        obj_tables = (_shade_table(ppu._obp0) + 4, _shade_table(ppu._obp1) + 8)
+        # Lowest priority first: X descending, then OAM index descending.
+        # The order does not depend on the line, so one pass covers them all.
+        for s in np.lexsort((np.arange(40), oam[:, 1]))[::-1]:
+            line_rows = np.nonzero(selected[s])[0]
+            if not len(line_rows):
+                continue
+            tile, attrs = oam[s, 2], oam[s, 3]
+            screen_x = oam[s, 1] - 8
+            first_col = max(0, -screen_x)
+            end_col = min(8, 160 - screen_x)
+            if first_col >= end_col:
+                continue
+
+            rows = lines[line_rows] - top[s]
+            if attrs & 0x40:
+                rows = (height - 1) - rows
+            if height == 16:
+                # 8x16: bit 0 of the index selects the top or bottom tile
+                tile = (tile & 0xFE) | (rows >> 3)
+                rows = rows & 7
+            pixels = tiles[tile, rows]
+            if attrs & 0x20:
+                pixels = pixels[:, ::-1]
+            pixels = pixels[:, first_col:end_col]
+
+            x0 = screen_x + first_col
+            x1 = screen_x + end_col
+            visible = pixels != 0
+            if attrs & 0x80:
+                # Hidden behind non-zero BG/window color
+                visible &= bg_indices[line_rows, x0:x1] == 0
+            target = codes[line_rows, x0:x1]
+            codes[line_rows, x0:x1] = np.where(
+                visible, obj_tables[1 if attrs & 0x10 else 0][pixels], target)
+
+
+def _shade_table(palette):
+    """Return a palette register as a color index -> shade lookup array."""
+    return np.array([(palette >> (i * 2)) & 0x03 for i in range(4)], dtype=np.uint8)
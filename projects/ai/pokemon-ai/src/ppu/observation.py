@@ -0,0 +1,113 @@
+"""Semantic observations: what is on screen, read from VRAM and OAM.
+
+Agents rarely need pixels. semantic_observation() describes the screen the
+way the PPU sees it, without drawing anything, so it also works while
+rendering is turned off (PPU.set_rendering(False)):
+
+    background      18x20 tile numbers (0-383) of the visible background:
+                    tile rows/columns from SCY>>3 / SCX>>3, wrapping at 32.
+                    Tiles on the edges may be partly scrolled off; scroll
+                    holds (SCX, SCY) for the sub-tile offset.
+    window          18x20 tile numbers from the window's top-left tile, or
+                    None while the window is off or entirely off-screen;
+                    window_position holds its screen (x, y).
+    background_ids, window_ids
+                    The same grids as tile IDs (see below).
+    sprites         The sprites on screen, in OAM order, as Sprite tuples:
+                    screen x/y of the top-left corner, tile number,
+                    attribute flags and tile ID. Empty while sprites are off.
+    lcdc            The LCDC register, for everything else.
+
+Tile numbers index the 384 tiles of 0x8000-0x97FF, with the LCDC bit 4
+addressing mode already applied. A tile ID is a 64-bit hash of a tile's
+16 bytes of pixel data (32 for 8x16 sprites), so the same graphic has the
+same ID wherever and whenever a game loads it into VRAM.
+
+Grids are NumPy arrays (uint16 numbers, uint64 IDs) when NumPy is
+installed and 2-D memoryviews otherwise; both index as grid[row, col].
+"""
+
+import hashlib
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+GRID_ROWS = 18
+GRID_COLS = 20
+
+Sprite = namedtuple("Sprite", "index x y tile flags tile_id")
+
+
+def tile_id(data):
+    """Return the stable 64-bit ID of a tile's pixel data."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _grid(values, typecode):
+    """Return GRID_ROWS x GRID_COLS values as a NumPy array or a 2-D memoryview."""
+    if np is not None:
+        return np.array(values, dtype=np.uint16 if typecode == "H" else np.uint64).reshape(
+            GRID_ROWS, GRID_COLS)
+    return memoryview(array(typecode, values)).cast("B").cast(typecode, (GRID_ROWS, GRID_COLS))
+
+
+def _map_tiles(mem, map_base, first_row, first_col, unsigned_mode):
+    """Return the tile numbers of an 18x20 region of a tile map, row-major."""
+    tiles = []
+    for row in range(first_row, first_row + GRID_ROWS):
+        row_base = map_base + (row & 31) * 32
+        for col in range(first_col, first_col + GRID_COLS):
+            tile_index = mem[row_base + (col & 31)]
+            # Signed addressing: indices 0-127 are tiles 256-383 (0x9000-0x97FF)
+            if not unsigned_mode and tile_index < 128:
+                tile_index += 256
+            tiles.append(tile_index)
+    return tiles
+
+
+def semantic_observation(ppu):
+    """Return the semantic observation dict described above for a PPU."""
+    mem = ppu._memory.memory
+    lcdc = ppu._lcdc
+    unsigned_mode = bool(lcdc & 0x10)
+    ids = ppu.tile_ids()
+
+    bg_map_base = 0x9C00 if lcdc & 0x08 else 0x9800
+    background = _map_tiles(mem, bg_map_base, ppu._scy >> 3, ppu._scx >> 3, unsigned_mode)
+
+    window = window_ids = None
+    window_position = (ppu._wx - 7, ppu._wy)
+    if lcdc & 0x20 and ppu._wx - 7 < 160 and ppu._wy < 144:
+        win_map_base = 0x9C00 if lcdc & 0x40 else 0x9800
+        tiles = _map_tiles(mem, win_map_base, 0, 0, unsigned_mode)
+        window = _grid(tiles, "H")
+        window_ids = _grid([ids[tile] for tile in tiles], "Q")
+
+    sprites = []
+    if lcdc & 0x02:
+        height = 16 if lcdc & 0x04 else 8
+        for i in range(40):
+            raw_y, raw_x, tile, flags = mem[0xFE00 + i * 4:0xFE04 + i * 4]
+            x, y = raw_x - 8, raw_y - 16
+            if -8 < x < 160 and -height < y < 144:
+                if height == 16:
+                    tile &= 0xFE
+                    sprite_id = tile_id(mem[0x8000 + tile * 16:0x8000 + tile * 16 + 32])
+                else:
+                    sprite_id = ids[tile]
+                sprites.append(Sprite(i, x, y, tile, flags, sprite_id))
+
+    return {
+        'background': _grid(background, "H"),
+        'background_ids': _grid([ids[tile] for tile in background], "Q"),
+        'scroll': (ppu._scx, ppu._scy),
+        'window': window,
+        'window_ids': window_ids,
+        'window_position': window_position,
+        'sprites': sprites,
+        'lcdc': lcdc,
+    }
@@ -0,0 +1,92 @@
+"""Pixel formats the PPU can hand out a frame in.
+
+The PPU keeps a frame as one code per pixel: the shade (0-3) OR'd with the
+palette layer it came from (0 = BG/window, 4 = OBJ0, 8 = OBJ1). Every output
+format is a fixed function of that code and the current color palettes, so
+a frame is converted with one bytes.translate() per output byte of a pixel
+over the whole frame, never pixel by pixel:
+
+    RGB24   R, G, B               (pygame.image.frombuffer(..., 'RGB'))
+    RGBA32  R, G, B, 255
+    BGRA32  B, G, R, 255          (little-endian 32-bit surfaces)
+    GRAY8   luma of the color     (ITU-R BT.601 weights)
+    SHADE2  shade 0-3, one byte per pixel, palette colors ignored
+    INDEX8  the pixel code itself, one byte per pixel: an index into the
+            12 colors of palette_colors() (8-bit paletted surfaces)
+
+downscale() halves both dimensions (160x144 -> 80x72) by keeping the
+top-left pixel of every 2x2 block, before conversion.
+"""
+
+import functools
+
+RGB24 = "RGB24"
+RGBA32 = "RGBA32"
+BGRA32 = "BGRA32"
+GRAY8 = "GRAY8"
+SHADE2 = "SHADE2"
+INDEX8 = "INDEX8"
+
+BYTES_PER_PIXEL = {RGB24: 3, RGBA32: 4, BGRA32: 4, GRAY8: 1, SHADE2: 1, INDEX8: 1}
+
+
+def palette_colors(bg_colors, obj0_colors, obj1_colors):
+    """Return the 12 (R, G, B) colors indexed by pixel code, for INDEX8 frames."""
+    return tuple(bg_colors) + tuple(obj0_colors) + tuple(obj1_colors)
+
+
+@functools.lru_cache(maxsize=64)
+def channel_tables(pixel_format, bg_colors, obj0_colors, obj1_colors):
+    """Return one bytes.translate() table per output byte of a pixel.
+
+    Tables are indexed by pixel code (shade | layer). Raises ValueError for
+    an unknown format.
+    """
+    if pixel_format not in BYTES_PER_PIXEL:
+        raise ValueError(f"Unknown pixel format: {pixel_format!r} "
+                         f"(expected one of {', '.join(BYTES_PER_PIXEL)})")
+    layers = (bg_colors, obj0_colors, obj1_colors)
+    # Codes 12-255 never occur; they map to black
+    colors = [layers[code >> 2][code & 3] for code in range(12)] + [(0, 0, 0)] * 244
+
+    if pixel_format == SHADE2:
+        return (bytes(code & 3 if code < 12 else 0 for code in range(256)),)
+    if pixel_format == INDEX8:
+        return (bytes(code if code < 12 else 0 for code in range(256)),)
+    if pixel_format == GRAY8:
+        return (bytes((299 * r + 587 * g + 114 * b + 500) // 1000 for r, g, b in colors),)
+
+    reds = bytes(c[0] for c in colors)
+    greens = bytes(c[1] for c in colors)
+    blues = bytes(c[2] for c in colors)
+    opaque = b"\xff" * 256
+    if pixel_format == RGB24:
+        return (reds, greens, blues)
+    if pixel_format == RGBA32:
+        return (reds, greens, blues, opaque)
+    return (blues, greens, reds, opaque)
+
+
+def convert(codes, tables, out=None):
+    """Translate pixel codes through channel tables, interleaving channels.
+
+    Writes into `out` (a bytearray of the right size) when given, else
+    returns a new bytes/bytearray.
+    """
+    channels = len(tables)
+    if channels == 1:
+        if out is None:
+            return codes.translate(tables[0])
+        out[:] = codes.translate(tables[0])
+        return out
+    if out is None:
+        out = bytearray(len(codes) * channels)
+    for i, table in enumerate(tables):
+        out[i::channels] = codes.translate(table)
+    return out
+
+
+def downscale(codes, width, height):
+    """Halve a width x height frame of codes, keeping each 2x2 block's top-left pixel."""
+    return b"".join(codes[offset:offset + width:2]
+                    for offset in range(0, width * height, width * 2))
@@ -1,3 +1,47 @@
+import functools
+import zlib
+
+from src.ppu import frame_renderer, observation, pixel_formats
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+SCREEN_WIDTH = 160
+SCREEN_HEIGHT = 144
+
+_BLANK_FRAME = bytes(SCREEN_WIDTH * SCREEN_HEIGHT)
+_BG_LAYER_ROW = bytes(SCREEN_WIDTH)
+
+
+@functools.lru_cache(maxsize=256)
+def _shade_table(palette):
+    """Return a bytes.translate() table mapping color index 0-3 to a shade.
+
+    Tables are 256 bytes long as translate() requires; only the first four
+    entries matter.
+    """
+    return bytes((palette >> ((i & 3) * 2)) & 0x03 for i in range(256))
+
+
+def _frame_view(buffer):
+    """Return a read-only (144, 160) view of a shade buffer, without copying.
+
+    A NumPy array when NumPy is installed, a 2-D memoryview otherwise;
+    both index as view[y, x].
+    """
+    if np is not None:
+        view = np.frombuffer(buffer, dtype=np.uint8).reshape(SCREEN_HEIGHT, SCREEN_WIDTH)
+        view.flags.writeable = False
+        return view
+    return memoryview(buffer).toreadonly().cast('B', (SCREEN_HEIGHT, SCREEN_WIDTH))
+
+
+# Registers the renderers read: LCDC, SCY, SCX, BGP, OBP0, OBP1, WY, WX
+_RENDER_REGISTERS = frozenset((0xFF40, 0xFF42, 0xFF43, 0xFF47, 0xFF48, 0xFF49, 0xFF4A, 0xFF4B))
+
+
 class PPU:
     """Game Boy Pixel Processing Unit — registers and mode state machine.
 
@@ -20,7 +64,7 @@ class PPU:
     VISIBLE_SCANLINES = 144
     TOTAL_SCANLINES = 154
 
-    def __init__(self):
+    def __init__(self, numpy_renderer=False):
         # --- LCD Control & Status ---
         self._lcdc = 0x91       # 0xFF40  LCD Control (post-boot default)
         self._stat = 0x02       # 0xFF41  LCD Status (mode 2 at startup)
@@ -46,18 +90,73 @@ class PPU:
         # --- STAT interrupt ---
         self._stat_irq_line = False  # Previous state for rising-edge detection
         # --- Framebuffer ---
-        self._framebuffer = [[0] * 160 for _ in range(144)]
+        # One shade (0-3) per pixel, row-major. This buffer is never
+        # reallocated, so views of it stay valid.
+        self._shades = bytearray(_BLANK_FRAME)
+        # Palette layer per pixel: 0 = BG/window, 4 = OBJ0, 8 = OBJ1
+        self._layers = bytearray(_BLANK_FRAME)
+        self._framebuffer_view = _frame_view(self._shades)
         self._window_line = 0   # Internal window line counter
         # --- Color output ---
-        # RGB color buffer written during scanline rendering.
+        # RGB color buffer, produced from the shades and layers on request.
         # Frontend can read this directly with pygame.image.frombuffer().
         self._color_buffer = bytearray(160 * 144 * 3)
+        self._colors_stale = False
         # Color palettes: shade 0-3 → (R, G, B) for each layer
         self._bg_colors = ((255, 255, 255), (170, 170, 170), (85, 85, 85), (0, 0, 0))
         self._obj0_colors = ((255, 255, 255), (170, 170, 170), (85, 85, 85), (0, 0, 0))
         self._obj1_colors = ((255, 255, 255), (170, 170, 170), (85, 85, 85), (0, 0, 0))
+        # --- Decoded tile cache ---
+        # One entry per tile row in 0x8000-0x97FF (384 tiles x 8 rows): the
+        # row's 8 color indices, left to right, or None until decoded. The
+        # flipped list holds the same rows mirrored for X-flipped sprites.
+        # Memory.set_value() drops a row when its bytes are written;
+        # anything writing VRAM behind its back must call invalidate_tiles().
+        self._tile_rows = [None] * (384 * 8)
+        self._tile_rows_flipped = [None] * (384 * 8)
+        self._tiles_dirty = True  # Tile data changed since the frame renderer decoded it
+        self._tile_ids = [None] * 384  # observation.tile_id() per tile, None until needed
+        # --- Sprite index ---
+        # Per visible line, the sprites drawn on it: at most 10, picked in
+        # OAM order, as (x, oam index, y, tile, attrs) sorted by X then OAM
+        # index. None until built; OAM writes and DMA drop it, and it is
+        # rebuilt when the sprite height (LCDC bit 2) differs.
+        self._line_sprites = None
+        self._line_sprites_height = 8
+        # --- Unchanged-line reuse ---
+        # _output_serial counts changes to anything a line is drawn from
+        # (render registers, VRAM, OAM). A line whose serial and window line
+        # match what it was last drawn with would come out the same, so the
+        # framebuffer already holds it.
+        self._output_serial = 0
+        self._line_serials = [-1] * 144
+        self._line_windows = [0] * 144
+        self._frame_dirty = False   # A line was drawn since the last V-Blank
+        self._frame_snapshot = b""  # Shades + layers at the last changed V-Blank
+        self._frame_hash = None
+        self.frame_changed = False  # The last completed frame differs from the one before
+        self.on_vblank = None       # Called with no arguments when a frame completes
+        # --- Deferred rendering (see frame_renderer.py) ---
+        # With a frame renderer, lines _pending_first.._pending_end-1 have
+        # passed their mode-0 point but are not drawn yet.
+        self._frame_renderer = None
+        if numpy_renderer and frame_renderer.AVAILABLE:
+            self._frame_renderer = frame_renderer.FrameRenderer(self)
+        self._pending_first = 0
+        self._pending_end = 0
+        self._pending_window = 0  # Window line counter at _pending_first
+        # --- Render skipping ---
+        # Skipped lines keep the mode/STAT timing and the window line counter
+        # but leave the framebuffer alone. _draw_lines is the per-line check:
+        # rendering enabled and the current frame picked by the frameskip.
+        self._rendering = True
+        self._frameskip = 1     # Draw one frame in every _frameskip
+        self._frame_count = 0   # Frames started, for the frameskip
+        self._frame_selected = True
+        self._draw_lines = True
 
     def save_state(self):
+        self.flush_lines()
         return {
             'lcdc': self._lcdc,
             'stat': self._stat,
@@ -78,6 +177,8 @@ class PPU:
         }
 
     def load_state(self, state):
+        self.flush_lines()
+        self._pending_first = self._pending_end = 0
         self._lcdc = state['lcdc']
         self._stat = state['stat']
         self._scy = state['scy']
@@ -94,7 +195,13 @@ class PPU:
         self._mode = state['mode']
         self._stat_irq_line = state['stat_irq_line']
         self._window_line = state['window_line']
-        self._framebuffer = [[0] * 160 for _ in range(144)]
+        self._shades[:] = _BLANK_FRAME
+        self._layers[:] = _BLANK_FRAME
+        self._colors_stale = True
+        self._line_serials = [-1] * 144
+        self._frame_dirty = False
+        self._frame_snapshot = b""
+        self._frame_hash = None
 
     # ------------------------------------------------------------------ #
     #  Register read
@@ -134,6 +241,10 @@ class PPU:
 
     def write(self, address: int, value: int) -> None:
         value = value & 0xFF
+        if address in _RENDER_REGISTERS and self.read(address) != value:
+            # Lines still waiting to be drawn must see the old value
+            self.flush_lines()
+            self._output_serial += 1
 
         if address == 0xFF40:
             self._lcdc = value
@@ -226,12 +337,28 @@ class PPU:
                     self._set_mode(3)
                 elif self._dot == 252:
                     self._set_mode(0)
-                    self._render_scanline()
+                    if not self._draw_lines or (
+                            self._line_serials[ly] == self._output_serial
+                            and self._line_windows[ly] == self._window_line):
+                        # Not drawn, or nothing it depends on changed since
+                        # it was last drawn
+                        self._skip_scanline()
+                    else:
+                        self._line_serials[ly] = self._output_serial
+                        self._line_windows[ly] = self._window_line
+                        self._frame_dirty = True
+                        self._frame_hash = None
+                        if self._frame_renderer is None:
+                            self._render_scanline()
+                        else:
+                            self._defer_scanline()
                 elif self._dot == 456:
                     self._dot = 0
                     ly += 1
                     self._ly = ly
                     if ly == 144:
+                        self.flush_lines()
+                        self._end_frame()
                         self._set_mode(1)
                         self._request_vblank_interrupt()
                     else:
@@ -246,9 +373,26 @@ class PPU:
                         ly = 0
                         self._ly = 0
                         self._window_line = 0
+                        self._start_frame()
                         self._set_mode(2)
                     self._update_lyc_flag()
 
+    def next_event_cycles(self):
+        """Return T-cycles until the next mode change, or None if LCD is off.
+
+        Every mode change and LY increment is a point where the PPU may
+        raise V-Blank or STAT. Used by the event scheduler.
+        """
+        if not (self._lcdc & 0x80):
+            return None
+        dot = self._dot
+        if self._ly < 144:
+            if dot < 80:
+                return 80 - dot
+            if dot < 252:
+                return 252 - dot
+        return 456 - dot
+
     # ------------------------------------------------------------------ #
     #  Internal helpers
     # ------------------------------------------------------------------ #
@@ -301,10 +445,12 @@ class PPU:
         """Copy 160 bytes from source_page*0x100 into OAM (0xFE00-0xFE9F)."""
         if self._memory is None:
             return
+        self.flush_lines()
         base = source_page * 0x100
         mem = self._memory.memory
-        for i in range(160):
-            mem[0xFE00 + i] = mem[base + i]
+        if mem[0xFE00:0xFEA0] != mem[base:base + 160]:
+            mem[0xFE00:0xFEA0] = mem[base:base + 160]
+            self.invalidate_sprites()
 
     # ------------------------------------------------------------------ #
     #  Background + window rendering
@@ -320,6 +466,212 @@ class PPU:
             tile_index -= 256
         return 0x9000 + tile_index * 16
 
+    # ------------------------------------------------------------------ #
+    #  Decoded tile cache
+    # ------------------------------------------------------------------ #
+
+    def invalidate_tile_row(self, address):
+        """Drop the cached tile row holding VRAM address 0x8000-0x97FF."""
+        index = (address - 0x8000) >> 1
+        self._tile_rows[index] = None
+        self._tile_rows_flipped[index] = None
+        self._tile_ids[index >> 3] = None
+        self._tiles_dirty = True
+        self._output_serial += 1
+
+    def invalidate_tiles(self):
+        """Drop every cached tile row (e.g. after VRAM was replaced)."""
+        self._tile_rows = [None] * (384 * 8)
+        self._tile_rows_flipped = [None] * (384 * 8)
+        self._tile_ids = [None] * 384
+        self._tiles_dirty = True
+        self._output_serial += 1
+
+    def tile_ids(self):
+        """Return the stable content ID of each of the 384 tiles in VRAM.
+
+        See observation.tile_id(). Computed on demand and kept until the
+        tile's data changes.
+        """
+        ids = self._tile_ids
+        if None in ids:
+            mem = self._memory.memory
+            for tile, tile_id in enumerate(ids):
+                if tile_id is None:
+                    address = 0x8000 + tile * 16
+                    ids[tile] = observation.tile_id(mem[address:address + 16])
+        return ids
+
+    def get_semantic_observation(self):
+        """Return the screen as tile grids and a sprite list, without drawing.
+
+        See ppu/observation.py for the layout. Works while rendering is off.
+        """
+        return observation.semantic_observation(self)
+
+    # ------------------------------------------------------------------ #
+    #  Sprite index
+    # ------------------------------------------------------------------ #
+
+    def invalidate_sprites(self):
+        """Drop the per-line sprite index (e.g. after OAM was written)."""
+        self._line_sprites = None
+        self._output_serial += 1
+
+    def _build_sprite_index(self, mem, sprite_height):
+        """Sort the 40 OAM entries into the visible lines they cover."""
+        lines = [[] for _ in range(144)]
+        oam = mem[0xFE00:0xFEA0]
+        for i in range(40):
+            raw_y, raw_x, tile_idx, attrs = oam[i * 4:i * 4 + 4]
+            screen_y = raw_y - 16
+            for ly in range(max(0, screen_y), min(144, screen_y + sprite_height)):
+                sprites = lines[ly]
+                # Only the first 10 sprites in OAM order are drawn on a line
+                if len(sprites) < 10:
+                    sprites.append((raw_x, i, raw_y, tile_idx, attrs))
+        for sprites in lines:
+            # Priority: smaller X first, then smaller OAM index
+            sprites.sort()
+        self._line_sprites = lines
+        self._line_sprites_height = sprite_height
+        return lines
+
+    # ------------------------------------------------------------------ #
+    #  Render skipping
+    # ------------------------------------------------------------------ #
+
+    def set_rendering(self, enabled):
+        """Turn drawing on or off, e.g. for headless runs or fast-forward.
+
+        While off, the mode state machine, STAT/LYC interrupts and the window
+        line counter run exactly as before, but no line is drawn and the
+        framebuffer keeps its last contents. Applies from the next line:
+        lines of the current frame that already went by are not redrawn.
+        """
+        self.flush_lines()
+        self._rendering = bool(enabled)
+        self._draw_lines = self._rendering and self._frame_selected
+
+    def set_frameskip(self, n):
+        """Draw only one frame in every n (1 = every frame).
+
+        The choice is made when a frame starts, so a frame is either drawn
+        whole or skipped whole. Frames that are drawn still need rendering
+        to be enabled (see set_rendering()).
+        """
+        if n < 1:
+            raise ValueError(f"frameskip must be at least 1, got {n}")
+        self._frameskip = n
+
+    def _start_frame(self):
+        """Decide whether the frame starting at LY 0 gets drawn."""
+        self._frame_count += 1
+        self._frame_selected = self._frame_count % self._frameskip == 0
+        self._draw_lines = self._rendering and self._frame_selected
+
+    def _skip_scanline(self):
+        """Account for an undrawn line: only the window line counter moves."""
+        if (self._lcdc & 0x20) and self._ly >= self._wy and self._wx - 7 < 160:
+            self._window_line += 1
+
+    # ------------------------------------------------------------------ #
+    #  Unchanged-frame detection
+    # ------------------------------------------------------------------ #
+
+    def invalidate_lines(self):
+        """Make every line redraw (something they are drawn from changed)."""
+        self._output_serial += 1
+
+    def _end_frame(self):
+        """At V-Blank: set frame_changed for the frame just completed, then call on_vblank."""
+        if self._frame_dirty:
+            self._frame_dirty = False
+            snapshot = bytes(self._shades) + bytes(self._layers)
+            self.frame_changed = snapshot != self._frame_snapshot
+            self._frame_snapshot = snapshot
+        else:
+            self.frame_changed = False
+        if self.on_vblank is not None:
+            self.on_vblank()
+
+    def frame_hash(self):
+        """Return a CRC-32 of the framebuffer (shades and palette layers).
+
+        Cached until a line is drawn, so polling it every frame is cheap.
+        Equal hashes mean the picture (in any output format) is the same.
+        """
+        self.flush_lines()
+        if self._frame_hash is None:
+            self._frame_hash = zlib.crc32(self._layers, zlib.crc32(self._shades))
+        return self._frame_hash
+
+    # ------------------------------------------------------------------ #
+    #  Deferred rendering
+    # ------------------------------------------------------------------ #
+
+    def _defer_scanline(self):
+        """Record that the current line reached its mode-0 point."""
+        ly = self._ly
+        if ly != self._pending_end:
+            # Not contiguous with the pending range (LY was reset)
+            self.flush_lines()
+            self._pending_first = ly
+        if self._pending_first == ly:
+            self._pending_window = self._window_line
+        self._pending_end = ly + 1
+        # Keep the window line counter current; the renderer recounts from
+        # _pending_window when it draws the range
+        self._skip_scanline()
+
+    def flush_lines(self):
+        """Draw the deferred lines now, with the current state.
+
+        Must run before anything the renderer reads changes while lines are
+        pending: the PPU does so for its own registers, DMA, palettes and
+        V-Blank, and Memory for VRAM/OAM writes.
+        """
+        first = self._pending_first
+        if first != self._pending_end:
+            self._pending_first = self._pending_end
+            # render() counts window lines from the range's first line;
+            # the PPU already counted them as the lines went by
+            window_line = self._window_line
+            self._window_line = self._pending_window
+            self._frame_renderer.render(first, self._pending_end)
+            self._window_line = window_line
+
+    def _decode_tile_row(self, index):
+        """Decode tile row `index` (tile * 8 + row) into 8 color indices."""
+        mem = self._memory.memory
+        address = 0x8000 + index * 2
+        low_byte = mem[address]
+        high_byte = mem[address + 1]
+        row = bytes((((high_byte >> bit) & 1) << 1) | ((low_byte >> bit) & 1)
+                    for bit in range(7, -1, -1))
+        self._tile_rows[index] = row
+        return row
+
+    def _tile_line(self, mem, map_row_base, first_col, count, row_in_tile, unsigned_mode):
+        """Return the color indices of `count` consecutive tiles of a map row.
+
+        Tile map columns start at first_col and wrap at 32. Each tile
+        contributes its cached 8-pixel row for row_in_tile.
+        """
+        tile_rows = self._tile_rows
+        parts = []
+        for col in range(first_col, first_col + count):
+            tile_index = mem[map_row_base + (col & 31)]
+            # Signed addressing: indices 0-127 are tiles 256-383 (0x9000-0x97FF)
+            if not unsigned_mode and tile_index < 128:
+                tile_index += 256
+            index = (tile_index << 3) | row_in_tile
+            row = tile_rows[index]
+            if row is None:
+                row = self._decode_tile_row(index)
+            parts.append(row)
+        return b"".join(parts)
+
     def _render_scanline(self) -> None:
         """Render the current scanline's background, window, and sprites into the framebuffer."""
         if self._memory is None:
@@ -329,136 +681,74 @@ class PPU:
         scy = self._scy
         scx = self._scx
         lcdc = self._lcdc
-        bgp = self._bgp
         mem = self._memory.memory
         unsigned_mode = bool(lcdc & 0x10)
 
-        # Per-scanline BG color indices (pre-palette) for sprite BG priority
-        bg_indices = [0] * 160
-
         # --- Background ---
+        # Color indices (pre-palette) for the whole line, also used for
+        # sprite BG priority
         bg_map_base = 0x9C00 if lcdc & 0x08 else 0x9800
-        _tile_data_address = self._tile_data_address
-
         scroll_y = (ly + scy) & 0xFF
-        tile_row = scroll_y >> 3
-        row_in_tile = scroll_y & 0x07
-        map_row_base = bg_map_base + tile_row * 32
-        row_offset = row_in_tile * 2
-
-        row = self._framebuffer[ly]
-        cbuf = self._color_buffer
-        bg_colors = self._bg_colors
-        cbuf_row_offset = ly * 160 * 3
-        prev_tile_col = -1
-        low_byte = 0
-        high_byte = 0
-        for px in range(160):
-            scroll_x = (px + scx) & 0xFF
-            tile_col = scroll_x >> 3
-
-            if tile_col != prev_tile_col:
-                prev_tile_col = tile_col
-                tile_addr = _tile_data_address(mem[map_row_base + tile_col], unsigned_mode)
-                byte_offset = tile_addr + row_offset
-                low_byte = mem[byte_offset]
-                high_byte = mem[byte_offset + 1]
-
-            bit_pos = 7 - (scroll_x & 0x07)
-            color_index = (((high_byte >> bit_pos) & 1) << 1) | ((low_byte >> bit_pos) & 1)
-            bg_indices[px] = color_index
-            shade = (bgp >> (color_index * 2)) & 0x03
-            row[px] = shade
-            r, g, b = bg_colors[shade]
-            off = cbuf_row_offset + px * 3
-            cbuf[off] = r
-            cbuf[off + 1] = g
-            cbuf[off + 2] = b
+        map_row_base = bg_map_base + (scroll_y >> 3) * 32
+        fine_x = scx & 0x07
+        line = self._tile_line(mem, map_row_base, scx >> 3, 21, scroll_y & 0x07,
+                               unsigned_mode)[fine_x:fine_x + 160]
 
         # --- Window ---
         if (lcdc & 0x20) and ly >= self._wy:
             win_x_start = self._wx - 7
-            win_map_base = 0x9C00 if lcdc & 0x40 else 0x9800
-            win_y = self._window_line
-            win_tile_row = win_y >> 3
-            win_row_in_tile = win_y & 0x07
-            win_map_row_base = win_map_base + win_tile_row * 32
-            win_row_offset = win_row_in_tile * 2
-            window_rendered = False
-
             start_px = max(0, win_x_start)
-            prev_tile_col = -1
-            for px in range(start_px, 160):
-                win_px = px - win_x_start
-                win_tile_col = win_px >> 3
-
-                if win_tile_col != prev_tile_col:
-                    prev_tile_col = win_tile_col
-                    tile_addr = _tile_data_address(mem[win_map_row_base + win_tile_col], unsigned_mode)
-                    byte_offset = tile_addr + win_row_offset
-                    low_byte = mem[byte_offset]
-                    high_byte = mem[byte_offset + 1]
-
-                bit_pos = 7 - (win_px & 0x07)
-                color_index = (((high_byte >> bit_pos) & 1) << 1) | ((low_byte >> bit_pos) & 1)
-                bg_indices[px] = color_index
-                shade = (bgp >> (color_index * 2)) & 0x03
-                row[px] = shade
-                r, g, b = bg_colors[shade]
-                off = cbuf_row_offset + px * 3
-                cbuf[off] = r
-                cbuf[off + 1] = g
-                cbuf[off + 2] = b
-                window_rendered = True
-
-            if window_rendered:
+            if start_px < 160:
+                win_map_base = 0x9C00 if lcdc & 0x40 else 0x9800
+                win_y = self._window_line
+                win_map_row_base = win_map_base + (win_y >> 3) * 32
+                first_win_px = start_px - win_x_start
+                first_col = first_win_px >> 3
+                count = ((159 - win_x_start) >> 3) - first_col + 1
+                window = self._tile_line(mem, win_map_row_base, first_col, count,
+                                         win_y & 0x07, unsigned_mode)
+                fine_x = first_win_px & 0x07
+                line = line[:start_px] + window[fine_x:fine_x + 160 - start_px]
                 self._window_line += 1
 
+        # --- Palette ---
+        offset = ly * 160
+        self._shades[offset:offset + 160] = line.translate(_shade_table(self._bgp))
+        self._layers[offset:offset + 160] = _BG_LAYER_ROW
+        self._colors_stale = True
+
         # --- Sprites ---
         if lcdc & 0x02:
-            self._render_sprites(ly, row, bg_indices, mem)
+            self._render_sprites(ly, line, mem)
 
     # ------------------------------------------------------------------ #
     #  Sprite rendering
     # ------------------------------------------------------------------ #
 
-    def _render_sprites(self, ly, row, bg_indices, mem):
+    def _render_sprites(self, ly, bg_indices, mem):
         """Render sprites for the current scanline."""
         lcdc = self._lcdc
         sprite_height = 16 if (lcdc & 0x04) else 8
-        cbuf = self._color_buffer
-        obj0_colors = self._obj0_colors
-        obj1_colors = self._obj1_colors
-        cbuf_row_offset = ly * 160 * 3
-
-        # OAM scan: collect up to 10 sprites overlapping this scanline
-        sprites = []
-        for i in range(40):
-            oam_addr = 0xFE00 + i * 4
-            raw_y = mem[oam_addr]
-            screen_y = raw_y - 16
-            if screen_y <= ly < screen_y + sprite_height:
-                sprites.append((
-                    i,
-                    raw_y,
-                    mem[oam_addr + 1],
-                    mem[oam_addr + 2],
-                    mem[oam_addr + 3],
-                ))
-                if len(sprites) == 10:
-                    break
-
-        # Sort by X position (stable sort preserves OAM index for ties)
-        sprites.sort(key=lambda s: s[2])
+        shades = self._shades
+        layers = self._layers
+        row_offset = ly * 160
+        tile_rows = self._tile_rows
+        tile_rows_flipped = self._tile_rows_flipped
+
+        # Sprites on this line, already selected and sorted by priority
+        line_sprites = self._line_sprites
+        if line_sprites is None or self._line_sprites_height != sprite_height:
+            line_sprites = self._build_sprite_index(mem, sprite_height)
+        sprites = line_sprites[ly]
 
         # Render in reverse priority order (lowest priority first, highest overwrites)
-        for oam_idx, raw_y, raw_x, tile_idx, attrs in reversed(sprites):
+        for raw_x, oam_idx, raw_y, tile_idx, attrs in reversed(sprites):
             screen_x = raw_x - 8
             screen_y = raw_y - 16
             y_flip = bool(attrs & 0x40)
             x_flip = bool(attrs & 0x20)
             palette = self._obp1 if (attrs & 0x10) else self._obp0
-            colors = obj1_colors if (attrs & 0x10) else obj0_colors
+            layer = 8 if (attrs & 0x10) else 4
             bg_priority = bool(attrs & 0x80)
 
             # Row within sprite
@@ -472,31 +762,35 @@ class PPU:
                 if row_in_sprite >= 8:
                     tile_idx |= 0x01
                     row_in_sprite -= 8
-            tile_addr = 0x8000 + tile_idx * 16
 
-            low_byte = mem[tile_addr + row_in_sprite * 2]
-            high_byte = mem[tile_addr + row_in_sprite * 2 + 1]
+            # Decoded row, mirrored for X-flip
+            index = (tile_idx << 3) | row_in_sprite
+            if x_flip:
+                pixels = tile_rows_flipped[index]
+                if pixels is None:
+                    pixels = tile_rows[index]
+                    if pixels is None:
+                        pixels = self._decode_tile_row(index)
+                    pixels = tile_rows_flipped[index] = pixels[::-1]
+            else:
+                pixels = tile_rows[index]
+                if pixels is None:
+                    pixels = self._decode_tile_row(index)
 
             for col in range(8):
                 px = screen_x + col
                 if px < 0 or px >= 160:
                     continue
 
-                bit = col if x_flip else (7 - col)
-                color_index = (((high_byte >> bit) & 1) << 1) | ((low_byte >> bit) & 1)
+                color_index = pixels[col]
                 if color_index == 0:
                     continue  # transparent
 
                 if bg_priority and bg_indices[px] != 0:
                     continue  # hidden behind non-zero BG
 
-                shade = (palette >> (color_index * 2)) & 0x03
-                row[px] = shade
-                r, g, b = colors[shade]
-                off = cbuf_row_offset + px * 3
-                cbuf[off] = r
-                cbuf[off + 1] = g
-                cbuf[off + 2] = b
+                shades[row_offset + px] = (palette >> (color_index * 2)) & 0x03
+                layers[row_offset + px] = layer
 
     # ------------------------------------------------------------------ #
     #  Public accessors
@@ -507,27 +801,81 @@ class PPU:
 
         Each palette is a tuple of 4 (R, G, B) tuples mapping shade 0-3 to RGB.
         """
+        self.flush_lines()
         self._bg_colors = bg
         self._obj0_colors = obj0
         self._obj1_colors = obj1
+        self._colors_stale = True
 
     def get_framebuffer(self):
-        """Return the 160x144 framebuffer (list of lists, shade values 0-3)."""
-        return self._framebuffer
+        """Return the 160x144 framebuffer as a read-only view, indexed [y, x].
+
+        Shade values 0-3. The view is not a copy: it shows the frame as it
+        is drawn. It is a NumPy uint8 array when NumPy is installed and a
+        2-D memoryview otherwise; bytes(view) gives the raw row-major bytes.
+        """
+        self.flush_lines()
+        return self._framebuffer_view
+
+    def get_framebuffer_rows(self):
+        """Return a copy of the framebuffer as 144 lists of 160 shades.
+
+        Compatibility accessor for code written against the old
+        list-of-lists framebuffer.
+        """
+        self.flush_lines()
+        shades = self._shades
+        return [list(shades[offset:offset + 160]) for offset in range(0, 160 * 144, 160)]
 
     def get_color_buffer(self):
         """Return the RGB color buffer as a flat bytearray (160*144*3 bytes).
 
-        Written during scanline rendering. Can be passed directly to
-        pygame.image.frombuffer(buf, (160, 144), 'RGB').
+        Produced from the framebuffer and the color palettes when it is
+        requested after a change; the same bytearray is returned each time.
+        Can be passed directly to pygame.image.frombuffer(buf, (160, 144), 'RGB').
         """
+        self.flush_lines()
+        if self._colors_stale:
+            self._colors_stale = False
+            pixel_formats.convert(self._pixel_codes(), self._channel_tables(pixel_formats.RGB24),
+                                  out=self._color_buffer)
         return self._color_buffer
 
-    _ASCII_SHADES = [" ", "░", "▒", "█"]
+    def get_frame(self, pixel_format=pixel_formats.RGB24, downscale=False):
+        """Return the current frame in one of the pixel_formats formats.
+
+        pixel_format is RGB24, RGBA32, BGRA32, GRAY8, SHADE2 or INDEX8 (see
+        ppu/pixel_formats.py). With downscale=True the frame is 80x72
+        instead of 160x144. Returns a new bytes-like object, row-major.
+        """
+        self.flush_lines()
+        tables = self._channel_tables(pixel_format)
+        # Shades alone decide SHADE2; skip combining in the layers
+        codes = self._shades if pixel_format == pixel_formats.SHADE2 else self._pixel_codes()
+        if downscale:
+            codes = pixel_formats.downscale(codes, 160, 144)
+        return pixel_formats.convert(codes, tables)
+
+    def get_palette_colors(self):
+        """Return the 12 (R, G, B) colors that INDEX8 frame bytes index."""
+        return pixel_formats.palette_colors(self._bg_colors, self._obj0_colors, self._obj1_colors)
+
+    def _pixel_codes(self):
+        """Return shade | layer for every pixel, as bytes."""
+        # The two never share a bit, so one big-integer OR combines them
+        # without a Python loop
+        return (int.from_bytes(self._shades, "big")
+                | int.from_bytes(self._layers, "big")).to_bytes(len(self._shades), "big")
+
+    def _channel_tables(self, pixel_format):
+        return pixel_formats.channel_tables(pixel_format, self._bg_colors,
+                                            self._obj0_colors, self._obj1_colors)
+
+    # Shade -> character, as a str.translate() table over latin-1 decoded rows
+    _ASCII_SHADES = {0: " ", 1: "░", 2: "▒", 3: "█"}
 
     def render_ascii(self) -> str:
         """Return an ASCII string representation of the framebuffer."""
-        lines = []
-        for row in self._framebuffer:
-            lines.append("".join(self._ASCII_SHADES[shade] for shade in row))
-        return "\n".join(lines)
+        self.flush_lines()
+        text = self._shades.decode("latin-1").translate(self._ASCII_SHADES)
+        return "\n".join(text[offset:offset + 160] for offset in range(0, 160 * 144, 160))
@@ -0,0 +1,118 @@
+NEVER = float("inf")
+
+
+class Scheduler:
+    """Cycle-timestamped event scheduler for the timer, PPU and APU.
+
+    In the default mode the CPU run loop calls timer.tick(), ppu.tick() and
+    apu.tick() after every instruction, even though each component only has
+    something observable to do every tens to thousands of T-cycles. With
+    the scheduler, the run loop makes a single advance(cycles) call per
+    instruction instead, and a component is only ticked (caught up) when:
+
+      - its next event is due. The timer and PPU report the number of
+        cycles until their next event through next_event_cycles(): a TIMA
+        overflow, or a PPU mode change / LY increment. These are the points
+        where they can raise an interrupt;
+      - the CPU touches its registers, or (for the PPU) VRAM/OAM, whose
+        access depends on the current mode. Memory calls sync_*() before
+        the access and again after a write, which may move the next event;
+      - CPU.run() returns (sync_all), so state seen from outside the run
+        loop — save_state(), the frontend draining audio — matches.
+
+    The APU has no events: it raises no interrupts, and its frame sequencer
+    and sample output are only observable through its registers and the
+    sample buffer, which are both covered by the catch-up points above.
+
+    The clock `now` is an absolute T-cycle count owned by the scheduler. The
+    CPU advances it after each instruction, so during an instruction it
+    holds the cycle at which that instruction started: the same point the
+    per-instruction ticking has brought every component to. Component ticks
+    are additive (tick(a) then tick(b) equals tick(a + b)), so catching up
+    in one batch gives the same state, interrupts and audio samples.
+    """
+
+    def __init__(self, timer=None, ppu=None, apu=None):
+        self.now = 0
+        self.next_event = NEVER
+
+        self._timer = timer
+        self._ppu = ppu
+        self._apu = apu
+
+        # Cycle each component has been ticked up to, and its next event
+        self._timer_time = 0
+        self._ppu_time = 0
+        self._apu_time = 0
+        self._timer_event = NEVER
+        self._ppu_event = NEVER
+
+    def advance(self, cycles):
+        """Advance the clock by one instruction's cycles; run due events.
+
+        Passed to the CPU run loop in place of the component tick functions.
+        """
+        now = self.now + cycles
+        self.now = now
+        if now >= self.next_event:
+            self.run_due()
+
+    def run_due(self):
+        """Catch up every component whose next event is due."""
+        now = self.now
+        if self._timer_event <= now:
+            self.sync_timer()
+        if self._ppu_event <= now:
+            self.sync_ppu()
+
+    def sync_timer(self):
+        """Bring the timer up to `now` and recompute its next event."""
+        timer = self._timer
+        if timer is None:
+            return
+        now = self.now
+        delta = now - self._timer_time
+        if delta > 0:
+            timer.tick(delta)
+        self._timer_time = now
+        cycles = timer.next_event_cycles()
+        self._timer_event = NEVER if cycles is None else now + cycles
+        self._update_next_event()
+
+    def sync_ppu(self):
+        """Bring the PPU up to `now` and recompute its next event."""
+        ppu = self._ppu
+        if ppu is None:
+            return
+        now = self.now
+        delta = now - self._ppu_time
+        if delta > 0:
+            ppu.tick(delta)
+        self._ppu_time = now
+        cycles = ppu.next_event_cycles()
+        self._ppu_event = NEVER if cycles is None else now + cycles
+        self._update_next_event()
+
+    def sync_apu(self):
+        """Bring the APU up to `now`."""
+        apu = self._apu
+        if apu is None:
+            return
+        now = self.now
+        delta = now - self._apu_time
+        if delta > 0:
+            apu.tick(delta)
+        self._apu_time = now
+
+    def sync_all(self):
+        """Bring every component up to `now` and recompute their events.
+
+        Called when CPU.run() starts (components may have been changed
+        directly, e.g. by load_state) and when it returns.
+        """
+        self.sync_timer()
+        self.sync_ppu()
+        self.sync_apu()
+
+    def _update_next_event(self):
+        self.next_event = min(self._timer_event, self._ppu_event)
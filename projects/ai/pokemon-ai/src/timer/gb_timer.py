@@ -99,6 +99,17 @@ class Timer:
                 self._tima = self._tma
                 self._request_timer_interrupt()
 
+    def next_event_cycles(self):
+        """Return T-cycles until TIMA next overflows, or None if stopped.
+
+        Used by the event scheduler (src/scheduler/scheduler.py).
+        """
+        if not (self._tac & 0x04):
+            return None
+        period = 1 << (self.TAC_CLOCK_BITS[self._tac & 0x03] + 1)
+        first_edge = period - (self._internal_counter & (period - 1))
+        return first_edge + (0xFF - self._tima) * period
+
     def _request_timer_interrupt(self):
         """Set bit 2 of the IF register to request a timer interrupt."""
         if self._memory is not None:
@@ -294,11 +294,11 @@ class TestAPUMixing(unittest.TestCase):
         samples = self.apu.drain_samples()
         self.assertEqual(len(samples), 0)
 
-    def test_samples_are_stereo_pairs(self):
-        self.apu.tick(100)
+    def test_samples_are_interleaved_int16(self):
+        self.apu.tick(1000)
         samples = self.apu.drain_samples()
-        for s in samples:
-            self.assertEqual(len(s), 2)
+        self.assertEqual(samples.format, 'h')
+        self.assertEqual(len(samples) % 2, 0)
 
     def test_nr51_panning(self):
         """NR51 routes channels to L/R outputs."""
@@ -311,7 +311,7 @@ class TestAPUMixing(unittest.TestCase):
         self.apu.tick(100)
         samples = self.apu.drain_samples()
         if samples:
-            left, right = samples[0]
+            left, right = samples[0], samples[1]
             # Left should have signal, right should be quieter
             self.assertNotEqual(left, right)
 
@@ -329,8 +329,8 @@ class TestAPUMixing(unittest.TestCase):
         self.apu.tick(100)
         quiet = self.apu.drain_samples()
         if loud and quiet:
-            loud_max = max(abs(s[0]) for s in loud)
-            quiet_max = max(abs(s[0]) for s in quiet)
+            loud_max = max(abs(s) for s in loud[0::2])
+            quiet_max = max(abs(s) for s in quiet[0::2])
             self.assertGreater(loud_max, quiet_max)
 
     def test_disabled_channel_silent(self):
@@ -348,7 +348,7 @@ class TestAPUMixing(unittest.TestCase):
         self.apu.tick(70224)
         samples = self.apu.drain_samples()
         expected = 70224 / self.apu.SAMPLE_PERIOD
-        self.assertAlmostEqual(len(samples), expected, delta=2)
+        self.assertAlmostEqual(len(samples) // 2, expected, delta=2)
 
 
 class TestAPUWaveRAM(unittest.TestCase):
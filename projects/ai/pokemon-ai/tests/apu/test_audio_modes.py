@@ -0,0 +1,130 @@
+"""
+Audio modes: "off" and "low" produce less (or no) sound, but everything a
+game can read back from the APU must match "full" exactly.
+"""
+
+import unittest
+
+from src.apu import block_synth
+from src.apu.apu import APU
+from src.gameboy import GameBoy
+from tests.apu.test_lazy_catch_up import TRACE_READS_CRC, _play, _register_trace
+
+_MODES = (
+    {'audio_mode': "full"},
+    {'audio_mode': "low", 'low_sample_rate': 22050},
+    {'audio_mode': "low", 'low_sample_rate': 11025},
+    {'audio_mode': "off"},
+    {'audio_mode': "low", 'low_sample_rate': 11025, 'numpy_synthesis': True},
+    {'audio_mode': "off", 'numpy_synthesis': True},
+)
+
+# State that depends on the sample rate rather than on the registers
+_OUTPUT_STATE = ('sample_counter', 'hpf_capacitor_left', 'hpf_capacitor_right')
+
+
+def _nr52_after_every_op(apu, trace):
+    """Run a trace, reading NR52 after every operation; return the reads and final state."""
+    reads = bytearray()
+    for op in trace:
+        if op[0] == 'tick':
+            apu.tick(op[1])
+        elif op[0] == 'write':
+            apu.write(op[1], op[2])
+        else:
+            apu.read(op[1])
+        reads.append(apu.read(0xFF26))
+    state = apu.save_state()
+    for key in _OUTPUT_STATE:
+        del state[key]
+    return bytes(reads), state
+
+
+class TestRegistersMatchAcrossModes(unittest.TestCase):
+
+    def test_nr52_reads_are_identical(self):
+        trace = _register_trace(seed=24, length=10000)
+        expected = _nr52_after_every_op(APU(), trace)
+        # Channels do start and stop during the trace
+        self.assertGreater(len(set(expected[0])), 4)
+        for mode in _MODES[1:]:
+            with self.subTest(**mode):
+                self.assertEqual(_nr52_after_every_op(APU(**mode), trace), expected)
+
+    def test_recorded_trace_reads(self):
+        for mode in _MODES:
+            with self.subTest(**mode):
+                self.assertEqual(_play(APU(**mode), _register_trace())[1], TRACE_READS_CRC)
+
+
+class TestLowRate(unittest.TestCase):
+
+    def _powered_apu(self, **kwargs):
+        apu = APU(audio_mode="low", **kwargs)
+        apu.write(0xFF26, 0x80)
+        apu.write(0xFF24, 0x77)
+        apu.write(0xFF25, 0xFF)
+        apu.write(0xFF12, 0xF0)
+        apu.write(0xFF14, 0x87)
+        return apu
+
+    def test_one_second_is_sample_rate_frames(self):
+        for rate in (22050, 11025):
+            apu = self._powered_apu(low_sample_rate=rate)
+            apu.tick(APU.CPU_CLOCK)
+            self.assertEqual(len(apu.drain_samples()), rate * 2)
+            self.assertEqual(apu.overflow_frames, 0)
+
+    def test_fewer_sample_events(self):
+        apu = self._powered_apu(low_sample_rate=11025)
+        apu.tick(300)
+        self.assertEqual(apu._pending_cycles, 300)  # Next sample at ~380 cycles
+
+    @unittest.skipUnless(block_synth.AVAILABLE, "NumPy not installed")
+    def test_block_synth_matches_mixer(self):
+        trace = _register_trace(seed=11, length=6000)
+        self.assertEqual(_play(APU(audio_mode="low", low_sample_rate=11025, numpy_synthesis=True), trace),
+                         _play(APU(audio_mode="low", low_sample_rate=11025), trace))
+
+
+class TestAudioOff(unittest.TestCase):
+
+    def test_no_samples(self):
+        apu = APU(audio_mode="off")
+        apu.write(0xFF26, 0x80)
+        apu.write(0xFF12, 0xF0)
+        apu.write(0xFF14, 0x87)
+        apu.tick(APU.CPU_CLOCK)
+        self.assertIsNone(apu.sample_rate)
+        self.assertEqual(len(apu.drain_samples()), 0)
+        self.assertEqual(apu.overflow_frames, 0)
+
+    def test_only_frame_sequencer_steps_are_events(self):
+        apu = APU(audio_mode="off")
+        apu.write(0xFF26, 0x80)
+        apu.tick(8000)
+        self.assertEqual(apu._pending_cycles, 8000)
+        apu.tick(192)
+        self.assertEqual(apu._pending_cycles, 0)
+        self.assertEqual(apu._fs_step, 1)
+
+
+class TestAudioModeOption(unittest.TestCase):
+
+    def test_gameboy_option(self):
+        self.assertEqual(GameBoy().apu.sample_rate, 48000)
+        self.assertEqual(GameBoy(audio_mode="low", low_audio_rate=11025).apu.sample_rate, 11025)
+        self.assertIsNone(GameBoy(audio_mode="off").apu.sample_rate)
+
+    def test_rejects_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            APU(audio_mode="quiet")
+
+    def test_rejects_rate_out_of_range(self):
+        for rate in (0, 96000):
+            with self.assertRaises(ValueError):
+                APU(audio_mode="low", low_sample_rate=rate)
+
+
+if __name__ == "__main__":
+    unittest.main()
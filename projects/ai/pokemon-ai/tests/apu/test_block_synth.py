@@ -0,0 +1,114 @@
+"""
+NumPy block synthesis: the samples of each stretch between APU events are
+computed as arrays and must match the per-sample mixer.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from src.apu import block_synth
+from src.apu.apu import APU
+from src.gameboy import GameBoy
+from tests.apu.test_lazy_catch_up import _register_trace
+
+
+def _play(apu, trace):
+    """Run a trace, draining every few hundred operations; return the joined PCM."""
+    out = []
+    for i, op in enumerate(trace):
+        if op[0] == 'tick':
+            apu.tick(op[1])
+        elif op[0] == 'write':
+            apu.write(op[1], op[2])
+        else:
+            apu.read(op[1])
+        if i % 300 == 0:
+            out.append(bytes(apu.drain_samples()))
+    out.append(bytes(apu.drain_samples()))
+    return b"".join(out)
+
+
+@unittest.skipUnless(block_synth.AVAILABLE, "NumPy not installed")
+class TestBlockSynthMatchesMixer(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = _register_trace(seed=22, length=8000)
+
+    def test_pcm_matches(self):
+        # The high-pass filter is solved in closed form, equal to the per-sample
+        # filter up to float rounding, which the int16 conversion absorbs
+        self.assertEqual(_play(APU(numpy_synthesis=True), self.trace), _play(APU(), self.trace))
+
+    def test_pcm_matches_more_traces(self):
+        # At 16384 Hz a step is exactly 32 samples long, so sample points
+        # that land on one frame sequencer step land on every step
+        for seed in (1, 5, 9):
+            trace = _register_trace(seed=seed, length=20000)
+            for kwargs in ({}, {'audio_mode': "low", 'low_sample_rate': 16384}):
+                with self.subTest(seed=seed, **kwargs):
+                    self.assertEqual(_play(APU(numpy_synthesis=True, **kwargs), trace),
+                                     _play(APU(**kwargs), trace))
+
+    def test_sample_on_frame_sequencer_step(self):
+        """A sample due on the step-7 envelope clock is mixed after the clock."""
+        def play(numpy_synthesis):
+            apu = APU(numpy_synthesis=numpy_synthesis)
+            for address, value in ((0xFF26, 0x80), (0xFF24, 0x77), (0xFF25, 0xFF),
+                                   (0xFF16, 0x80), (0xFF17, 0xF1), (0xFF18, 0x00),
+                                   (0xFF19, 0x87)):  # Channel 2, envelope period 1
+                apu.write(address, value)
+            # Step 7 comes in 296 cycles, and so does the 4th sample
+            apu._fs_step = 7
+            apu._fs_counter = 8192 - 296
+            apu._sample_counter = 4 * 4194304 - 296 * 48000
+            apu._update_cycles_to_event()
+            apu.tick(5000)
+            return apu.drain_samples().tolist()
+
+        reference = play(numpy_synthesis=False)
+        self.assertNotEqual(reference[6:8], reference[4:6])  # The envelope stepped
+        self.assertEqual(play(numpy_synthesis=True), reference)
+
+    def test_sample_points_are_not_events(self):
+        apu = APU(numpy_synthesis=True)
+        apu.write(0xFF26, 0x80)
+        apu.tick(8000)
+        self.assertEqual(apu._pending_cycles, 8000)
+        apu.tick(192)  # Frame sequencer step
+        self.assertEqual(apu._pending_cycles, 0)
+        self.assertEqual(len(apu.drain_samples()), 93 * 2)
+
+    def test_save_state_round_trip(self):
+        apu = APU(numpy_synthesis=True)
+        for op in self.trace[:3000]:
+            if op[0] == 'tick':
+                apu.tick(op[1])
+            elif op[0] == 'write':
+                apu.write(op[1], op[2])
+        state = apu.save_state()
+        self.assertIsInstance(state['hpf_capacitor_left'], float)
+        restored = APU(numpy_synthesis=True)
+        restored.load_state(state)
+        apu.drain_samples()
+        apu.tick(20000)
+        restored.tick(20000)
+        self.assertEqual(restored.drain_samples(), apu.drain_samples())
+
+
+class TestNumpyAudioOption(unittest.TestCase):
+
+    def test_gameboy_option(self):
+        gb = GameBoy(numpy_audio=True)
+        self.assertEqual(gb.apu._synth is not None, block_synth.AVAILABLE)
+
+    def test_falls_back_without_numpy(self):
+        with patch.object(block_synth, "AVAILABLE", False):
+            gb = GameBoy(numpy_audio=True)
+        self.assertIsNone(gb.apu._synth)
+        gb.apu.write(0xFF26, 0x80)
+        gb.apu.tick(1000)
+        self.assertEqual(len(gb.apu.drain_samples()), 11 * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+Lazy APU catch-up: channels advance in closed form when a register access,
+frame sequencer step or sample point is due, and the output must match the
+per-instruction APU bit for bit.
+"""
+
+import random
+import unittest
+import zlib
+
+from src.apu import noise_channel
+from src.apu.apu import APU
+from src.apu.noise_channel import NoiseChannel
+from src.apu.pulse_channel import PulseChannel
+from src.apu.wave_channel import WaveChannel
+
+# CRC-32 of the int16 PCM and register reads of _register_trace(), recorded
+# with the per-instruction APU (every channel timer stepped in a loop)
+TRACE_SAMPLES_CRC = 1821388362
+TRACE_READS_CRC = 3315588090
+
+_WRITABLE = [a for a in range(0xFF10, 0xFF26) if a not in (0xFF15, 0xFF1F)]
+
+
+def _register_trace(seed=21, length=20000):
+    """Return a recorded-style trace of ('tick', cycles), ('write', addr, value), ('read', addr).
+
+    Instruction-sized ticks with the odd HALT-sized one, channel triggers
+    at high and low periods, noise width switches, wave RAM writes and
+    power cycling.
+    """
+    rng = random.Random(seed)
+    trace = [('write', 0xFF26, 0x80), ('write', 0xFF24, 0x77), ('write', 0xFF25, 0xFF)]
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.80:
+            trace.append(('tick', rng.choice((4, 8, 12, 16, 20, 24))))
+        elif roll < 0.82:
+            trace.append(('tick', rng.randrange(100, 20000)))
+        elif roll < 0.90:
+            address = rng.choice((0xFF14, 0xFF19, 0xFF1E, 0xFF23))
+            trace.append(('write', address - 1, rng.randrange(256)))
+            trace.append(('write', address, 0x80 | rng.randrange(8) | rng.choice((0, 0x40))))
+        elif roll < 0.96:
+            trace.append(('write', rng.choice(_WRITABLE), rng.randrange(256)))
+        elif roll < 0.98:
+            trace.append(('write', 0xFF30 + rng.randrange(16), rng.randrange(256)))
+        elif roll < 0.997:
+            trace.append(('read', rng.choice((0xFF26, 0xFF11, 0xFF1C, 0xFF22))))
+        else:
+            trace.append(('write', 0xFF26, 0x00))
+            trace.append(('tick', 40))
+            trace.append(('write', 0xFF26, 0x80))
+    return trace
+
+
+def _play(apu, trace):
+    """Run a trace; return (CRC of all samples as int16 PCM, CRC of all reads)."""
+    samples = zlib.crc32(b"")
+    reads = bytearray()
+    for op in trace:
+        if op[0] == 'tick':
+            apu.tick(op[1])
+        elif op[0] == 'write':
+            apu.write(op[1], op[2])
+        else:
+            reads.append(apu.read(op[1]))
+        if len(apu._ring) > 4096:
+            samples = zlib.crc32(apu.drain_samples(), samples)
+    samples = zlib.crc32(apu.drain_samples(), samples)
+    return samples, zlib.crc32(reads)
+
+
+class TestTraceMatchesPerInstructionAPU(unittest.TestCase):
+
+    def test_recorded_trace_is_bit_identical(self):
+        self.assertEqual(_play(APU(), _register_trace()), (TRACE_SAMPLES_CRC, TRACE_READS_CRC))
+
+    def test_batching_does_not_change_output(self):
+        # One tick per trace entry vs. catching up after every tick
+        class EagerAPU(APU):
+            def tick(self, cycles):
+                super().tick(cycles)
+                if self._pending_cycles:
+                    self._catch_up()
+
+        trace = _register_trace(seed=5, length=4000)
+        self.assertEqual(_play(EagerAPU(), trace), _play(APU(), trace))
+
+
+class TestLazyCatchUp(unittest.TestCase):
+
+    def setUp(self):
+        self.apu = APU()
+        self.apu.write(0xFF26, 0x80)
+        self.apu.write(0xFF12, 0xF0)
+        self.apu.write(0xFF14, 0x87)  # Trigger CH1
+
+    def test_ticks_wait_for_an_event(self):
+        self.apu.tick(8)
+        self.assertEqual(self.apu._pending_cycles, 8)
+        self.assertEqual(self.apu._fs_counter, 0)
+        self.apu.tick(100)  # Past the first sample point
+        self.assertEqual(self.apu._pending_cycles, 0)
+        self.assertEqual(self.apu._fs_counter, 108)
+        self.assertEqual(len(self.apu._ring), 1)
+
+    def test_register_access_catches_up(self):
+        self.apu.write(0xFF11, 0x01)  # Length 63
+        self.apu.write(0xFF14, 0xC7)  # Trigger with length enabled
+        self.apu.tick(8000)
+        self.apu.tick(8)
+        self.assertEqual(self.apu._pending_cycles, 8)
+        self.apu.read(0xFF26)
+        self.assertEqual(self.apu._pending_cycles, 0)
+        self.assertEqual(self.apu._fs_counter, 8008)
+        self.assertEqual(self.apu._ch1._length_counter, 63)
+
+    def test_save_state_and_drain_catch_up(self):
+        self.apu.tick(60)
+        self.assertEqual(len(self.apu.drain_samples()), 0)
+        self.apu.tick(40)
+        self.assertEqual(self.apu._pending_cycles, 0)
+        self.apu.tick(20)
+        self.assertEqual(self.apu.save_state()['fs_counter'], 120)
+
+
+def _reference_tick(channel, cycles, reload, on_reload):
+    """The per-cycle-batch loop the closed forms replace."""
+    channel._freq_timer -= cycles
+    while channel._freq_timer <= 0:
+        channel._freq_timer += reload
+        on_reload()
+
+
+class TestClosedFormChannels(unittest.TestCase):
+
+    def test_pulse(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            period, timer, pos, cycles = (rng.randrange(2048), rng.randrange(1, 8193),
+                                          rng.randrange(8), rng.randrange(20000))
+            channel, reference = PulseChannel(), PulseChannel()
+            for ch in (channel, reference):
+                ch._enabled, ch._period, ch._freq_timer, ch._duty_pos = True, period, timer, pos
+
+            def step():
+                reference._duty_pos = (reference._duty_pos + 1) & 7
+            _reference_tick(reference, cycles, (2048 - period) * 4, step)
+            channel.tick(cycles)
+            self.assertEqual((channel._freq_timer, channel._duty_pos),
+                             (reference._freq_timer, reference._duty_pos))
+
+    def test_wave(self):
+        rng = random.Random(2)
+        for _ in range(2000):
+            period, timer, pos, cycles = (rng.randrange(2048), rng.randrange(1, 4097),
+                                          rng.randrange(32), rng.randrange(20000))
+            ram = bytes(rng.randrange(256) for _ in range(16))
+            channel, reference = WaveChannel(), WaveChannel()
+            for ch in (channel, reference):
+                ch._enabled, ch._period, ch._freq_timer, ch._wave_pos = True, period, timer, pos
+                ch._wave_ram = bytearray(ram)
+
+            def step():
+                reference._wave_pos = (reference._wave_pos + 1) & 31
+                byte = ram[reference._wave_pos >> 1]
+                reference._sample_buffer = byte & 0x0F if reference._wave_pos & 1 else byte >> 4
+            _reference_tick(reference, cycles, (2048 - period) * 2, step)
+            channel.tick(cycles)
+            self.assertEqual((channel._freq_timer, channel._wave_pos, channel._sample_buffer),
+                             (reference._freq_timer, reference._wave_pos, reference._sample_buffer))
+
+    def test_noise(self):
+        rng = random.Random(3)
+        for _ in range(2000):
+            nr43, lfsr, cycles = rng.randrange(256), rng.randrange(0x8000), rng.randrange(20000)
+            channel, reference = NoiseChannel(), NoiseChannel()
+            for ch in (channel, reference):
+                ch.write(2, nr43)
+                ch._enabled, ch._lfsr = True, lfsr
+                ch._freq_timer = rng.randrange(1, ch._get_timer_period() + 1)
+            reference._freq_timer = channel._freq_timer
+
+            def step():
+                lfsr = reference._lfsr
+                xor_bit = (lfsr & 1) ^ ((lfsr >> 1) & 1)
+                lfsr = (lfsr >> 1) | (xor_bit << 14)
+                if reference._width_mode:
+                    lfsr = (lfsr & ~0x40) | (xor_bit << 6)
+                reference._lfsr = lfsr
+            _reference_tick(reference, cycles, reference._get_timer_period(), step)
+            channel.tick(cycles)
+            self.assertEqual((channel._freq_timer, channel._lfsr),
+                             (reference._freq_timer, reference._lfsr))
+
+    def test_lfsr_jumps_from_any_state(self):
+        # Including states a width-mode switch can leave behind, and zero
+        rng = random.Random(4)
+        for width_mode in (False, True):
+            for lfsr in [0, 0x7FFF, 0x0040, 0x7F80] + [rng.randrange(0x8000) for _ in range(300)]:
+                steps = rng.randrange(16, 3000)
+                expected = lfsr
+                for _ in range(steps):
+                    expected = noise_channel._lfsr_step(expected, width_mode)
+                self.assertEqual(noise_channel.lfsr_advance(lfsr, steps, width_mode), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
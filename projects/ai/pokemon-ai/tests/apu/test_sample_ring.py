@@ -0,0 +1,135 @@
+"""
+APU sample ring: int16 stereo frames in a preallocated array, drained as
+zero-copy memoryviews, with overflow counted instead of growing.
+"""
+
+import io
+import os
+import unittest
+import wave
+from unittest.mock import patch
+
+from src.apu.apu import APU
+from src.apu.sample_ring import SampleRing
+
+
+class TestSampleRing(unittest.TestCase):
+
+    def test_push_clamps_and_scales(self):
+        ring = SampleRing(4)
+        ring.push(0.5, -0.25)
+        ring.push(3.0, -3.0)
+        self.assertEqual(len(ring), 2)
+        self.assertEqual(ring.drain().tolist(), [16383, -8191, 32767, -32767])
+
+    def test_drain_is_a_view_of_the_ring(self):
+        ring = SampleRing(4)
+        ring.push(0.5, 0.5)
+        samples = ring.drain()
+        self.assertIs(samples.obj, ring.buffer)
+        self.assertEqual(samples.format, 'h')
+        self.assertEqual(len(ring.drain()), 0)
+
+    def test_wrapping_keeps_undrained_frames(self):
+        ring = SampleRing(4)
+        for value in (0.1, 0.2, 0.3):
+            ring.push(value, -value)
+        ring.drain()
+        ring.push(0.4, -0.4)
+        samples = ring.drain()  # Values 6-7, at the end of the buffer
+        for value in (0.5, 0.6, 0.7, 0.8):
+            ring.push(value, -value)
+        # Wrapped to the start, stopping short of the drained view
+        self.assertEqual(samples.tolist(), [13106, -13106])
+        self.assertEqual(ring.overflow_frames, 1)
+        self.assertEqual(ring.drain().tolist(), [16383, -16383, 19660, -19660, 22936, -22936])
+
+    def test_drained_view_valid_until_next_drain(self):
+        ring = SampleRing(4)
+        for value in (0.1, 0.2, 0.3, 0.4):
+            ring.push(value, value)
+        samples = ring.drain()  # The whole buffer
+        expected = samples.tolist()
+        ring.push(-1.0, -1.0)
+        self.assertEqual(samples.tolist(), expected)
+        self.assertEqual(ring.overflow_frames, 1)
+        ring.drain()
+        ring.push(-1.0, -1.0)
+        self.assertEqual(ring.drain().tolist(), [-32767, -32767])
+
+    def test_overflow_drops_new_frames(self):
+        ring = SampleRing(2)
+        for value in (0.1, 0.2, 0.3):
+            ring.push(value, value)
+        self.assertEqual(ring.overflow_frames, 1)
+        self.assertEqual(ring.drain().tolist(), [3276, 3276, 6553, 6553])
+
+    def test_reserve_claims_what_fits(self):
+        ring = SampleRing(4)
+        ring.push(0.1, 0.1)
+        self.assertEqual(ring.reserve(2), (2, 2))
+        ring.drain()
+        self.assertEqual(ring.reserve(3), (6, 1))  # Not over the drained values 0-5
+        ring.drain()
+        self.assertEqual(ring.reserve(3), (0, 3))
+        self.assertEqual(ring.overflow_frames, 2)
+        self.assertEqual(len(ring), 3)
+
+
+class TestAPUSampleOutput(unittest.TestCase):
+
+    def _powered_apu(self, **kwargs):
+        apu = APU(**kwargs)
+        apu.write(0xFF26, 0x80)
+        apu.write(0xFF24, 0x77)
+        apu.write(0xFF25, 0xFF)
+        apu.write(0xFF12, 0xF0)
+        apu.write(0xFF14, 0x87)
+        return apu
+
+    def test_undrained_output_overflows(self):
+        for numpy_synthesis in (False, True):
+            apu = self._powered_apu(numpy_synthesis=numpy_synthesis)
+            apu.tick(APU.CPU_CLOCK + 4 * 70224)  # A second and a bit
+            self.assertEqual(len(apu._ring), 48000)
+            self.assertGreater(apu.overflow_frames, 0)
+
+    def test_draining_keeps_up(self):
+        apu = self._powered_apu()
+        for _ in range(120):
+            apu.tick(70224)
+            apu.drain_samples()
+        self.assertEqual(apu.overflow_frames, 0)
+
+    def test_view_feeds_wave_writer(self):
+        apu = self._powered_apu()
+        apu.tick(70224)
+        samples = apu.drain_samples()
+        out = io.BytesIO()
+        with wave.open(out, 'wb') as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)
+            wav.setframerate(APU.SAMPLE_RATE)
+            wav.writeframes(samples)
+        out.seek(0)
+        with wave.open(out, 'rb') as wav:
+            self.assertEqual(wav.getnframes(), len(samples) // 2)
+            self.assertEqual(wav.readframes(wav.getnframes()), samples.tobytes())
+
+    def test_view_feeds_pygame_sound(self):
+        import pygame
+
+        apu = self._powered_apu()
+        apu.tick(70224)
+        samples = apu.drain_samples()
+        with patch.dict(os.environ, {'SDL_AUDIODRIVER': 'dummy'}):
+            pygame.mixer.init(frequency=48000, size=-16, channels=2)
+            try:
+                sound = pygame.mixer.Sound(buffer=samples)
+                self.assertEqual(sound.get_raw(), samples.tobytes())
+            finally:
+                pygame.mixer.quit()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+import os
+import tempfile
+import unittest
+
+from src.cpu.gb_cpu import CPU
+from src.memory.gb_memory import Memory
+from src.gameboy import GameBoy
+
+
+def _build_test_rom():
+    """Build a 4-bank MBC1 ROM exercising the block compiler's edge cases.
+
+    The main loop switches ROM banks and calls into the same 0x4000 address
+    in two different banks, calls a routine copied to WRAM and patches that
+    routine's immediate operand every iteration (self-modifying code), while
+    timer and V-Blank interrupts fire underneath.
+    """
+    rom = bytearray(4 * 0x4000)
+
+    # V-Blank ISR: record LY at 0xC102
+    rom[0x0040:0x0048] = bytes([0xF5, 0xF0, 0x44, 0xEA, 0x02, 0xC1, 0xF1, 0xD9])
+    # Timer ISR: increment counter at 0xC100
+    rom[0x0050:0x005A] = bytes([0xF5, 0xFA, 0x00, 0xC1, 0x3C, 0xEA, 0x00, 0xC1, 0xF1, 0xD9])
+
+    rom[0x0100:0x0104] = bytes([0x00, 0xC3, 0x50, 0x01])  # NOP; JP 0x0150
+    rom[0x0147] = 0x01  # MBC1
+    rom[0x0148] = 0x01  # 64KB (4 banks)
+    checksum = 0
+    for addr in range(0x0134, 0x014D):
+        checksum = (checksum - rom[addr] - 1) & 0xFF
+    rom[0x014D] = checksum
+
+    program = [
+        0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+        0x3E, 0x05,              # LD A,0x05
+        0xE0, 0x07,              # LDH (TAC),A  — timer on, 262144 Hz
+        0x3E, 0x05,              # LD A,0x05
+        0xE0, 0xFF,              # LDH (IE),A   — V-Blank + timer
+        0x21, 0x00, 0xC0,        # LD HL,0xC000
+        0x11, 0x00, 0x03,        # LD DE,0x0300
+        0x0E, 0x10,              # LD C,0x10
+        0x1A,                    # copy: LD A,(DE)
+        0x22,                    # LD (HL+),A
+        0x13,                    # INC DE
+        0x0D,                    # DEC C
+        0x20, 0xFA,              # JR NZ,copy
+        0xFB,                    # EI
+        0x3E, 0x02,              # loop: LD A,2
+        0xEA, 0x00, 0x20,        # LD (0x2000),A  — select bank 2
+        0xCD, 0x00, 0x40,        # CALL 0x4000
+        0x3E, 0x03,              # LD A,3
+        0xEA, 0x00, 0x20,        # LD (0x2000),A  — select bank 3
+        0xCD, 0x00, 0x40,        # CALL 0x4000
+        0xCD, 0x00, 0xC0,        # CALL 0xC000
+        0x21, 0x01, 0xC0,        # LD HL,0xC001
+        0x34,                    # INC (HL)       — patch WRAM routine
+        0xC3, 0x6A, 0x01,        # JP loop (0x016A)
+    ]
+    rom[0x0150:0x0150 + len(program)] = bytes(program)
+
+    # WRAM routine (copied to 0xC000)
+    rom[0x0300:0x030A] = bytes([
+        0x3E, 0x01,              # LD A,imm (patched)
+        0x21, 0x10, 0xC1,        # LD HL,0xC110
+        0x86,                    # ADD A,(HL)
+        0x77,                    # LD (HL),A
+        0xCB, 0x37,              # SWAP A
+        0xC9,                    # RET
+    ])
+    # Bank 2 and bank 3 routines at 0x4000
+    rom[0x8000:0x8006] = bytes([0x21, 0x20, 0xC1, 0x34, 0x27, 0xC9])  # INC (0xC120); DAA; RET
+    rom[0xC000:0xC006] = bytes([0x21, 0x21, 0xC1, 0x35, 0x1F, 0xC9])  # DEC (0xC121); RRA; RET
+
+    fd, path = tempfile.mkstemp(suffix=".gb")
+    os.write(fd, bytes(rom))
+    os.close(fd)
+    return path
+
+
+def _snapshot(gb):
+    cpu = gb.cpu
+    return (
+        cpu.save_state(),
+        bytes(gb.memory.memory[0xC000:0xE000]),
+        bytes(gb.memory.memory[0xFF80:0x10000]),
+        gb.memory.memory[0xFF0F],
+        gb.timer.save_state(),
+        gb.ppu._ly,
+        gb.ppu._dot,
+        gb.cartridge._mbc._rom_bank,
+    )
+
+
+class TestBlockCompilerDifferential(unittest.TestCase):
+    """Block mode must produce exactly the interpreter's state."""
+
+    def setUp(self):
+        self.rom_path = _build_test_rom()
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def _make_gameboy(self, compile_blocks):
+        gb = GameBoy(compile_blocks=compile_blocks)
+        gb.load_cartridge(self.rom_path)
+        gb.cpu.registers.PC = 0x0100
+        return gb
+
+    def test_matches_interpreter_in_chunks(self):
+        """Odd-sized run budgets exercise early block exits."""
+        reference = self._make_gameboy(compile_blocks=False)
+        compiled = self._make_gameboy(compile_blocks=True)
+        for chunk in (1, 7, 33, 100, 1013, 5000, 20000, 70224):
+            reference.run(max_cycles=reference.cpu.current_cycles + chunk)
+            compiled.run(max_cycles=compiled.cpu.current_cycles + chunk)
+            self.assertEqual(_snapshot(compiled), _snapshot(reference))
+
+    def test_interrupts_and_bank_switches_happen(self):
+        """Sanity check that the test program reaches the interesting paths."""
+        gb = self._make_gameboy(compile_blocks=True)
+        gb.run(max_cycles=200000)
+        self.assertGreater(gb.memory.memory[0xC100], 0)  # timer ISR ran
+        self.assertNotEqual(gb.memory.memory[0xC120], 0)  # bank 2 routine ran
+        self.assertNotEqual(gb.memory.memory[0xC121], 0)  # bank 3 routine ran
+        self.assertGreater(len(gb.cpu._block_cache), 0)
+
+    def test_banked_blocks_keyed_by_bank(self):
+        gb = self._make_gameboy(compile_blocks=True)
+        gb.run(max_cycles=50000)
+        self.assertIn((2 << 16) | 0x4000, gb.cpu._block_cache)
+        self.assertIn((3 << 16) | 0x4000, gb.cpu._block_cache)
+
+    def test_load_state_clears_ram_blocks(self):
+        gb = self._make_gameboy(compile_blocks=True)
+        gb.run(max_cycles=50000)
+        # The loop patches its WRAM routine every iteration; step until a
+        # freshly compiled copy of it is cached.
+        while not gb.cpu._ram_block_cache:
+            gb.run(max_cycles=gb.cpu.current_cycles + 4)
+        state = gb.save_state()
+        gb.load_state(state)
+        self.assertFalse(gb.cpu._ram_block_cache)
+        self.assertFalse(any(gb.memory._code_map))
+
+
+class TestBlockCompilerSelfModifyingCode(unittest.TestCase):
+    """Writes into compiled RAM code must be seen by the next instruction."""
+
+    def _run(self, compile_blocks):
+        memory = Memory()
+        cpu = CPU(memory, compile_blocks=compile_blocks)
+        program = [
+            0x3E, 0x3C,              # LD A,0x3C (INC A opcode)
+            0xEA, 0x06, 0x00,        # LD (0x0006),A — patch the NOP below
+            0x00,                    # NOP
+            0x00,                    # NOP -> INC A
+            0x18, 0xFE,              # JR -2
+        ]
+        for i, byte in enumerate(program):
+            memory.set_value(i, byte)
+        cpu.run(max_cycles=200)
+        return cpu
+
+    def test_patched_instruction_executes(self):
+        compiled = self._run(compile_blocks=True)
+        reference = self._run(compile_blocks=False)
+        self.assertEqual(compiled.registers.AF >> 8, 0x3D)
+        self.assertEqual(compiled.save_state(), reference.save_state())
+
+    def test_rewrites_only_evict_the_block_written(self):
+        memory = Memory()
+        cpu = CPU(memory, compile_blocks=True)
+        cpu.registers.SP = 0xD000
+        program = {
+            0x0000: [0x3E, 0x3C,           # LD A,0x3C
+                     0xEA, 0x01, 0x01,     # LD (0x0101),A — patch block A
+                     0xCD, 0x00, 0x01,     # CALL 0x0100 (block A)
+                     0xCD, 0x00, 0x02,     # CALL 0x0200 (block B)
+                     0x18, 0xF5],          # JR back to the patch
+            0x0100: [0x00, 0x00, 0xC9],    # NOP; NOP -> INC A; RET
+            0x0200: [0x04, 0xC9],          # INC B; RET
+        }
+        for start, code in program.items():
+            for i, byte in enumerate(code):
+                memory.set_value(start + i, byte)
+        cpu.run(max_cycles=5000)
+        # Block A was rewritten too often and is interpreted from now on
+        self.assertGreaterEqual(cpu._ram_block_recompiles[0x0100], 8)
+        self.assertIsNone(cpu._ram_block_cache[0x0100])
+        # Block B was never written and stays compiled
+        self.assertIsNotNone(cpu._ram_block_cache[0x0200])
+        self.assertNotIn(0x0200, cpu._ram_block_recompiles)
+        self.assertEqual(memory._code_map[0x0200:0x0202], b"\x01\x01")
+
+    def test_halt_falls_back_to_interpreter(self):
+        memory = Memory()
+        cpu = CPU(memory, compile_blocks=True)
+        memory.set_value(0x0000, 0x00)  # NOP
+        memory.set_value(0x0001, 0x76)  # HALT
+        cpu.run(max_cycles=40)
+        self.assertTrue(cpu.interrupts.halted)
+        self.assertEqual(cpu.registers.PC, 0x0002)
+        self.assertEqual(cpu.current_cycles, 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
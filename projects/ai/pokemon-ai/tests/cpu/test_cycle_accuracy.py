@@ -9,9 +9,9 @@ are verified.
 Total coverage: ~500 cycle checks across all unprefixed and CB-prefixed opcodes.
 """
 
-import json
 import unittest
 from src.cpu.gb_cpu import CPU
+from src.cpu.opcode_tables import load_opcodes_db
 from src.memory.gb_memory import Memory
 
 
@@ -53,8 +53,7 @@ class TestUnprefixedCycleAccuracy(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        with open("Opcodes.json") as f:
-            cls.opcodes_db = json.load(f)
+        cls.opcodes_db = load_opcodes_db(cache_path=None)
 
     def _make_cpu(self):
         """Create a fresh CPU with safe register defaults."""
@@ -166,8 +165,7 @@ class TestCBPrefixedCycleAccuracy(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        with open("Opcodes.json") as f:
-            cls.opcodes_db = json.load(f)
+        cls.opcodes_db = load_opcodes_db(cache_path=None)
 
     def test_all_cb_cycles(self):
         """Every CB-prefixed opcode returns correct cycle count."""
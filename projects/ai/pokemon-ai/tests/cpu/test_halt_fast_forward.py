@@ -0,0 +1,111 @@
+"""
+HALT fast-forward: skipping idle HALT time in one batch must wake the CPU on
+exactly the same cycle as stepping it 4 T-cycles at a time.
+
+The reference machine has _cycles_until_wake() pinned to 1, which makes
+every fast-forward a single 4-cycle step, i.e. the original HALT loop.
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.gameboy import GameBoy
+from tests.scheduler.test_scheduler import _build_test_rom as _build_ppu_timer_apu_rom
+
+
+def _build_timer_rom():
+    """Build a ROM that HALTs until each timer interrupt and logs DIV.
+
+    The LCD is off, so the timer is the only wake-up source. Each wake-up
+    stores DIV to the next byte at 0xC100.
+    """
+    rom = bytearray(0x8000)
+    rom[0x0050] = 0xD9                                     # Timer ISR: RETI
+    rom[0x0100:0x0104] = bytes([0x00, 0xC3, 0x50, 0x01])   # NOP; JP 0x0150
+    program = [
+        0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+        0x3E, 0x00, 0xE0, 0x40,  # LCDC = off
+        0x3E, 0x04, 0xE0, 0x07,  # TAC = timer on, 1024 T-cycles
+        0x3E, 0xF0, 0xE0, 0x06,  # TMA = 0xF0
+        0xE0, 0x05,              # TIMA = 0xF0
+        0x3E, 0x04, 0xE0, 0xFF,  # IE = timer
+        0x21, 0x00, 0xC1,        # LD HL,0xC100
+        0xFB,                    # EI
+    ]
+    loop = [
+        0x76,                    # HALT
+        0xF0, 0x04,              # LDH A,(DIV)
+        0x22,                    # LD (HL+),A
+        0x2C,                    # INC L — stay inside 0xC1xx
+    ]
+    loop += [0x18, (-(len(loop) + 2)) & 0xFF]  # JR loop
+    program += loop
+    rom[0x0150:0x0150 + len(program)] = bytes(program)
+
+    fd, path = tempfile.mkstemp(suffix=".gb")
+    os.write(fd, bytes(rom))
+    os.close(fd)
+    return path
+
+
+class TestHaltFastForward(unittest.TestCase):
+
+    def _make_gameboy(self, rom_path, stepped=False, **kwargs):
+        gb = GameBoy(**kwargs)
+        gb.load_cartridge(rom_path)
+        gb.cpu.registers.PC = 0x0100
+        if stepped:
+            gb.cpu._cycles_until_wake = lambda: 1
+        return gb
+
+    def _assert_same_run(self, rom_path, **kwargs):
+        reference = self._make_gameboy(rom_path, stepped=True, **kwargs)
+        fast = self._make_gameboy(rom_path, **kwargs)
+        for chunk in (1, 3, 9, 100, 457, 1025, 5000, 70224, 140448):
+            reference.run(max_cycles=reference.cpu.current_cycles + chunk)
+            fast.run(max_cycles=fast.cpu.current_cycles + chunk)
+            self.assertEqual(fast.cpu.current_cycles, reference.cpu.current_cycles)
+            self.assertEqual(fast.save_state(), reference.save_state())
+            self.assertEqual(fast.apu.drain_samples(), reference.apu.drain_samples())
+        return fast
+
+    def test_timer_wake_ups(self):
+        rom_path = _build_timer_rom()
+        try:
+            for kwargs in ({}, {"compile_blocks": True}, {"event_scheduler": True}):
+                with self.subTest(**kwargs):
+                    gb = self._assert_same_run(rom_path, **kwargs)
+                    self.assertGreater(gb.cpu.registers.L, 4)  # several wake-ups logged
+        finally:
+            os.unlink(rom_path)
+
+    def test_ppu_timer_apu_wake_ups(self):
+        rom_path = _build_ppu_timer_apu_rom()
+        try:
+            for kwargs in ({}, {"compile_blocks": True}, {"event_scheduler": True},
+                           {"compile_blocks": True, "event_scheduler": True}):
+                with self.subTest(**kwargs):
+                    self._assert_same_run(rom_path, **kwargs)
+        finally:
+            os.unlink(rom_path)
+
+    def test_idle_halt_is_one_batch(self):
+        """With no interrupt source at all, the whole budget is one tick."""
+        rom_path = _build_timer_rom()
+        try:
+            gb = self._make_gameboy(rom_path)
+            gb.run(max_cycles=200)  # past setup, now halted
+            self.assertTrue(gb.cpu.interrupts.halted)
+            gb.timer.write(0xFF07, 0x00)  # timer off; LCD is already off
+            ticks = []
+            gb.timer.tick = ticks.append
+            gb.run(max_cycles=gb.cpu.current_cycles + 70224)
+            self.assertEqual(len(ticks), 1)
+            self.assertTrue(gb.cpu.interrupts.halted)
+        finally:
+            os.unlink(rom_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
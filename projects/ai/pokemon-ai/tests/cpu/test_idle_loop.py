@@ -0,0 +1,174 @@
+"""
+Idle-loop skipping: fast-forwarding through polling loops must leave the
+machine in exactly the state the plain run loop reaches, at every run()
+boundary.
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.gameboy import GameBoy
+from src.cpu.idle_loop import analyze_idle_loop, is_stable_address
+
+
+def _write_rom(program, isrs=()):
+    rom = bytearray(0x8000)
+    for address, code in isrs:
+        rom[address:address + len(code)] = bytes(code)
+    rom[0x0100:0x0104] = bytes([0x00, 0xC3, 0x50, 0x01])  # NOP; JP 0x0150
+    rom[0x0150:0x0150 + len(program)] = bytes(program)
+    fd, path = tempfile.mkstemp(suffix=".gb")
+    os.write(fd, bytes(rom))
+    os.close(fd)
+    return path
+
+
+def _build_polling_rom():
+    """Build a ROM that cycles through several kinds of wait loop.
+
+    V-Blank sets a flag at 0xC000 and counts frames at 0xC001; the timer
+    interrupt counts at 0xC002. The main loop waits for LY, counts down a
+    register, waits for the V-Blank flag (with LD and with BIT (HL)) and
+    polls DIV, which must never be skipped.
+    """
+    vblank = [0xF5, 0x3E, 0x01, 0xEA, 0x00, 0xC0,   # PUSH AF; (0xC000) = 1
+              0xFA, 0x01, 0xC0, 0x3C, 0xEA, 0x01, 0xC0,  # (0xC001) += 1
+              0xF1, 0xD9]                          # POP AF; RETI
+    timer = [0xF5, 0xFA, 0x02, 0xC0, 0x3C, 0xEA, 0x02, 0xC0, 0xF1, 0xD9]
+    setup = [
+        0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+        0x3E, 0x05, 0xE0, 0x07,  # TAC = timer on, 16 T-cycles
+        0x3E, 0x05, 0xE0, 0xFF,  # IE = V-Blank, timer
+        0x3E, 0x91, 0xE0, 0x40,  # LCDC = on
+        0xFB,                    # EI
+    ]
+    main = [
+        0xF0, 0x44, 0xFE, 0x90, 0x20, 0xFA,  # w1: LDH A,(LY); CP 0x90; JR NZ,w1
+        0x06, 0x20, 0x05, 0x20, 0xFD,        # LD B,0x20; w2: DEC B; JR NZ,w2
+        0xAF, 0xEA, 0x00, 0xC0,              # XOR A; LD (0xC000),A
+        0xFA, 0x00, 0xC0, 0xA7, 0x28, 0xFA,  # w3: LD A,(0xC000); AND A; JR Z,w3
+        0xF0, 0x04, 0xE6, 0x40, 0x28, 0xFA,  # w4: LDH A,(DIV); AND 0x40; JR Z,w4
+        0x21, 0x00, 0xC0, 0x36, 0x00,        # LD HL,0xC000; LD (HL),0
+        0xCB, 0x46, 0x28, 0xFC,              # w5: BIT 0,(HL); JR Z,w5
+    ]
+    main += [0x18, (-(len(main) + 2)) & 0xFF]  # JR main
+    return _write_rom(setup + main, isrs=((0x0040, vblank), (0x0050, timer)))
+
+
+class TestIdleLoopSkipping(unittest.TestCase):
+
+    def setUp(self):
+        self.rom_path = _build_polling_rom()
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def _make_gameboy(self, **kwargs):
+        gb = GameBoy(**kwargs)
+        gb.load_cartridge(self.rom_path)
+        gb.cpu.registers.PC = 0x0100
+        return gb
+
+    def _assert_same_run(self, **kwargs):
+        reference = self._make_gameboy(skip_idle_loops=False, **kwargs)
+        skipping = self._make_gameboy(skip_idle_loops=True, **kwargs)
+        for chunk in (1, 9, 100, 457, 5000, 20000, 70224, 140448, 70224 * 3):
+            reference.run(max_cycles=reference.cpu.current_cycles + chunk)
+            skipping.run(max_cycles=skipping.cpu.current_cycles + chunk)
+            self.assertEqual(skipping.cpu.current_cycles, reference.cpu.current_cycles)
+            self.assertEqual(skipping.save_state(), reference.save_state())
+            self.assertEqual(skipping.apu.drain_samples(), reference.apu.drain_samples())
+            self.assertEqual(skipping.ppu.get_color_buffer(), reference.ppu.get_color_buffer())
+        self.assertEqual(reference.cpu.idle_cycles_skipped, 0)
+        return skipping
+
+    def test_interpreter(self):
+        gb = self._assert_same_run()
+        self.assertGreater(gb.memory.memory[0xC001], 5)  # frames went by
+        self.assertGreater(gb.cpu.idle_cycles_skipped, 70224)
+
+    def test_off_by_default(self):
+        gb = self._make_gameboy()
+        gb.run(max_cycles=70224 * 3)
+        self.assertFalse(gb.cpu.skip_idle_loops)
+        self.assertEqual(gb.cpu.idle_cycles_skipped, 0)
+
+    def test_block_compiler(self):
+        gb = self._assert_same_run(compile_blocks=True)
+        self.assertGreater(gb.cpu.idle_cycles_skipped, 70224)
+
+    def test_event_scheduler(self):
+        self._assert_same_run(event_scheduler=True)
+        self._assert_same_run(compile_blocks=True, event_scheduler=True)
+
+    def test_spin_until_interrupt(self):
+        """JR to itself with the LCD off: skipped from timer event to event."""
+        os.unlink(self.rom_path)
+        self.rom_path = _write_rom([
+            0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+            0x3E, 0x00, 0xE0, 0x40,  # LCDC = off
+            0x3E, 0x04, 0xE0, 0x07,  # TAC = timer on, 1024 T-cycles
+            0x3E, 0x04, 0xE0, 0xFF,  # IE = timer
+            0xFB,                    # EI
+            0x18, 0xFE,              # JR @
+        ], isrs=((0x0050, [0xF5, 0xFA, 0x02, 0xC0, 0x3C, 0xEA, 0x02, 0xC0, 0xF1, 0xD9]),))
+        gb = self._assert_same_run()
+        self.assertGreater(gb.memory.memory[0xC002], 0)
+        self.assertGreater(gb.cpu.idle_cycles_skipped, gb.cpu.current_cycles * 9 // 10)
+
+    def test_loop_closed_by_jp_hl(self):
+        """JP HL back to itself in the interpreter: no operand after the branch."""
+        os.unlink(self.rom_path)
+        self.rom_path = _write_rom([
+            0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+            0x3E, 0x00, 0xE0, 0x40,  # LCDC = off
+            0x3E, 0x04, 0xE0, 0x07,  # TAC = timer on, 1024 T-cycles
+            0x3E, 0x04, 0xE0, 0xFF,  # IE = timer
+            0xFB,                    # EI
+            0x21, 0x63, 0x01,        # LD HL,0x0163
+            0xE9,                    # JP HL (0x0163)
+        ], isrs=((0x0050, [0xF5, 0xFA, 0x02, 0xC0, 0x3C, 0xEA, 0x02, 0xC0, 0xF1, 0xD9]),))
+        gb = self._assert_same_run()
+        self.assertGreater(gb.memory.memory[0xC002], 0)
+        self.assertGreater(gb.cpu.idle_cycles_skipped, gb.cpu.current_cycles * 9 // 10)
+
+
+class TestIdleLoopAnalysis(unittest.TestCase):
+
+    def _analyze(self, code):
+        path = _write_rom(code)
+        try:
+            gb = GameBoy()
+            gb.load_cartridge(path)
+            return analyze_idle_loop(gb.cpu, 0x0150)
+        finally:
+            os.unlink(path)
+
+    def test_polling_loops(self):
+        loop = self._analyze([0xF0, 0x44, 0xFE, 0x90, 0x20, 0xFA])
+        self.assertEqual((loop.branch, loop.reads), (0x0154, (0xFF44,)))
+        loop = self._analyze([0x7E, 0xA7, 0xCA, 0x50, 0x01])  # LD A,(HL); JP Z
+        self.assertEqual((loop.branch, loop.reads), (0x0152, ("HL",)))
+        self.assertIsNotNone(self._analyze([0x18, 0xFE]))
+        loop = self._analyze([0xF0, 0x44, 0xE9])  # LDH A,(LY); JP HL
+        self.assertEqual((loop.branch, loop.reads), (0x0152, (0xFF44,)))
+
+    def test_rejected_loops(self):
+        self.assertIsNone(self._analyze([0x2A, 0xA7, 0x28, 0xFC]))        # LD A,(HL+)
+        self.assertIsNone(self._analyze([0x77, 0x18, 0xFD]))              # LD (HL),A
+        self.assertIsNone(self._analyze([0xCB, 0xC6, 0x18, 0xFC]))        # SET 0,(HL)
+        self.assertIsNone(self._analyze([0x23, 0x7E, 0xA7, 0x28, 0xFB]))  # INC HL; LD A,(HL)
+        self.assertIsNone(self._analyze([0xF5, 0xF1, 0x18, 0xFC]))        # PUSH AF; POP AF
+        self.assertIsNone(self._analyze([0x00, 0x18, 0x00]))              # JR elsewhere
+        self.assertIsNone(self._analyze([0x00, 0xC9]))                    # RET
+
+    def test_stable_addresses(self):
+        for address in (0x0000, 0x8000, 0xC000, 0xFE00, 0xFF00, 0xFF0F, 0xFF41, 0xFF44, 0xFF80):
+            self.assertTrue(is_stable_address(address), hex(address))
+        for address in (0xFF04, 0xFF05, 0xFF26):
+            self.assertFalse(is_stable_address(address), hex(address))
+
+
+if __name__ == "__main__":
+    unittest.main()
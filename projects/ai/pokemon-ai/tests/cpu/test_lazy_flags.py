@@ -0,0 +1,126 @@
+"""
+Differential tests: lazy-flags mode vs eager flag computation.
+
+A CPU built with lazy_flags=True must be observably identical to the
+default CPU: after every instruction, AF (which resolves any pending flag
+record) and the rest of the register file must match. Instruction streams
+run uninterrupted, so conditional branches read flag records left pending
+by the instructions before them.
+"""
+
+import random
+import unittest
+
+from src.cpu.gb_cpu import CPU
+from src.cpu.registers import LazyFlagRegisters
+from src.memory.gb_memory import Memory
+
+
+# Opcodes that only touch registers (no (HL) operands, no control flow away
+# from the stream): 8-bit ALU/LD/INC/DEC, rotates, DAA/CPL/SCF/CCF and the
+# immediate ALU forms.
+_REGISTER_OPS = [op for op in range(0x40, 0xC0)
+                 if op != 0x76 and (op & 0x07) != 0x06 and not 0x70 <= op <= 0x77]
+_REGISTER_OPS += [0x04, 0x05, 0x0C, 0x0D, 0x14, 0x15, 0x1C, 0x1D, 0x24, 0x25, 0x2C, 0x2D,
+                  0x3C, 0x3D, 0x07, 0x0F, 0x17, 0x1F, 0x27, 0x2F, 0x37, 0x3F]
+_IMMEDIATE_ALU_OPS = [0xC6, 0xCE, 0xD6, 0xDE, 0xE6, 0xEE, 0xF6, 0xFE]
+# JR cc / JP cc skipping an INC B or INC C: the branch taken shows in B/C
+# and in the cycle count
+_CONDITIONAL_JRS = [0x20, 0x28, 0x30, 0x38]
+_CONDITIONAL_JPS = [0xC2, 0xCA, 0xD2, 0xDA]
+
+
+def _random_program(rng, length):
+    program = []
+    while len(program) < length:
+        kind = rng.random()
+        if kind < 0.55:
+            program.append(rng.choice(_REGISTER_OPS))
+        elif kind < 0.75:
+            program += [rng.choice(_IMMEDIATE_ALU_OPS), rng.getrandbits(8)]
+        elif kind < 0.80:
+            program += [rng.choice(_CONDITIONAL_JRS), 0x01, 0x04]
+        elif kind < 0.85:
+            target = len(program) + 4
+            program += [rng.choice(_CONDITIONAL_JPS), target & 0xFF, target >> 8, 0x0C]
+        elif kind < 0.92:
+            # CB op on a register (not (HL))
+            program += [0xCB, rng.choice([op for op in range(256) if (op & 0x07) != 0x06])]
+        else:
+            program += [0xF5, 0xF1]  # PUSH AF; POP AF
+    return program + [0x18, 0xFE]  # JR @
+
+
+class TestLazyFlagsMatchEager(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rng = random.Random(0x1A2F)
+        cls.memory_image = bytes(cls.rng.getrandbits(8) for _ in range(0x10000))
+
+    def test_lazy_cpu_uses_lazy_register_file(self):
+        self.assertIsInstance(CPU(Memory(), lazy_flags=True).registers, LazyFlagRegisters)
+        self.assertNotIsInstance(CPU(Memory()).registers, LazyFlagRegisters)
+
+    def test_random_instruction_streams(self):
+        """Whole streams, state compared only at the end (save_state resolves
+        the pending record, so comparing every step would hide branches that
+        read it)."""
+        for compile_blocks in (False, True):
+            eager = CPU(Memory(), compile_blocks=compile_blocks)
+            lazy = CPU(Memory(), compile_blocks=compile_blocks, lazy_flags=True)
+            for trial in range(20):
+                program = _random_program(self.rng, 400)
+                regs = [self.rng.getrandbits(16) & (0xFFF0 if i == 0 else 0xFFFF) for i in range(4)]
+                for cpu in (eager, lazy):
+                    cpu.current_cycles = 0
+                    cpu.memory.memory[:len(program)] = bytes(program)
+                    cpu.invalidate_blocks()
+                    cpu.registers.AF, cpu.registers.BC, cpu.registers.DE, cpu.registers.HL = regs
+                    cpu.registers.SP = 0xDFFE
+                    cpu.registers.PC = 0x0000
+                    # At most 24 T-cycles per byte: enough to reach JR @
+                    cpu.run(max_cycles=len(program) * 24)
+                with self.subTest(compile_blocks=compile_blocks, trial=trial):
+                    self.assertEqual(eager.registers.PC, len(program) - 2)
+                    self.assertEqual(lazy.current_cycles, eager.current_cycles)
+                    self.assertEqual(lazy.save_state(), eager.save_state())
+
+    def test_every_opcode_from_random_states(self):
+        """Single instructions, including (HL) and control-flow forms."""
+        eager = CPU(Memory())
+        lazy = CPU(Memory(), lazy_flags=True)
+        for table, dispatch in (("_specialized", eager._dispatch),
+                                ("_cb_specialized", eager._cb_dispatch)):
+            for opcode in range(256):
+                eager_handler = getattr(eager, table)[opcode]
+                lazy_handler = getattr(lazy, table)[opcode]
+                if eager_handler is None:
+                    continue
+                for i in range(10):
+                    regs = tuple(self.rng.getrandbits(16) for _ in range(6))
+                    imm = self.rng.getrandbits(8 * dispatch[opcode][0])
+                    results = []
+                    for cpu, handler in ((eager, eager_handler), (lazy, lazy_handler)):
+                        cpu.memory.memory[:] = self.memory_image
+                        cpu.interrupts.__init__(cpu)
+                        cpu.registers.AF, cpu.registers.BC, cpu.registers.DE, \
+                            cpu.registers.HL, cpu.registers.SP, cpu.registers.PC = regs
+                        cycles = handler(cpu, imm)
+                        results.append((cycles, cpu.save_state(), bytes(cpu.memory.memory)))
+                    with self.subTest(table=table, opcode=f"{opcode:02X}", state=i):
+                        self.assertEqual(results[1], results[0])
+
+    def test_pending_record_resolved_by_get_flag(self):
+        cpu = CPU(Memory(), lazy_flags=True)
+        cpu.registers.AF = 0x0100
+        cpu._specialized[0x3D](cpu, 0)  # DEC A -> 0
+        self.assertIsNotNone(cpu.registers._lazy)
+        self.assertTrue(cpu.get_flag("Z"))
+        self.assertTrue(cpu.get_flag("N"))
+        self.assertIsNone(cpu.registers._lazy)
+        self.assertEqual(cpu.get_register("AF"), 0x00C0)
+
+
+if __name__ == "__main__":
+    unittest.main()
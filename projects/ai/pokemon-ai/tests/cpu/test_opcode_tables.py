@@ -0,0 +1,96 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from src.cpu.gb_cpu import CPU
+from src.cpu.opcode_tables import (
+    CACHE_VERSION, OPCODES_PATH, get_opcode_tables, load_opcodes_db,
+)
+from src.memory.gb_memory import Memory
+
+
+class TestSharedOpcodeTables(unittest.TestCase):
+
+    def test_tables_shared_between_cpus(self):
+        a, b = CPU(Memory()), CPU(Memory())
+        self.assertIs(a._dispatch, b._dispatch)
+        self.assertIs(a._cb_dispatch, b._cb_dispatch)
+        self.assertIs(a._unprefixed_info, get_opcode_tables().unprefixed_info)
+        self.assertIs(a.opcodes_db, b.opcodes_db)
+
+    def test_options_get_their_own_dispatch(self):
+        eager = CPU(Memory())
+        lazy = CPU(Memory(), lazy_flags=True)
+        reference = CPU(Memory(), reference_handlers=True)
+        self.assertIsNot(lazy._dispatch, eager._dispatch)
+        self.assertIsNot(reference._dispatch, eager._dispatch)
+        self.assertIs(lazy._unprefixed_meta, eager._unprefixed_meta)
+
+    def test_construction_does_not_depend_on_cwd(self):
+        cwd = os.getcwd()
+        tmp = tempfile.mkdtemp()
+        try:
+            os.chdir(tmp)
+            cpu = CPU(Memory())
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+        self.assertIsNotNone(cpu._dispatch[0x00])
+
+
+class TestOpcodeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmp, "Opcodes.json")
+        shutil.copyfile(OPCODES_PATH, self.json_path)
+        self.cache_path = os.path.join(self.tmp, "cache", "opcodes.pickle")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _load(self):
+        return load_opcodes_db(self.json_path, self.cache_path)
+
+    def test_cache_round_trip(self):
+        parsed = load_opcodes_db(self.json_path, cache_path=None)
+        self.assertFalse(os.path.exists(self.cache_path))
+        self.assertEqual(self._load(), parsed)
+        self.assertTrue(os.path.exists(self.cache_path))
+        self.assertEqual(self._load(), parsed)
+
+    def test_cache_is_used(self):
+        self._load()
+        with open(self.cache_path, "rb") as f:
+            cached = pickle.load(f)
+        self.assertEqual(cached["key"][0], CACHE_VERSION)
+        cached["opcodes_db"] = {"marker": True}
+        with open(self.cache_path, "wb") as f:
+            pickle.dump(cached, f)
+        self.assertEqual(self._load(), {"marker": True})
+
+    def test_stale_cache_rebuilt(self):
+        self._load()
+        with open(self.cache_path, "rb") as f:
+            cached = pickle.load(f)
+        cached["key"] = (CACHE_VERSION - 1,) + cached["key"][1:]
+        cached["opcodes_db"] = {"marker": True}
+        with open(self.cache_path, "wb") as f:
+            pickle.dump(cached, f)
+        self.assertIn("unprefixed", self._load())
+
+    def test_corrupt_cache_ignored(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, "wb") as f:
+            f.write(b"not a pickle")
+        self.assertIn("unprefixed", self._load())
+
+    def test_unwritable_cache_ignored(self):
+        self.cache_path = os.path.join(self.json_path, "opcodes.pickle")  # parent is a file
+        self.assertIn("unprefixed", self._load())
+
+
+if __name__ == "__main__":
+    unittest.main()
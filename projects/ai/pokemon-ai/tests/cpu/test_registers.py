@@ -142,5 +142,34 @@ class TestRegisters(unittest.TestCase):
         self.cpu.set_register('PC', 0xBA98)
         self.assertEqual(self.cpu.registers.PC, 0xBA98)
 
+    def test_pair_views_follow_8bit_registers(self):
+        """Pairs are computed from the 8-bit registers and split back into them"""
+        regs = self.cpu.registers
+        regs.B, regs.C = 0x12, 0x34
+        self.assertEqual(regs.BC, 0x1234)
+        regs.HL = 0xBEEF
+        self.assertEqual((regs.H, regs.L), (0xBE, 0xEF))
+        regs.AF = 0x56F0
+        self.assertEqual((regs.A, regs.F), (0x56, 0xF0))
+
+    def test_register_file_has_no_dict(self):
+        """The register file is slotted; misspelled registers fail loudly"""
+        with self.assertRaises(AttributeError):
+            self.cpu.registers.Q = 1
+
+    def test_unknown_register_code(self):
+        """Test that unknown register codes raise ValueError"""
+        with self.assertRaises(ValueError):
+            self.cpu.get_register('F')
+        with self.assertRaises(ValueError):
+            self.cpu.set_register('X', 0)
+
+    def test_save_state_format_unchanged(self):
+        """save_state still stores the 16-bit pairs"""
+        self.cpu.registers.DE = 0x4321
+        regs = self.cpu.save_state()['registers']
+        self.assertEqual(set(regs), {'AF', 'BC', 'DE', 'HL', 'SP', 'PC'})
+        self.assertEqual(regs['DE'], 0x4321)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,244 @@
+"""
+Audio sync: the mixer queue's fill level estimate and the dynamic rate
+control that holds it at a target instead of dropping samples.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from src.apu.apu import APU
+from src.frontend.audio_sync import AudioSync, MixerQueue
+from src.frontend.emulation_thread import FRAME_DURATION
+
+RATE = 48000
+CHUNK = 2048
+
+
+class _FakeChannel:
+    """A pygame mixer Channel: one Sound playing, at most one queued."""
+
+    def __init__(self):
+        self.playing = None
+        self.queued = None
+        self.log = []
+
+    def play(self, sound):
+        self.playing = sound
+        self.log.append(('play', sound))
+
+    def queue(self, sound):
+        self.queued = sound
+        self.log.append(('queue', sound))
+
+    def get_busy(self):
+        return self.playing is not None
+
+    def get_queue(self):
+        return self.queued
+
+    def finish(self):
+        """The playing Sound runs out."""
+        self.playing, self.queued = self.queued, None
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pcm(frames):
+    return bytes(frames * 4)
+
+
+class TestMixerQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.channel = _FakeChannel()
+        self.clock = _Clock()
+        self.queue = MixerQueue(self.channel, RATE, CHUNK, lambda buffer: len(buffer), self.clock)
+
+    def test_hands_over_whole_chunks_while_the_channel_has_room(self):
+        self.queue.write(_pcm(CHUNK * 3 + 100))
+        self.assertEqual(self.channel.log, [('play', CHUNK * 4), ('queue', CHUNK * 4)])
+        self.assertEqual(self.queue.fill_frames(), CHUNK * 3 + 100)
+
+    def test_fill_drains_with_the_clock(self):
+        self.queue.write(_pcm(CHUNK))
+        self.clock.now += 1024 / RATE
+        self.assertEqual(self.queue.fill_frames(), CHUNK - 1024)
+        self.clock.now += 1.0
+        self.assertEqual(self.queue.fill_frames(), 0)
+
+    def test_queued_chunk_plays_after_the_first(self):
+        self.queue.write(_pcm(CHUNK * 2))
+        self.clock.now += CHUNK / RATE + 0.001
+        self.channel.finish()
+        self.assertEqual(self.queue.fill_frames(), CHUNK - 48)
+        self.queue.write(_pcm(CHUNK))
+        self.assertEqual(self.channel.log[-1], ('queue', CHUNK * 4))
+
+    def test_burst_pull_is_not_an_underrun(self):
+        # The mixer copied the chunk into the device buffer: still playing
+        self.queue.write(_pcm(CHUNK))
+        self.channel.finish()
+        self.clock.now += 0.01
+        self.queue.write(_pcm(CHUNK))
+        self.assertEqual(self.queue.underruns, 0)
+        self.assertEqual(self.channel.log[-1], ('play', CHUNK * 4))
+
+    def test_running_dry_is_an_underrun(self):
+        self.queue.write(_pcm(CHUNK))
+        self.channel.finish()
+        self.clock.now += 2 * CHUNK / RATE
+        self.assertEqual(self.queue.fill_frames(), 0)
+        self.queue.write(_pcm(CHUNK))
+        self.assertEqual(self.queue.underruns, 1)
+        self.assertEqual(self.queue.fill_frames(), CHUNK)
+
+    def test_idle_channel_bounds_the_timeline(self):
+        # A device running fast has pulled both chunks already
+        self.queue.write(_pcm(CHUNK * 2))
+        self.channel.finish()
+        self.channel.finish()
+        self.assertEqual(self.queue.fill_frames(), CHUNK)
+
+    def test_reset_is_not_an_underrun(self):
+        self.queue.write(_pcm(CHUNK))
+        self.queue.reset()
+        self.channel.finish()
+        self.clock.now += 1.0
+        self.queue.write(_pcm(CHUNK))
+        self.assertEqual(self.queue.underruns, 0)
+
+    def test_trim_counts_dropped_frames(self):
+        self.queue.write(_pcm(CHUNK * 2))
+        self.queue.write(_pcm(5000))
+        self.queue.trim(4800)
+        self.assertEqual(self.queue.dropped_frames, 200)
+        self.assertEqual(self.queue.fill_frames(), CHUNK * 2 + 4800)
+
+
+class TestAudioSync(unittest.TestCase):
+
+    def test_adjustment_is_proportional_and_clamped(self):
+        for fill, expected in ((0, 0.005), (2048, 0.0025), (4096, 0.0), (8192, -0.005),
+                               (50000, -0.005)):
+            with self.subTest(fill=fill):
+                self.assertEqual(AudioSync(RATE, 4096).update(fill), expected)
+
+    def test_fill_level_is_smoothed(self):
+        sync = AudioSync(RATE, 4096)
+        sync.update(4096)
+        self.assertTrue(0 < sync.update(0) <= 0.0003)  # One low reading moves it 5%
+        self.assertEqual(sync.fill_frames, 0)
+
+    def test_wait_time(self):
+        sync = AudioSync(RATE, 4096)
+        self.assertAlmostEqual(sync.wait_time(4096 + 4800), 0.1)
+        self.assertEqual(sync.wait_time(100), 0.0)
+
+    def _simulate(self, sync, card_rate, frames=3000):
+        """A sound card at card_rate draining a queue fed one emulated frame at a time.
+
+        Returns (underruns, fill levels over the last 500 frames).
+        """
+        fill = sync.target_frames if sync else 4096
+        adjustment = 0.0
+        underruns = 0
+        fills = []
+        for _ in range(frames):
+            fill += RATE * (1 + adjustment) * FRAME_DURATION
+            fill -= card_rate * FRAME_DURATION
+            if fill < 0:
+                underruns += 1
+                fill = 0
+            if sync:
+                adjustment = sync.update(fill)
+            fills.append(fill)
+        return underruns, fills[-500:]
+
+    def test_holds_latency_against_a_fast_sound_card(self):
+        card_rate = RATE * 1.003
+        underruns, _ = self._simulate(None, card_rate)
+        self.assertGreater(underruns, 0)
+        underruns, fills = self._simulate(AudioSync(RATE, 4096), card_rate)
+        self.assertEqual(underruns, 0)
+        self.assertTrue(all(1500 < fill < 4096 for fill in fills))
+
+    def test_holds_latency_against_a_slow_sound_card(self):
+        _, fills = self._simulate(AudioSync(RATE, 4096), RATE * 0.997)
+        self.assertTrue(all(4096 < fill < 7000 for fill in fills))
+
+
+class TestFrontendAudioSync(unittest.TestCase):
+    """Rate control wired through PygameFrontend (mocked pygame)."""
+
+    def _make_frontend(self, **kwargs):
+        from src.gameboy import GameBoy
+
+        gb = GameBoy()
+        gb.apu.write(0xFF26, 0x80)
+        with patch('src.frontend.pygame_frontend.pygame'):
+            from src.frontend.pygame_frontend import PygameFrontend
+            frontend = PygameFrontend(gb, scale=1, **kwargs)
+        return frontend, gb
+
+    def test_low_queue_speeds_up_the_apu(self):
+        frontend, gb = self._make_frontend(audio_sync=True)
+        gb.apu.tick(70224)
+        frontend._drain_audio()
+        self.assertGreater(gb.apu.effective_sample_rate, 48000)
+        stats = frontend.audio_stats()
+        self.assertEqual(stats['rate_adjustment'], frontend._audio_sync.rate_adjustment)
+        self.assertGreater(stats['fill_frames'], 0)
+        self.assertAlmostEqual(stats['latency_ms'], stats['fill_frames'] / 48)
+        self.assertEqual(stats['underruns'], 0)
+
+    def test_fast_forward_trims_instead(self):
+        frontend, gb = self._make_frontend(audio_sync=True)
+        frontend._fast_forward = True
+        gb.apu.tick(70224 * 12)
+        frontend._drain_audio()
+        self.assertEqual(gb.apu.effective_sample_rate, 48000)
+        self.assertGreater(frontend.audio_stats()['dropped_frames'], 0)
+
+    def test_off_by_default(self):
+        frontend, gb = self._make_frontend()
+        gb.apu.tick(70224)
+        frontend._drain_audio()
+        self.assertIsNone(frontend._audio_sync)
+        self.assertEqual(gb.apu.effective_sample_rate, 48000)
+        self.assertEqual(frontend.audio_stats()['rate_adjustment'], 0.0)
+
+
+class TestAPURateAdjustment(unittest.TestCase):
+
+    def test_half_a_second_produces_the_adjusted_rate(self):
+        # 11025 Hz nudged to 11036, 11003 and (clamped to 0.5%) 11080 Hz
+        for adjustment, frames in ((0.001, 5518), (-0.002, 5501), (0.05, 5540)):
+            with self.subTest(adjustment=adjustment):
+                apu = APU(audio_mode="low", low_sample_rate=11025)
+                apu.write(0xFF26, 0x80)
+                apu.set_rate_adjustment(adjustment)
+                apu.tick(APU.CPU_CLOCK // 2)
+                self.assertEqual(len(apu.drain_samples()), frames * 2)
+
+    def test_applies_from_the_current_cycle(self):
+        apu = APU()
+        apu.write(0xFF26, 0x80)
+        apu.tick(60)
+        apu.set_rate_adjustment(0.005)
+        self.assertEqual(apu._pending_cycles, 0)
+        self.assertEqual(apu.effective_sample_rate, 48240)
+
+    def test_ignored_with_audio_off(self):
+        apu = APU(audio_mode="off")
+        apu.set_rate_adjustment(0.001)
+        self.assertIsNone(apu.effective_sample_rate)
+
+
+if __name__ == "__main__":
+    unittest.main()
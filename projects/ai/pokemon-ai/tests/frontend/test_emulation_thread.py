@@ -0,0 +1,182 @@
+"""
+Threaded emulation: frame double buffer, audio ring, and joypad input that
+applies at its stamped cycle so a recorded run replays exactly.
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from src.frontend.emulation_thread import (
+    CYCLES_PER_FRAME,
+    AudioRing,
+    EmulationThread,
+    FrameBuffers,
+)
+from src.gameboy import GameBoy
+
+# Select the d-pad, then copy P1 into a ring at 0xD000-0xD7FF forever
+_JOYPAD_LOGGER = bytes([
+    0x3E, 0x20,          # LD A, 0x20
+    0xE0, 0x00,          # LDH (0x00), A
+    0x21, 0x00, 0xD0,    # LD HL, 0xD000
+    0xF0, 0x00,          # loop: LDH A, (0x00)
+    0x22,                # LD (HL+), A
+    0x7C,                # LD A, H
+    0xF6, 0xD0,          # OR 0xD0
+    0xE6, 0xD7,          # AND 0xD7
+    0x67,                # LD H, A
+    0x18, 0xF5,          # JR loop
+])
+
+
+def _make_gameboy():
+    gb = GameBoy()
+    gb.init_post_boot_state()
+    gb.memory.memory[0xC000:0xC000 + len(_JOYPAD_LOGGER)] = _JOYPAD_LOGGER
+    gb.cpu.registers.PC = 0xC000
+    return gb
+
+
+def _make_thread(gb):
+    return EmulationThread(gb, FrameBuffers(), AudioRing(1 << 16))
+
+
+class TestFrameBuffers(unittest.TestCase):
+
+    def test_publish_swaps_slots(self):
+        frames = FrameBuffers(4)
+        frames.publish(b"\x01\x02\x03\x04", ("c",))
+        with frames.front() as (indices, colors):
+            self.assertEqual(bytes(indices), b"\x01\x02\x03\x04")
+            self.assertEqual(colors, ("c",))
+            first = indices
+        frames.publish(b"\x05\x06\x07\x08", ("d",))
+        with frames.front() as (indices, colors):
+            self.assertIsNot(indices, first)
+            self.assertEqual(bytes(indices), b"\x05\x06\x07\x08")
+        self.assertEqual(frames.serial, 2)
+
+    def test_wait_returns_latest_serial(self):
+        frames = FrameBuffers(4)
+        self.assertEqual(frames.wait(0, 0.001), 0)
+        frames.publish(bytes(4), ())
+        self.assertEqual(frames.wait(0, 0.001), 1)
+
+
+class TestAudioRing(unittest.TestCase):
+
+    def test_fifo(self):
+        ring = AudioRing(64)
+        ring.write(b"abcd")
+        ring.write(b"efgh")
+        self.assertEqual(len(ring), 8)
+        self.assertEqual(ring.read_all(), b"abcdefgh")
+        self.assertEqual(ring.read_all(), b"")
+
+    def test_overflow_drops_oldest_whole_frames(self):
+        ring = AudioRing(10)
+        ring.write(bytes(range(12)))
+        self.assertEqual(ring.read_all(), bytes(range(4, 12)))
+        self.assertEqual(ring.dropped_bytes, 4)
+
+
+class TestTimestampedInput(unittest.TestCase):
+
+    def _run(self, events, frames=3):
+        gb = _make_gameboy()
+        thread = _make_thread(gb)
+        for event in events:
+            thread.post_input(*event)
+        for _ in range(frames):
+            thread._run_frame()
+        return thread, bytes(gb.memory.memory[0xD000:0xD800])
+
+    def test_input_applies_at_stamped_cycle(self):
+        thread, _ = self._run([('right', True, 30_000), ('right', False, 100_000)])
+        (press, release) = thread.input_log
+        self.assertEqual((press.button, press.pressed), ('right', True))
+        # First instruction boundary at or after the stamp
+        self.assertTrue(30_000 <= press.cycle < 30_000 + 24)
+        self.assertTrue(100_000 <= release.cycle < 100_000 + 24)
+
+    def test_default_stamp_is_next_frame_start(self):
+        gb = _make_gameboy()
+        thread = _make_thread(gb)
+        start = gb.cpu.current_cycles
+        thread._run_frame()
+        thread.post_input('down', True)
+        thread._run_frame()
+        self.assertTrue(start + CYCLES_PER_FRAME <= thread.input_log[0].cycle
+                        < start + CYCLES_PER_FRAME + 24)
+
+    def test_replaying_the_log_reproduces_the_run(self):
+        events = [('right', True, 30_000), ('up', True, 90_001), ('right', False, 150_000)]
+        thread, memory = self._run(events)
+        replay, replayed = self._run([(e.button, e.pressed, e.cycle) for e in thread.input_log])
+        self.assertEqual(replay.input_log, thread.input_log)
+        self.assertEqual(replayed, memory)
+        # The input is visible in what the program logged
+        _, untouched = self._run([])
+        self.assertNotEqual(untouched, memory)
+
+
+class TestEmulationThread(unittest.TestCase):
+
+    def test_publishes_frames_and_audio(self):
+        gb = _make_gameboy()
+        frames = FrameBuffers()
+        audio = AudioRing(1 << 16)
+        thread = EmulationThread(gb, frames, audio)
+        thread.start()
+        try:
+            self.assertEqual(frames.wait(0, 2.0), 1)
+        finally:
+            thread.stop()
+            thread.join()
+        self.assertIsNone(thread.error)
+        self.assertIsNone(gb.ppu.on_vblank)
+        with frames.front() as (indices, colors):
+            self.assertEqual(len(indices), 160 * 144)
+            self.assertEqual(colors, gb.ppu.get_palette_colors())
+        self.assertGreater(len(audio), 0)
+
+    def test_call_soon_runs_between_frames(self):
+        gb = _make_gameboy()
+        thread = _make_thread(gb)
+        calls = []
+        thread.call_soon(lambda: calls.append(gb.cpu.current_cycles))
+        start = gb.cpu.current_cycles
+        thread._run_frame()
+        self.assertEqual(calls, [start])
+
+    def test_error_is_kept(self):
+        gb = _make_gameboy()
+        thread = _make_thread(gb)
+        thread.call_soon(lambda: 1 / 0)
+        thread.start()
+        thread.join(2.0)
+        self.assertIsInstance(thread.error, ZeroDivisionError)
+
+
+class TestThreadedFrontend(unittest.TestCase):
+
+    def test_presents_frames_from_the_emulation_thread(self):
+        from src.frontend.pygame_frontend import PygameFrontend
+
+        env = {'SDL_VIDEODRIVER': 'dummy', 'SDL_AUDIODRIVER': 'dummy'}
+        with patch.dict(os.environ, env):
+            frontend = PygameFrontend(_make_gameboy(), scale=1, threaded=True)
+
+            def handle_events():
+                if frontend.present_stats()['frames'] >= 1:
+                    frontend._running = False
+
+            frontend._handle_events = handle_events
+            frontend.run()
+        self.assertGreaterEqual(frontend.present_stats()['frames'], 1)
+        self.assertFalse(frontend._emulation.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -261,6 +261,98 @@ class TestHandleEvents(unittest.TestCase):
             self.assertFalse(frontend._running)
 
 
+class TestAudioSetup(unittest.TestCase):
+    """The mixer follows the APU's audio_mode (mocked pygame)."""
+
+    def _make_frontend(self, **kwargs):
+        from src.gameboy import GameBoy
+
+        gb = GameBoy(**kwargs)
+        with patch('src.frontend.pygame_frontend.pygame') as mock_pg:
+            from src.frontend.pygame_frontend import PygameFrontend
+            frontend = PygameFrontend(gb, scale=1)
+        return frontend, mock_pg
+
+    def test_full_rate(self):
+        frontend, mock_pg = self._make_frontend()
+        self.assertEqual(mock_pg.mixer.pre_init.call_args.kwargs['frequency'], 48000)
+        self.assertEqual(frontend._audio_queue.chunk_frames, 2048)
+        self.assertTrue(frontend._audio_enabled)
+
+    def test_low_rate(self):
+        frontend, mock_pg = self._make_frontend(audio_mode="low", low_audio_rate=12000)
+        self.assertEqual(mock_pg.mixer.pre_init.call_args.kwargs['frequency'], 12000)
+        self.assertEqual(frontend._audio_queue.chunk_frames, 512)  # Still ~42ms
+
+    def test_off_skips_the_mixer(self):
+        frontend, mock_pg = self._make_frontend(audio_mode="off")
+        mock_pg.mixer.pre_init.assert_not_called()
+        mock_pg.mixer.init.assert_not_called()
+        self.assertFalse(frontend._audio_enabled)
+        self.assertIsNone(frontend._audio_channel)
+
+
+class TestRenderFrame(unittest.TestCase):
+    """Present path against a real (headless) pygame display."""
+
+    def setUp(self):
+        import os
+        import random
+
+        from src.gameboy import GameBoy
+        from src.frontend.pygame_frontend import PygameFrontend
+
+        self._env = patch.dict(os.environ, {'SDL_VIDEODRIVER': 'dummy', 'SDL_AUDIODRIVER': 'dummy'})
+        self._env.start()
+        self.gb = GameBoy()
+        self.frontend = PygameFrontend(self.gb, scale=2)
+        ppu = self.gb.ppu
+        ppu.set_color_palette(*get_palette(0x59, 'POKEMON RED'))
+        rng = random.Random(3)
+        ppu._shades[:] = bytes(rng.randrange(4) for _ in range(GB_WIDTH * GB_HEIGHT))
+        ppu._layers[:] = bytes(rng.choice((0, 4, 8)) for _ in range(GB_WIDTH * GB_HEIGHT))
+        ppu._colors_stale = True
+        ppu._frame_hash = None
+
+    def tearDown(self):
+        import pygame
+        pygame.quit()
+        self._env.stop()
+
+    def _screen_pixel(self, x, y):
+        return tuple(self.frontend._screen.get_at((x, y)))[:3]
+
+    def _expected_pixel(self, x, y):
+        rgb = self.gb.ppu.get_color_buffer()
+        offset = (y * GB_WIDTH + x) * 3
+        return tuple(rgb[offset:offset + 3])
+
+    def test_screen_matches_color_buffer_scaled(self):
+        self.frontend._render_frame()
+        for x, y in ((0, 0), (159, 143), (17, 99), (80, 72), (3, 141)):
+            for dx, dy in ((0, 0), (1, 1)):
+                self.assertEqual(self._screen_pixel(x * 2 + dx, y * 2 + dy),
+                                 self._expected_pixel(x, y))
+
+    def test_palette_change_is_presented(self):
+        self.frontend._render_frame()
+        hash_before = self.gb.ppu.frame_hash()
+        self.gb.ppu.set_color_palette(*get_palette(0x00))
+        self.frontend._render_frame()
+        self.assertEqual(self.gb.ppu.frame_hash(), hash_before)  # Same pixel codes
+        self.assertEqual(self._screen_pixel(20, 20), self._expected_pixel(10, 10))
+        self.assertEqual(self.frontend.present_stats()['frames'], 2)
+
+    def test_present_time_reported(self):
+        self.assertEqual(self.frontend.present_stats()['frames'], 0)
+        self.frontend._render_frame()
+        self.frontend._render_frame()  # unchanged frame: not presented again
+        stats = self.frontend.present_stats()
+        self.assertEqual(stats['frames'], 1)
+        self.assertGreater(stats['last_ms'], 0.0)
+        self.assertEqual(stats['avg_ms'], stats['last_ms'])
+
+
 class TestPostBootState(unittest.TestCase):
     """Test the init_post_boot_state() helper in GameBoy."""
 
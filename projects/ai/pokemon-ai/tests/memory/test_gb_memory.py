@@ -1,5 +1,9 @@
+import os
 import unittest
 from src.memory.gb_memory import Memory
+from src.cartridge.gb_cartridge import Cartridge
+from src.gameboy import GameBoy
+from tests.cartridge.test_mbc1 import _build_mbc1_rom, _write_temp_rom
 
 class TestGBMemory(unittest.TestCase):
     def setUp(self):
@@ -43,5 +47,85 @@ class TestGBMemory(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.mem.get_value(-1)
 
+
+class TestPageTable(unittest.TestCase):
+    """Page-table dispatch must track everything that remaps the bus."""
+
+    def setUp(self):
+        rom = bytearray(_build_mbc1_rom(num_banks=4))
+        rom[0x4000] = 0x11
+        rom[0x8000] = 0x22
+        self.rom_path = _write_temp_rom(bytes(rom))
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def test_load_state_keeps_pages_live(self):
+        mem = Memory()
+        array = mem.memory
+        state = {'memory': bytes([0x42]) * 0x10000}
+        mem.load_state(state)
+        self.assertIs(mem.memory, array)
+        self.assertEqual(mem.get_value(0xC123), 0x42)
+        self.assertEqual(mem.get_value(0xE123), 0x42)  # echo
+        mem.set_value(0xC123, 0x07)
+        self.assertEqual(mem.memory[0xC123], 0x07)
+
+    def test_restored_bank_is_mapped(self):
+        gb = GameBoy()
+        gb.load_cartridge(self.rom_path)
+        gb.memory.set_value(0x2000, 0x02)
+        state = gb.save_state()
+        gb.memory.set_value(0x2000, 0x01)
+        self.assertEqual(gb.memory.get_value(0x4000), 0x11)
+        gb.load_state(state)
+        self.assertEqual(gb.memory.get_value(0x4000), 0x22)
+
+    def test_bank_past_rom_end_reads_open_bus(self):
+        rom = bytearray(_build_mbc1_rom(num_banks=4))
+        rom[0x0148] = 0x02  # header claims 8 banks, only 4 are present
+        path = _write_temp_rom(bytes(rom))
+        try:
+            mem = Memory()
+            mem.load_cartridge(Cartridge(path))
+        finally:
+            os.unlink(path)
+        mem.set_value(0x2000, 0x07)
+        self.assertEqual(mem.get_value(0x4000), 0xFF)
+        self.assertEqual(mem.get_value(0x7FFF), 0xFF)
+        mem.set_value(0x2000, 0x02)
+        self.assertEqual(mem.get_value(0x4000), 0x02)  # bank marker
+
+    def test_external_ram_follows_enable_and_bank(self):
+        rom = bytearray(_build_mbc1_rom(num_banks=4))
+        rom[0x0149] = 0x03  # 32 KiB RAM, 4 banks
+        path = _write_temp_rom(bytes(rom))
+        try:
+            mem = Memory()
+            cart = Cartridge(path)
+            mem.load_cartridge(cart)
+        finally:
+            os.unlink(path)
+        mem.set_value(0xA000, 0x12)  # RAM disabled: ignored
+        self.assertEqual(mem.get_value(0xA000), 0xFF)
+        mem.set_value(0x0000, 0x0A)  # enable RAM
+        mem.set_value(0x4000, 0x01)  # bank 1
+        mem.set_value(0xA000, 0x34)
+        self.assertEqual(cart._mbc._ram[0x2000], 0x34)
+        mem.set_value(0x4000, 0x00)
+        self.assertEqual(mem.get_value(0xA000), 0x00)
+        mem.set_value(0x4000, 0x01)
+        self.assertEqual(mem.get_value(0xA000), 0x34)
+        mem.set_value(0x0000, 0x00)  # disable RAM
+        self.assertEqual(mem.get_value(0xA000), 0xFF)
+
+    def test_io_page(self):
+        mem = Memory()
+        mem.set_value(0xFF80, 0x99)  # HRAM
+        self.assertEqual(mem.get_value(0xFF80), 0x99)
+        mem.set_value(0xFF0F, 0xFF)  # IF keeps 5 bits
+        self.assertEqual(mem.memory[0xFF0F], 0x1F)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,166 @@
+"""
+Deferred NumPy frame renderer: frames drawn at V-Blank must be identical to
+the scanline renderer's, including mid-frame register, VRAM and OAM writes.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.gameboy import GameBoy
+from src.ppu import frame_renderer
+from src.ppu.ppu import PPU
+import tests.ppu.test_tile_cache as tile_cache_tests
+
+
+def _build_raster_rom():
+    """Build a ROM that changes the picture on every line.
+
+    Tile data and maps are filled with a pattern, the window and an X-flipped
+    sprite are on, and the H-Blank STAT handler bumps SCX, rewrites a byte
+    of the sprite's tile and sets BGP from LY. V-Blank moves the sprite.
+    """
+    rom = bytearray(0x8000)
+    rom[0x0040:0x0043] = bytes([0xC3, 0x00, 0x02])  # JP vblank
+    rom[0x0048:0x004B] = bytes([0xC3, 0x20, 0x02])  # JP stat
+    rom[0x0100:0x0104] = bytes([0x00, 0xC3, 0x50, 0x01])  # NOP; JP 0x0150
+    vblank = bytes([
+        0xF5,                    # PUSH AF
+        0xFA, 0x00, 0xFE,        # LD A,(0xFE00) — sprite 0 Y
+        0x3C,                    # INC A
+        0xEA, 0x00, 0xFE,        # LD (0xFE00),A
+        0xF1, 0xD9,              # POP AF; RETI
+    ])
+    stat = bytes([
+        0xF5, 0xE5,              # PUSH AF; PUSH HL
+        0xF0, 0x43, 0x3C, 0xE0, 0x43,  # SCX += 1
+        0x21, 0x10, 0x80, 0x34,  # INC (0x8010) — tile 1, row 0
+        0xF0, 0x44, 0xE0, 0x47,  # BGP = LY
+        0xE1, 0xF1, 0xD9,        # POP HL; POP AF; RETI
+    ])
+    rom[0x0200:0x0200 + len(vblank)] = vblank
+    rom[0x0220:0x0220 + len(stat)] = stat
+    program = [
+        0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+        0xAF, 0xE0, 0x40,        # LCDC = off
+        0x21, 0x00, 0x80,        # LD HL,0x8000
+        0x7D, 0xAC, 0x22,        # fill: LD A,L; XOR H; LD (HL+),A
+        0x7C, 0xFE, 0xA0, 0x20, 0xF8,  # LD A,H; CP 0xA0; JR NZ,fill
+        0x21, 0x00, 0xFE,        # LD HL,0xFE00 — sprite 0
+        0x36, 0x30, 0x2C,        # Y
+        0x36, 0x30, 0x2C,        # X
+        0x36, 0x01, 0x2C,        # tile 1
+        0x36, 0x20,              # X-flip
+        0x3E, 0xE4, 0xE0, 0x47,  # BGP
+        0x3E, 0xD2, 0xE0, 0x48,  # OBP0
+        0x3E, 0x40, 0xE0, 0x4A,  # WY
+        0x3E, 0x50, 0xE0, 0x4B,  # WX
+        0x3E, 0x08, 0xE0, 0x41,  # STAT = H-Blank interrupt source
+        0x3E, 0x03, 0xE0, 0xFF,  # IE = V-Blank, STAT
+        0x3E, 0xF3, 0xE0, 0x40,  # LCDC = on, window (0x9C00), sprites
+        0xFB,                    # EI
+        0x76, 0x18, 0xFD,        # loop: HALT; JR loop
+    ]
+    rom[0x0150:0x0150 + len(program)] = bytes(program)
+    fd, path = tempfile.mkstemp(suffix=".gb")
+    os.write(fd, bytes(rom))
+    os.close(fd)
+    return path
+
+
+@unittest.skipUnless(frame_renderer.AVAILABLE, "NumPy not installed")
+class TestFrameRendererMatchesScanlines(tile_cache_tests.TestTileCacheRendering):
+    """Random frames: one render() call against 144 _render_scanline() calls."""
+
+    def _assert_frame_matches(self):
+        ppu = self.ppu
+        reference = PPU()
+        self.memory.load_ppu(reference)
+        for name in ("_lcdc", "_scx", "_scy", "_wx", "_wy", "_bgp", "_obp0", "_obp1",
+                     "_bg_colors", "_obj0_colors", "_obj1_colors"):
+            setattr(reference, name, getattr(ppu, name))
+        for ly in range(144):
+            reference._ly = ly
+            reference._render_scanline()
+        self.memory.load_ppu(ppu)
+
+        ppu._window_line = 0
+        frame_renderer.FrameRenderer(ppu).render(0, 144)
+        self.assertEqual(ppu._shades, reference._shades)
+        self.assertEqual(ppu._layers, reference._layers)
+        self.assertEqual(ppu.get_color_buffer(), reference.get_color_buffer())
+        self.assertEqual(ppu._window_line, reference._window_line)
+
+    def test_partial_ranges(self):
+        rng = random.Random(99)
+        self._randomize(rng)
+        self.ppu._lcdc |= 0x20
+        self._assert_frame_matches()
+        expected = (bytes(self.ppu._shades), bytes(self.ppu.get_color_buffer()))
+        self.ppu._shades[:] = bytes(160 * 144)
+        self.ppu._window_line = 0
+        renderer = frame_renderer.FrameRenderer(self.ppu)
+        for first, end in ((0, 1), (1, 50), (50, 51), (51, 144)):
+            renderer.render(first, end)
+        self.assertEqual((bytes(self.ppu._shades), bytes(self.ppu.get_color_buffer())), expected)
+
+
+@unittest.skipUnless(frame_renderer.AVAILABLE, "NumPy not installed")
+class TestDeferredRendering(unittest.TestCase):
+
+    def setUp(self):
+        self.rom_path = _build_raster_rom()
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def _make_gameboy(self, **kwargs):
+        gb = GameBoy(**kwargs)
+        gb.load_cartridge(self.rom_path)
+        gb.cpu.registers.PC = 0x0100
+        return gb
+
+    def _assert_same_frames(self, **kwargs):
+        reference = self._make_gameboy(**kwargs)
+        deferred = self._make_gameboy(numpy_renderer=True, **kwargs)
+        self.assertIsNotNone(deferred.ppu._frame_renderer)
+        # The fill loop takes about four frames; the rest run with the LCD on
+        for chunk in (1, 9, 100, 457, 5000, 20000, 70224, 140448, 70224 * 2,
+                      33333, 70224, 70224 * 3, 12345):
+            reference.run(max_cycles=reference.cpu.current_cycles + chunk)
+            deferred.run(max_cycles=deferred.cpu.current_cycles + chunk)
+            self.assertEqual(deferred.ppu.get_color_buffer(), reference.ppu.get_color_buffer())
+            self.assertEqual(bytes(deferred.get_framebuffer()), bytes(reference.get_framebuffer()))
+            self.assertEqual(deferred.save_state(), reference.save_state())
+        return deferred
+
+    def test_mid_frame_writes(self):
+        gb = self._assert_same_frames()
+        self.assertGreater(gb.memory.memory[0xFE00], 0x31)  # several V-Blanks went by
+
+    def test_event_scheduler(self):
+        self._assert_same_frames(event_scheduler=True)
+
+    def test_defers_until_vblank(self):
+        gb = self._make_gameboy(numpy_renderer=True)
+        gb.run(max_cycles=70224 * 6)
+        # Only V-Blank: the sprite moves each frame but nothing changes mid-frame
+        gb.memory.set_value(0xFFFF, 0x01)
+        gb.ppu.flush_lines()
+        calls = []
+        gb.ppu._frame_renderer.render = lambda first, end: calls.append((first, end))
+        gb.run(max_cycles=gb.cpu.current_cycles + 70224 * 2)
+        # Whatever part of a frame the run started in, a whole frame is one call
+        self.assertIn((0, 144), calls)
+        self.assertEqual(len(calls), 2)
+
+    def test_falls_back_without_numpy(self):
+        with patch.object(frame_renderer, "AVAILABLE", False):
+            gb = GameBoy(numpy_renderer=True)
+        self.assertIsNone(gb.ppu._frame_renderer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Unchanged-frame detection: lines whose inputs did not change since they
+were drawn are reused, and the result must equal drawing every line.
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from src.gameboy import GameBoy
+from src.ppu import frame_renderer
+from src.ppu.ppu import PPU
+from tests.ppu.test_frame_renderer import _build_raster_rom
+
+CYCLES_PER_FRAME = 70224
+
+
+class _NeverDrawn(list):
+    """Line serials that never match, so every line is drawn."""
+
+    def __getitem__(self, index):
+        return -2
+
+
+class TestFrameReuse(unittest.TestCase):
+
+    def setUp(self):
+        self.rom_path = _build_raster_rom()
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def _make_gameboy(self, **kwargs):
+        gb = GameBoy(**kwargs)
+        gb.load_cartridge(self.rom_path)
+        gb.cpu.registers.PC = 0x0100
+        return gb
+
+    def _run_to_vblank(self, gb):
+        while gb.ppu._ly != 144:
+            gb.run(max_cycles=gb.cpu.current_cycles + 4)
+
+    def _assert_matches_full_redraw(self, **kwargs):
+        reusing = self._make_gameboy(**kwargs)
+        reference = self._make_gameboy(**kwargs)
+        reference.ppu._line_serials = _NeverDrawn([-1] * 144)
+        # The ROM's fill loop takes about four frames
+        for gb in (reusing, reference):
+            gb.run(max_cycles=CYCLES_PER_FRAME * 5)
+        # Per-line STAT changes, then a static picture, then a sprite moving
+        # once per frame, then per-line changes again
+        for interrupts in (0x03, 0x00, 0x01, 0x03, 0x00):
+            for gb in (reusing, reference):
+                gb.memory.set_value(0xFFFF, interrupts)
+            for chunk in (1000, 33333, CYCLES_PER_FRAME * 2, 12345):
+                for gb in (reusing, reference):
+                    gb.run(max_cycles=gb.cpu.current_cycles + chunk)
+                self.assertEqual(bytes(reusing.get_framebuffer()), bytes(reference.get_framebuffer()))
+                self.assertEqual(reusing.ppu.get_color_buffer(), reference.ppu.get_color_buffer())
+                self.assertEqual(reusing.save_state(), reference.save_state())
+
+    def _run_to_line(self, gb, ly):
+        while gb.ppu._ly != ly:
+            gb.run(max_cycles=gb.cpu.current_cycles + 4)
+
+    def test_single_mid_frame_changes(self):
+        reusing = self._make_gameboy()
+        reference = self._make_gameboy()
+        reference.ppu._line_serials = _NeverDrawn([-1] * 144)
+        for gb in (reusing, reference):
+            gb.run(max_cycles=CYCLES_PER_FRAME * 5)
+            gb.memory.set_value(0xFFFF, 0x00)  # static picture
+            gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME * 2)
+        # One write each, part-way down the screen: the window moving up
+        # renumbers the window lines below it in the next frame; a tile map
+        # and a tile data write change some lines only
+        for address, value in ((0xFF4A, 0x00), (0x9C00, 0x55), (0x9802, 0x07), (0x8070, 0xAA)):
+            for gb in (reusing, reference):
+                self._run_to_line(gb, 100)
+                while gb.ppu._mode != 0:  # VRAM is writable in H-Blank
+                    gb.run(max_cycles=gb.cpu.current_cycles + 4)
+                gb.memory.set_value(address, value)
+                self.assertEqual(gb.memory.get_value(address), value)
+                gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME * 2)
+            self.assertEqual(bytes(reusing.get_framebuffer()), bytes(reference.get_framebuffer()))
+            self.assertEqual(reusing.save_state(), reference.save_state())
+
+    def test_matches_full_redraw(self):
+        self._assert_matches_full_redraw()
+
+    def test_matches_full_redraw_with_scheduler(self):
+        self._assert_matches_full_redraw(event_scheduler=True)
+
+    @unittest.skipUnless(frame_renderer.AVAILABLE, "NumPy not installed")
+    def test_matches_full_redraw_with_numpy_renderer(self):
+        self._assert_matches_full_redraw(numpy_renderer=True)
+
+    def test_static_frames_are_not_redrawn(self):
+        gb = self._make_gameboy()
+        gb.run(max_cycles=CYCLES_PER_FRAME * 6)
+        gb.memory.set_value(0xFFFF, 0x00)
+        gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME * 2)
+        drawn = []
+        original = PPU._render_scanline
+
+        def render(ppu):
+            drawn.append(ppu._ly)
+            original(ppu)
+
+        hash_before = gb.ppu.frame_hash()
+        with patch.object(PPU, "_render_scanline", render):
+            gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME * 3)
+        self.assertEqual(drawn, [])
+        self.assertFalse(gb.ppu.frame_changed)
+        self.assertEqual(gb.ppu.frame_hash(), hash_before)
+
+    def test_frame_changed_and_hash_follow_the_picture(self):
+        gb = self._make_gameboy()
+        gb.run(max_cycles=CYCLES_PER_FRAME * 6)
+        gb.memory.set_value(0xFFFF, 0x01)  # V-Blank moves the sprite down a line
+        self._run_to_vblank(gb)
+        gb.run(max_cycles=gb.cpu.current_cycles + 456)
+        self._run_to_vblank(gb)
+        first = gb.ppu.frame_hash()
+        self.assertTrue(gb.ppu.frame_changed)
+        gb.run(max_cycles=gb.cpu.current_cycles + 456)
+        self._run_to_vblank(gb)
+        self.assertTrue(gb.ppu.frame_changed)
+        self.assertNotEqual(gb.ppu.frame_hash(), first)
+
+    def test_load_state_redraws_everything(self):
+        gb = self._make_gameboy()
+        gb.run(max_cycles=CYCLES_PER_FRAME * 6)
+        gb.memory.set_value(0xFFFF, 0x00)
+        gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME * 2)
+        expected = bytes(gb.get_framebuffer())
+        gb.load_state(gb.save_state())  # clears the framebuffer
+        gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME)
+        self.assertEqual(bytes(gb.get_framebuffer()), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
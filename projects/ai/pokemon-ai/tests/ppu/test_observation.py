@@ -0,0 +1,104 @@
+"""
+Semantic observations: tile grids and sprites read from VRAM/OAM, with no
+rasterization, and tile IDs that follow pixel data rather than VRAM slots.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from src.gameboy import GameBoy
+from src.memory.gb_memory import Memory
+from src.ppu import observation
+from src.ppu.ppu import PPU
+
+
+class TestSemanticObservation(unittest.TestCase):
+
+    def setUp(self):
+        self.memory = Memory()
+        self.ppu = PPU()
+        self.memory.load_ppu(self.ppu)
+        self.ppu._mode = 0  # VRAM/OAM writable through the bus
+        mem = self.memory.memory
+        # Map 0x9800 holds row * 32 + col (mod 256), map 0x9C00 holds 0x80 + col
+        for i in range(0x400):
+            mem[0x9800 + i] = i & 0xFF
+            mem[0x9C00 + i] = 0x80 + (i & 31)
+        self.ppu.invalidate_tiles()
+
+    def test_background_grid_follows_scroll(self):
+        self.ppu._scx, self.ppu._scy = 8 * 30 + 3, 8 * 2
+        grid = self.ppu.get_semantic_observation()['background']
+        self.assertEqual(tuple(grid.shape), (18, 20))
+        # Row 2, column 30, wrapping to column 0 after 31
+        self.assertEqual(grid[0, 0], (2 * 32 + 30) & 0xFF)
+        self.assertEqual(grid[0, 2], 2 * 32 + 0)
+        self.assertEqual(grid[17, 19], (19 * 32 + 17) & 0xFF)
+
+    def test_signed_addressing(self):
+        self.ppu._lcdc = 0x81  # bit 4 clear
+        grid = self.ppu.get_semantic_observation()['background']
+        self.assertEqual(grid[0, 1], 256 + 1)  # index 1 -> tile at 0x9010
+        self.assertEqual(grid[4, 0], 128)      # index 128 -> tile at 0x8800
+
+    def test_window_grid(self):
+        obs = self.ppu.get_semantic_observation()
+        self.assertIsNone(obs['window'])
+        self.ppu._lcdc = 0xF1  # window on, map 0x9C00
+        self.ppu._wx, self.ppu._wy = 87, 100
+        obs = self.ppu.get_semantic_observation()
+        self.assertEqual(obs['window_position'], (80, 100))
+        self.assertEqual(obs['window'][0, 3], 0x83)
+        self.ppu._wx = 167  # off-screen
+        self.assertIsNone(self.ppu.get_semantic_observation()['window'])
+
+    def test_sprites_on_screen(self):
+        self.ppu._lcdc |= 0x02
+        entries = {0: (16, 8, 5, 0x20), 1: (0, 50, 6, 0), 2: (60, 200, 7, 0), 3: (10, 30, 9, 0x80)}
+        for i, entry in entries.items():
+            for offset, value in enumerate(entry):
+                self.memory.set_value(0xFE00 + i * 4 + offset, value)
+        sprites = self.ppu.get_semantic_observation()['sprites']
+        self.assertEqual([(s.index, s.x, s.y, s.tile, s.flags) for s in sprites],
+                         [(0, 0, 0, 5, 0x20), (3, 22, -6, 9, 0x80)])
+        self.ppu._lcdc &= ~0x02
+        self.assertEqual(self.ppu.get_semantic_observation()['sprites'], [])
+
+    def test_tile_ids_follow_pixel_data(self):
+        graphic = bytes(range(16))
+        self.memory.memory[0x8000 + 3 * 16:0x8000 + 4 * 16] = graphic
+        self.ppu.invalidate_tiles()
+        self.assertEqual(self.ppu.tile_ids()[3], observation.tile_id(graphic))
+        ids = self.ppu.get_semantic_observation()['background_ids']
+        self.assertEqual(ids[0, 3], observation.tile_id(graphic))
+        self.assertEqual(ids[0, 4], observation.tile_id(bytes(16)))
+        # The game reloads the same graphic into another slot through the bus
+        for i, value in enumerate(graphic):
+            self.memory.set_value(0x8000 + 4 * 16 + i, value)
+        ids = self.ppu.get_semantic_observation()['background_ids']
+        self.assertEqual(ids[0, 4], ids[0, 3])
+
+    def test_grids_without_numpy(self):
+        with patch.object(observation, "np", None):
+            obs = self.ppu.get_semantic_observation()
+        self.assertIsInstance(obs['background'], memoryview)
+        self.assertEqual(obs['background'].shape, (18, 20))
+        self.assertEqual(obs['background'][1, 2], 32 + 2)
+        self.assertEqual(obs['background_ids'][0, 0], observation.tile_id(bytes(16)))
+
+
+class TestSemanticObservationWithoutRendering(unittest.TestCase):
+
+    def test_works_with_rendering_disabled(self):
+        gb = GameBoy()
+        gb.set_rendering(False)
+        gb.ppu._mode = 0
+        gb.memory.set_value(0x9800, 0x07)
+        gb.run(max_cycles=70224)
+        obs = gb.get_semantic_observation()
+        self.assertEqual(obs['background'][0, 0], 7)
+        self.assertEqual(bytes(gb.get_framebuffer()), bytes(160 * 144))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+PPU output formats: every format must match a per-pixel conversion of the
+shade buffer through the current color palettes.
+"""
+
+import random
+import unittest
+
+from src.ppu import pixel_formats
+from src.ppu.ppu import PPU
+
+BG = ((255, 239, 206), (222, 148, 74), (173, 41, 33), (49, 24, 82))
+OBJ0 = ((255, 255, 255), (123, 255, 49), (0, 132, 255), (0, 0, 0))
+OBJ1 = ((255, 255, 255), (255, 132, 132), (148, 58, 58), (0, 0, 0))
+
+
+class TestPixelFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.ppu = PPU()
+        self.ppu.set_color_palette(BG, OBJ0, OBJ1)
+        rng = random.Random(7)
+        self.ppu._shades[:] = bytes(rng.randrange(4) for _ in range(160 * 144))
+        self.ppu._layers[:] = bytes(rng.choice((0, 0, 4, 8)) for _ in range(160 * 144))
+        self.ppu._colors_stale = True
+
+    def _expected(self, pixel, downscale=False):
+        out = bytearray()
+        step = 2 if downscale else 1
+        for y in range(0, 144, step):
+            for x in range(0, 160, step):
+                i = y * 160 + x
+                shade = self.ppu._shades[i]
+                layer = self.ppu._layers[i]
+                out += bytes(pixel(shade, (BG, OBJ0, OBJ1)[layer >> 2][shade]))
+        return bytes(out)
+
+    def test_rgb24_matches_color_buffer(self):
+        frame = self.ppu.get_frame(pixel_formats.RGB24)
+        self.assertEqual(bytes(frame), self._expected(lambda shade, rgb: rgb))
+        self.assertEqual(bytes(frame), bytes(self.ppu.get_color_buffer()))
+
+    def test_rgba32_and_bgra32(self):
+        self.assertEqual(bytes(self.ppu.get_frame(pixel_formats.RGBA32)),
+                         self._expected(lambda shade, rgb: (*rgb, 255)))
+        self.assertEqual(bytes(self.ppu.get_frame(pixel_formats.BGRA32)),
+                         self._expected(lambda shade, rgb: (rgb[2], rgb[1], rgb[0], 255)))
+
+    def test_gray8(self):
+        def luma(shade, rgb):
+            r, g, b = rgb
+            return ((299 * r + 587 * g + 114 * b + 500) // 1000,)
+        self.assertEqual(bytes(self.ppu.get_frame(pixel_formats.GRAY8)), self._expected(luma))
+
+    def test_shade2(self):
+        self.assertEqual(bytes(self.ppu.get_frame(pixel_formats.SHADE2)), bytes(self.ppu._shades))
+
+    def test_index8_indexes_palette_colors(self):
+        frame = self.ppu.get_frame(pixel_formats.INDEX8)
+        colors = self.ppu.get_palette_colors()
+        self.assertEqual(len(colors), 12)
+        self.assertEqual(b"".join(bytes(colors[code]) for code in frame),
+                         self._expected(lambda shade, rgb: rgb))
+
+    def test_downscale(self):
+        for pixel_format in pixel_formats.BYTES_PER_PIXEL:
+            frame = self.ppu.get_frame(pixel_format, downscale=True)
+            self.assertEqual(len(frame), 80 * 72 * pixel_formats.BYTES_PER_PIXEL[pixel_format])
+        self.assertEqual(bytes(self.ppu.get_frame(pixel_formats.RGB24, downscale=True)),
+                         self._expected(lambda shade, rgb: rgb, downscale=True))
+        self.assertEqual(bytes(self.ppu.get_frame(pixel_formats.SHADE2, downscale=True)),
+                         self._expected(lambda shade, rgb: (shade,), downscale=True))
+
+    def test_palette_change_applies(self):
+        before = bytes(self.ppu.get_frame(pixel_formats.GRAY8))
+        self.ppu.set_color_palette(BG[::-1], OBJ0, OBJ1)
+        self.assertNotEqual(bytes(self.ppu.get_frame(pixel_formats.GRAY8)), before)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.ppu.get_frame("RGB565")
+
+
+if __name__ == "__main__":
+    unittest.main()
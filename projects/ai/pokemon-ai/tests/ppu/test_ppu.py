@@ -1,5 +1,7 @@
 import unittest
+from unittest.mock import patch
 
+from src.ppu import ppu as ppu_module
 from src.ppu.ppu import PPU
 from src.memory.gb_memory import Memory
 
@@ -412,17 +414,44 @@ class TestPPUFramebuffer(unittest.TestCase):
         self.ppu = PPU()
 
     def test_framebuffer_initialized_to_zeros(self):
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for row in fb:
             for shade in row:
                 self.assertEqual(shade, 0)
 
     def test_framebuffer_dimensions(self):
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         self.assertEqual(len(fb), 144)
         for row in fb:
             self.assertEqual(len(row), 160)
 
+    def test_framebuffer_view_is_zero_copy(self):
+        fb = self.ppu.get_framebuffer()
+        self.assertEqual(tuple(fb.shape), (144, 160))
+        self.ppu._shades[5 * 160 + 7] = 2
+        self.assertEqual(fb[5, 7], 2)
+        self.assertEqual(len(bytes(fb)), 160 * 144)
+
+    def test_framebuffer_view_without_numpy(self):
+        with patch.object(ppu_module, "np", None):
+            ppu = PPU()
+        fb = ppu.get_framebuffer()
+        self.assertIsInstance(fb, memoryview)
+        self.assertTrue(fb.readonly)
+        ppu._shades[160] = 3
+        self.assertEqual(fb[1, 0], 3)
+
+    def test_color_buffer_follows_shades_and_layers(self):
+        self.ppu.set_color_palette(
+            ((1, 1, 1), (2, 2, 2), (3, 3, 3), (4, 4, 4)),
+            ((10, 11, 12), (20, 21, 22), (30, 31, 32), (40, 41, 42)),
+            ((50, 0, 0), (60, 0, 0), (70, 0, 0), (80, 0, 0)))
+        self.ppu._shades[0:3] = bytes([3, 1, 2])
+        self.ppu._layers[0:3] = bytes([0, 4, 8])
+        self.ppu._colors_stale = True
+        self.assertEqual(bytes(self.ppu.get_color_buffer()[:9]),
+                         bytes([4, 4, 4, 20, 21, 22, 70, 0, 0]))
+
 
 class _RenderTestBase(unittest.TestCase):
     """Base class that wires Memory + PPU and provides VRAM helpers."""
@@ -466,7 +495,7 @@ class TestPPUTileDecoding(_RenderTestBase):
         # BGP = 0xFC → color 3 maps to shade 3
         self.ppu._bgp = 0xFC
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # First 8 pixels should be shade 3
         for px in range(8):
             self.assertEqual(fb[0][px], 3, f"pixel {px}")
@@ -479,7 +508,7 @@ class TestPPUTileDecoding(_RenderTestBase):
         # BGP = 0xE4 → identity palette (0→0, 1→1, 2→2, 3→3)
         self.ppu._bgp = 0xE4
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             expected = 1 if (px % 2 == 0) else 0  # bit 7-0: 1,0,1,0,1,0,1,0
             self.assertEqual(fb[0][px], expected, f"pixel {px}")
@@ -491,7 +520,7 @@ class TestPPUTileDecoding(_RenderTestBase):
         # BGP = 0x00 → all color indices map to shade 0
         self.ppu._bgp = 0x00
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 0, f"pixel {px}")
 
@@ -499,7 +528,7 @@ class TestPPUTileDecoding(_RenderTestBase):
         # Binary: 01_01_01_00 → color 0→0, 1→1, 2→1, 3→1
         self.ppu._bgp = 0x54
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 1, f"pixel {px}")
 
@@ -520,14 +549,14 @@ class TestPPUScrolling(_RenderTestBase):
         # No scroll → first 8 pixels from tile 0 (shade 0)
         self.ppu._scx = 0
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 0, f"pixel {px}")
 
         # SCX = 8 → first 8 pixels now from tile 1 (shade 3)
         self.ppu._scx = 8
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 3, f"pixel {px}")
 
@@ -543,12 +572,12 @@ class TestPPUScrolling(_RenderTestBase):
         # SCY = 0, LY = 0 → tile row 0 → tile 0 → shade 0
         self.ppu._scy = 0
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 0)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 0)
 
         # SCY = 8, LY = 0 → tile row 1 → tile 1 → shade 3
         self.ppu._scy = 8
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
     def test_scroll_wrapping(self):
         # Tile 1 at 0x8010: all color 3
@@ -561,7 +590,7 @@ class TestPPUScrolling(_RenderTestBase):
         self.ppu._scx = 248
         self.ppu._scy = 248
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 3, f"pixel {px}")
 
@@ -576,7 +605,7 @@ class TestPPUTileAddressing(_RenderTestBase):
         self._set_tile_map_entry(0, 0, 0)
         self.ppu._bgp = 0xE4
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
     def test_signed_addressing_mode(self):
         # LCDC bit 4 = 0 (signed): tile index 0 → 0x9000
@@ -585,7 +614,7 @@ class TestPPUTileAddressing(_RenderTestBase):
         self._set_tile_map_entry(0, 0, 0)
         self.ppu._bgp = 0xE4
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
     def test_signed_addressing_negative_index(self):
         # Tile index 128 (0x80) → signed = -128 → 0x9000 + (-128)*16 = 0x8800
@@ -594,7 +623,7 @@ class TestPPUTileAddressing(_RenderTestBase):
         self._set_tile_map_entry(0, 0, 128)
         self.ppu._bgp = 0xE4
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
 
 class TestPPURenderASCII(unittest.TestCase):
@@ -613,10 +642,7 @@ class TestPPURenderASCII(unittest.TestCase):
 
     def test_render_ascii_shade_mapping(self):
         # Set specific shades and verify ASCII output
-        self.ppu._framebuffer[0][0] = 0
-        self.ppu._framebuffer[0][1] = 1
-        self.ppu._framebuffer[0][2] = 2
-        self.ppu._framebuffer[0][3] = 3
+        self.ppu._shades[0:4] = bytes([0, 1, 2, 3])
         result = self.ppu.render_ascii()
         first_line = result.split("\n")[0]
         self.assertEqual(first_line[0], " ")
@@ -657,7 +683,7 @@ class TestPPUWindowRendering(_RenderTestBase):
         self.ppu._wy = 0
         self.ppu._wx = 7
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # All pixels should be shade 0 (BG only)
         for px in range(160):
             self.assertEqual(fb[0][px], 0, f"pixel {px}")
@@ -666,7 +692,7 @@ class TestPPUWindowRendering(_RenderTestBase):
         # WY=0, WX=7 → window covers entire screen
         self._enable_window(wy=0, wx=7)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # All pixels should be shade 3 (window tile)
         for px in range(160):
             self.assertEqual(fb[0][px], 3, f"pixel {px}")
@@ -675,7 +701,7 @@ class TestPPUWindowRendering(_RenderTestBase):
         # WX=87 → window starts at pixel 80
         self._enable_window(wy=0, wx=87)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # Pixels 0-79: BG (shade 0)
         for px in range(80):
             self.assertEqual(fb[0][px], 0, f"pixel {px}")
@@ -688,10 +714,10 @@ class TestPPUWindowRendering(_RenderTestBase):
         self._enable_window(wy=4, wx=7)
         for ly in range(4):
             self._render_scanline(ly)
-            self.assertEqual(self.ppu.get_framebuffer()[ly][0], 0,
+            self.assertEqual(self.ppu.get_framebuffer_rows()[ly][0], 0,
                              f"scanline {ly} should be BG")
         self._render_scanline(4)
-        self.assertEqual(self.ppu.get_framebuffer()[4][0], 3,
+        self.assertEqual(self.ppu.get_framebuffer_rows()[4][0], 3,
                          "scanline 4 should be window")
 
     def test_window_line_counter_increments(self):
@@ -706,10 +732,10 @@ class TestPPUWindowRendering(_RenderTestBase):
         # Render 8 scanlines (tile row 0), then scanline 8 (tile row 1)
         for ly in range(8):
             self._render_scanline(ly)
-            self.assertEqual(self.ppu.get_framebuffer()[ly][0], 3,
+            self.assertEqual(self.ppu.get_framebuffer_rows()[ly][0], 3,
                              f"scanline {ly} should be shade 3 (tile row 0)")
         self._render_scanline(8)
-        self.assertEqual(self.ppu.get_framebuffer()[8][0], 1,
+        self.assertEqual(self.ppu.get_framebuffer_rows()[8][0], 1,
                          "scanline 8 should be shade 1 (tile row 1)")
 
     def test_window_tile_map_lcdc_bit6(self):
@@ -723,7 +749,7 @@ class TestPPUWindowRendering(_RenderTestBase):
         self.ppu._wy = 0
         self.ppu._wx = 7
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 1,
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 1,
                          "should read tile 2 (shade 1) from 0x9800 map")
 
     def test_window_uses_same_tile_data_addressing(self):
@@ -736,7 +762,7 @@ class TestPPUWindowRendering(_RenderTestBase):
         self.ppu._wy = 0
         self.ppu._wx = 7
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3,
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3,
                          "window should use signed tile data addressing")
 
 
@@ -760,6 +786,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         self.memory.memory[base + 1] = x
         self.memory.memory[base + 2] = tile
         self.memory.memory[base + 3] = attrs
+        self.ppu.invalidate_sprites()
 
     def test_sprites_disabled_by_lcdc_bit1(self):
         """When LCDC bit 1 = 0, sprites are not drawn."""
@@ -768,7 +795,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         self._write_tile(0x8010, [(0xFF, 0xFF)] * 8)
         self._write_sprite(0, y=16, x=8, tile=1)  # screen pos (0, 0)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 0, f"pixel {px} should be BG (shade 0)")
 
@@ -778,7 +805,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         self._write_tile(0x8010, [(0xFF, 0xFF)] * 8)
         self._write_sprite(0, y=16, x=8, tile=1)  # screen (0, 0)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             self.assertEqual(fb[0][px], 3, f"pixel {px}")
         # Pixel 8 should be BG (shade 0)
@@ -793,7 +820,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         self._write_tile(0x8010, [(0xAA, 0x00)] * 8)
         self._write_sprite(0, y=16, x=8, tile=1)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(8):
             if px % 2 == 0:
                 # Sprite color 1 → shade 1
@@ -814,12 +841,12 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # Sprite using OBP0 (attr bit 4 = 0)
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x00)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 1)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 1)
 
         # Sprite using OBP1 (attr bit 4 = 1)
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x10)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 2)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 2)
 
     def test_sprite_x_flip(self):
         """Attr bit 5 mirrors tile horizontally."""
@@ -829,14 +856,14 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # No flip: pixel 0 = shade 1, pixel 7 = shade 0
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x00)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         self.assertEqual(fb[0][0], 1)
         self.assertEqual(fb[0][7], 0)
 
         # X-flip: pixel 0 = shade 0, pixel 7 = shade 1
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x20)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         self.assertEqual(fb[0][0], 0)
         self.assertEqual(fb[0][7], 1)
 
@@ -849,20 +876,20 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # No flip: LY=0 → row 0 → shade 3
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x00)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
         # No flip: LY=7 → row 7 → shade 0 (BG)
         self._render_scanline(7)
-        self.assertEqual(self.ppu.get_framebuffer()[7][0], 0)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[7][0], 0)
 
         # Y-flip: LY=0 → reads row 7 (color 0, transparent) → BG shade 0
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x40)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 0)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 0)
 
         # Y-flip: LY=7 → reads row 0 (color 3) → shade 3
         self._render_scanline(7)
-        self.assertEqual(self.ppu.get_framebuffer()[7][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[7][0], 3)
 
     def test_sprite_8x16_mode(self):
         """LCDC bit 2 enables 8x16 sprites; tile index bit 0 masked."""
@@ -875,10 +902,10 @@ class TestPPUSpriteRendering(_RenderTestBase):
         self._write_sprite(0, y=16, x=8, tile=1)
         # LY=0 → top tile → color 1 → shade 1
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 1)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 1)
         # LY=8 → bottom tile → color 3 → shade 3
         self._render_scanline(8)
-        self.assertEqual(self.ppu.get_framebuffer()[8][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[8][0], 3)
 
     def test_sprite_8x16_y_flip(self):
         """8x16 mode with Y-flip swaps top and bottom tiles."""
@@ -891,10 +918,10 @@ class TestPPUSpriteRendering(_RenderTestBase):
         self._write_sprite(0, y=16, x=8, tile=0, attrs=0x40)
         # LY=0 with Y-flip → row_in_sprite=15, flipped → reads bottom tile row 7 → color 3
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
         # LY=8 with Y-flip → row_in_sprite=8, flipped to 7 → reads top tile row 7 → color 1
         self._render_scanline(8)
-        self.assertEqual(self.ppu.get_framebuffer()[8][0], 1)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[8][0], 1)
 
     def test_sprite_bg_priority(self):
         """Attr bit 7: sprite hidden behind non-zero BG color."""
@@ -907,12 +934,12 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # Without BG priority → sprite wins
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x00)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
         # With BG priority (bit 7) → BG color 2 (non-zero) hides sprite
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x80)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 2)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 2)
 
     def test_sprite_bg_priority_bg_color_zero(self):
         """BG priority sprite is visible where BG color index is 0."""
@@ -924,7 +951,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # BG priority set, but BG color is 0 → sprite visible
         self._write_sprite(0, y=16, x=8, tile=1, attrs=0x80)
         self._render_scanline(0)
-        self.assertEqual(self.ppu.get_framebuffer()[0][0], 3)
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][0], 3)
 
     def test_sprite_10_per_scanline_limit(self):
         """Only first 10 sprites on a scanline are drawn; 11th is dropped."""
@@ -934,7 +961,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         for i in range(11):
             self._write_sprite(i, y=16, x=8 + i * 8, tile=1)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # Sprites 0-9 (X pixels 0-79) should be drawn
         for px in range(80):
             self.assertEqual(fb[0][px], 3, f"pixel {px} should be sprite")
@@ -953,7 +980,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # Sprite 1 (OAM 1) at X=8 (overlaps pixels 0-7), tile 1 (shade 1)
         self._write_sprite(1, y=16, x=8, tile=1)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # Pixels 4-7 overlap: sprite 1 (X=8, lower) wins → shade 1
         for px in range(4, 8):
             self.assertEqual(fb[0][px], 1, f"pixel {px}: lower X wins")
@@ -972,7 +999,7 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # OAM 5 at X=8, tile 2 (shade 3) — higher OAM index
         self._write_sprite(5, y=16, x=8, tile=2)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         # Lower OAM index (0) wins
         for px in range(8):
             self.assertEqual(fb[0][px], 1, f"pixel {px}: lower OAM wins")
@@ -984,17 +1011,78 @@ class TestPPUSpriteRendering(_RenderTestBase):
         # Sprite at X=4 → screen X = -4, pixels 0-3 visible (cols 4-7 of tile)
         self._write_sprite(0, y=16, x=4, tile=1)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(4):
             self.assertEqual(fb[0][px], 3, f"pixel {px} should show clipped sprite")
         # Right edge: sprite at X=161 → screen X=153, pixels 153-159 visible, cols 7+ clipped
         self._write_sprite(1, y=16, x=161, tile=1)
         self._render_scanline(0)
-        fb = self.ppu.get_framebuffer()
+        fb = self.ppu.get_framebuffer_rows()
         for px in range(153, 160):
             self.assertEqual(fb[0][px], 3, f"pixel {px}")
 
 
+class TestSpriteIndex(_RenderTestBase):
+    """The per-line sprite index must follow OAM writes, DMA and sprite size."""
+
+    def setUp(self):
+        super().setUp()
+        self.ppu._lcdc |= 0x02
+        self.ppu._bgp = self.ppu._obp0 = 0xE4
+        self._write_tile(0x8010, [(0xFF, 0xFF)] * 8)  # tile 1: color 3
+        self.ppu._mode = 0  # OAM accessible through the bus
+
+    def _shade(self, ly, x):
+        self._render_scanline(ly)
+        return self.ppu.get_framebuffer()[ly, x]
+
+    def test_index_lists_sorted_sprites_per_line(self):
+        for i, x in enumerate((40, 8, 40, 24)):
+            for offset, value in enumerate((16, x, 1, 0)):
+                self.memory.set_value(0xFE00 + i * 4 + offset, value)
+        self._render_scanline(0)
+        line = self.ppu._line_sprites[0]
+        self.assertEqual([(x, i) for x, i, *_ in line], [(8, 1), (24, 3), (40, 0), (40, 2)])
+        self.assertEqual(self.ppu._line_sprites[8], [])
+
+    def test_ten_sprite_limit_in_oam_order(self):
+        for i in range(12):
+            for offset, value in enumerate((16, 160 - i * 8, 1, 0)):
+                self.memory.set_value(0xFE00 + i * 4 + offset, value)
+        self._render_scanline(0)
+        self.assertEqual(sorted(i for _, i, *_ in self.ppu._line_sprites[0]), list(range(10)))
+
+    def test_oam_write_rebuilds_index(self):
+        for offset, value in enumerate((16, 8, 1, 0)):
+            self.memory.set_value(0xFE00 + offset, value)
+        self.assertEqual(self._shade(0, 0), 3)
+        self.memory.set_value(0xFE01, 16)  # move right by 8
+        self.assertEqual(self._shade(0, 0), 0)
+        self.assertEqual(self._shade(0, 8), 3)
+
+    def test_dma_rebuilds_index(self):
+        self.assertEqual(self._shade(0, 0), 0)
+        self.memory.memory[0xC000:0xC004] = bytes([16, 8, 1, 0])
+        self.ppu.write(0xFF46, 0xC0)
+        self.assertEqual(self._shade(0, 0), 3)
+
+    def test_load_state_rebuilds_index(self):
+        self.assertEqual(self._shade(0, 0), 0)
+        image = bytearray(self.memory.save_state()['memory'])
+        image[0xFE00:0xFE04] = bytes([16, 8, 1, 0])
+        self.memory.load_state({'memory': bytes(image)})
+        self.assertEqual(self._shade(0, 0), 3)
+
+    def test_sprite_size_change_rebuilds_index(self):
+        for offset, value in enumerate((16, 8, 0, 0)):
+            self.memory.set_value(0xFE00 + offset, value)
+        self._write_tile(0x8000, [(0xFF, 0x00)] * 8)  # tile 0: color 1 (bottom is tile 1)
+        self._set_tile_map_entry(1, 0, 2)  # blank BG behind line 8
+        self.assertEqual(self._shade(8, 0), 0)  # 8x8: line 8 is below the sprite
+        self.ppu._lcdc |= 0x04
+        self.assertEqual(self._shade(8, 0), 3)  # 8x16: tile 1 is the bottom half
+
+
 class TestPPUSTATInterrupts(unittest.TestCase):
     """STAT interrupt (IF bit 1) fires on rising edge of enabled conditions."""
 
@@ -0,0 +1,96 @@
+"""
+Render skipping: undrawn frames must leave timing, interrupts, the window
+line counter and everything else but the framebuffer exactly as drawn ones.
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from src.gameboy import GameBoy
+from src.ppu import frame_renderer
+from src.ppu.ppu import PPU
+from tests.ppu.test_frame_renderer import _build_raster_rom
+
+CYCLES_PER_FRAME = 70224
+
+
+class TestRenderSkip(unittest.TestCase):
+
+    def setUp(self):
+        self.rom_path = _build_raster_rom()
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def _make_gameboy(self, **kwargs):
+        gb = GameBoy(**kwargs)
+        gb.load_cartridge(self.rom_path)
+        gb.cpu.registers.PC = 0x0100
+        return gb
+
+    def _run_to_vblank(self, gb):
+        """Run until the frame in progress has been drawn (LY 144)."""
+        while gb.ppu._ly != 144:
+            gb.run(max_cycles=gb.cpu.current_cycles + 4)
+
+    def _assert_same_state(self, **kwargs):
+        reference = self._make_gameboy(**kwargs)
+        skipping = self._make_gameboy(**kwargs)
+        skipping.set_rendering(False)
+        blank = bytes(skipping.get_framebuffer())
+        # The ROM's fill loop takes about four frames, then the LCD is on with
+        # the window, a sprite and per-line STAT interrupts
+        for chunk in (1, 457, 20000, CYCLES_PER_FRAME * 4, 33333, CYCLES_PER_FRAME * 3):
+            reference.run(max_cycles=reference.cpu.current_cycles + chunk)
+            skipping.run(max_cycles=skipping.cpu.current_cycles + chunk)
+            self.assertEqual(skipping.save_state(), reference.save_state())
+        self.assertEqual(bytes(skipping.get_framebuffer()), blank)
+        self.assertNotEqual(bytes(reference.get_framebuffer()), blank)
+        return reference, skipping
+
+    def test_skipped_frames_keep_state_exact(self):
+        self._assert_same_state()
+
+    def test_skipped_frames_keep_state_exact_with_scheduler(self):
+        self._assert_same_state(event_scheduler=True)
+
+    @unittest.skipUnless(frame_renderer.AVAILABLE, "NumPy not installed")
+    def test_skipped_frames_keep_state_exact_with_numpy_renderer(self):
+        self._assert_same_state(numpy_renderer=True)
+
+    def test_reenabled_frame_matches(self):
+        reference, skipping = self._assert_same_state()
+        self._run_to_vblank(reference)
+        self._run_to_vblank(skipping)
+        skipping.set_rendering(True)
+        for gb in (reference, skipping):
+            gb.run(max_cycles=gb.cpu.current_cycles + CYCLES_PER_FRAME - 456)
+            self._run_to_vblank(gb)
+        self.assertEqual(bytes(skipping.get_framebuffer()), bytes(reference.get_framebuffer()))
+        self.assertEqual(skipping.ppu.get_color_buffer(), reference.ppu.get_color_buffer())
+
+    def test_frameskip_draws_every_nth_frame(self):
+        gb = self._make_gameboy()
+        gb.set_frameskip(3)
+        drawn = []
+        original = PPU._render_scanline
+
+        def render(ppu):
+            drawn.append(ppu._frame_count)
+            original(ppu)
+
+        with patch.object(PPU, "_render_scanline", render):
+            gb.run(max_cycles=CYCLES_PER_FRAME * 16)
+        frames = sorted(set(drawn))
+        self.assertGreaterEqual(len(frames), 3)
+        self.assertTrue(all(frame % 3 == 0 for frame in frames))
+        self.assertTrue(all(drawn.count(frame) == 144 for frame in frames[:-1]))
+
+    def test_frameskip_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            GameBoy().set_frameskip(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Decoded tile cache: rendering from cached tile rows must match decoding
+the bitplanes pixel by pixel, and VRAM writes must drop stale rows.
+"""
+
+import random
+import unittest
+
+from src.ppu.ppu import PPU
+from src.memory.gb_memory import Memory
+
+
+def _pixel(mem, tile_addr, row, bit):
+    low_byte = mem[tile_addr + row * 2]
+    high_byte = mem[tile_addr + row * 2 + 1]
+    return (((high_byte >> bit) & 1) << 1) | ((low_byte >> bit) & 1)
+
+
+def _reference_scanline(ppu, mem, ly, window_line):
+    """Render one line pixel by pixel, straight from VRAM.
+
+    Returns (shades, rgb, window_drawn).
+    """
+    lcdc = ppu._lcdc
+    unsigned_mode = bool(lcdc & 0x10)
+    indices = [0] * 160
+    for px in range(160):
+        x = (px + ppu._scx) & 0xFF
+        y = (ly + ppu._scy) & 0xFF
+        map_base = 0x9C00 if lcdc & 0x08 else 0x9800
+        win_x = px - (ppu._wx - 7)
+        if (lcdc & 0x20) and ly >= ppu._wy and win_x >= 0:
+            x, y = win_x, window_line
+            map_base = 0x9C00 if lcdc & 0x40 else 0x9800
+        tile_addr = PPU._tile_data_address(mem[map_base + (y >> 3) * 32 + (x >> 3)], unsigned_mode)
+        indices[px] = _pixel(mem, tile_addr, y & 7, 7 - (x & 7))
+    shades = [(ppu._bgp >> (i * 2)) & 3 for i in indices]
+    colors = [ppu._bg_colors[shade] for shade in shades]
+
+    if lcdc & 0x02:
+        height = 16 if lcdc & 0x04 else 8
+        sprites = [i for i in range(40)
+                   if mem[0xFE00 + i * 4] - 16 <= ly < mem[0xFE00 + i * 4] - 16 + height][:10]
+        sprites.sort(key=lambda i: mem[0xFE00 + i * 4 + 1])
+        for i in reversed(sprites):
+            y, x, tile, attrs = mem[0xFE00 + i * 4:0xFE00 + i * 4 + 4]
+            row = ly - (y - 16)
+            if attrs & 0x40:
+                row = height - 1 - row
+            if height == 16:
+                tile = (tile & 0xFE) | (row >> 3)
+                row &= 7
+            for col in range(8):
+                px = x - 8 + col
+                if not 0 <= px < 160:
+                    continue
+                index = _pixel(mem, 0x8000 + tile * 16, row, col if attrs & 0x20 else 7 - col)
+                if index == 0 or (attrs & 0x80 and indices[px] != 0):
+                    continue
+                palette = ppu._obp1 if attrs & 0x10 else ppu._obp0
+                shades[px] = (palette >> (index * 2)) & 3
+                colors[px] = (ppu._obj1_colors if attrs & 0x10 else ppu._obj0_colors)[shades[px]]
+
+    window_drawn = bool(lcdc & 0x20) and ly >= ppu._wy and ppu._wx - 7 < 160
+    return shades, bytes(c for rgb in colors for c in rgb), window_drawn
+
+
+class TestTileCacheRendering(unittest.TestCase):
+
+    def setUp(self):
+        self.memory = Memory()
+        self.ppu = PPU()
+        self.memory.load_ppu(self.ppu)
+        self.ppu.set_color_palette(
+            ((255, 239, 206), (222, 148, 74), (173, 41, 33), (49, 24, 82)),
+            ((255, 255, 255), (123, 255, 49), (0, 132, 255), (0, 0, 0)),
+            ((255, 255, 255), (255, 132, 132), (148, 58, 58), (0, 0, 0)))
+
+    def _randomize(self, rng):
+        mem = self.memory.memory
+        mem[0x8000:0xA000] = bytes(rng.randrange(256) for _ in range(0x2000))
+        oam = bytearray(rng.randrange(256) for _ in range(160))
+        for i in range(0, 160, 4):
+            oam[i] = rng.randrange(0, 170)  # keep most sprites near the screen
+            oam[i + 1] = rng.randrange(0, 176)
+        mem[0xFE00:0xFEA0] = oam
+        self.ppu.invalidate_tiles()
+        self.ppu.invalidate_sprites()
+        ppu = self.ppu
+        ppu._lcdc = rng.randrange(256) | 0x80
+        ppu._scx, ppu._scy = rng.randrange(256), rng.randrange(256)
+        # WX below 7 starts the window part-way into its first tile
+        ppu._wx = rng.choice((rng.randrange(0, 7), rng.randrange(0, 176)))
+        ppu._wy = rng.randrange(0, 150)
+        ppu._bgp, ppu._obp0, ppu._obp1 = rng.randrange(256), rng.randrange(256), rng.randrange(256)
+
+    def _assert_frame_matches(self):
+        ppu = self.ppu
+        ppu._window_line = 0
+        window_line = 0
+        for ly in range(144):
+            shades, rgb, window_drawn = _reference_scanline(ppu, self.memory.memory, ly, window_line)
+            ppu._ly = ly
+            ppu._render_scanline()
+            self.assertEqual(list(ppu._shades[ly * 160:(ly + 1) * 160]), shades, f"line {ly}")
+            self.assertEqual(bytes(ppu.get_color_buffer()[ly * 480:(ly + 1) * 480]), rgb, f"line {ly}")
+            window_line += window_drawn
+            self.assertEqual(ppu._window_line, window_line)
+
+    def test_matches_per_pixel_decoding(self):
+        rng = random.Random(1234)
+        for _ in range(12):
+            self._randomize(rng)
+            self._assert_frame_matches()
+
+    def test_vram_write_invalidates_row(self):
+        self.ppu._lcdc = 0x91
+        self.ppu._bgp = 0xE4
+        self._assert_frame_matches()
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][:8], [0] * 8)
+        self.ppu._mode = 0  # VRAM accessible
+        self.memory.set_value(0x8000, 0xFF)  # tile 0, row 0, low bitplane
+        self._assert_frame_matches()
+        self.assertEqual(self.ppu.get_framebuffer_rows()[0][:8], [1] * 8)
+
+    def test_flipped_sprite_row_invalidated(self):
+        mem = self.memory.memory
+        self.ppu._lcdc = 0x93  # sprites on
+        mem[0xFE00:0xFE04] = bytes([16, 8, 1, 0x20])  # tile 1, X-flip
+        self.ppu.invalidate_sprites()
+        self._assert_frame_matches()
+        self.ppu._mode = 0
+        self.memory.set_value(0x8010, 0x01)  # rightmost pixel -> leftmost when flipped
+        self._assert_frame_matches()
+        self.assertNotEqual(self.ppu.get_framebuffer()[0, 0], 0)
+
+    def test_load_state_invalidates_all(self):
+        self._assert_frame_matches()
+        state = self.memory.save_state()
+        image = bytearray(state['memory'])
+        image[0x8000:0x8010] = b"\xff" * 16
+        self.memory.load_state({'memory': bytes(image)})
+        self._assert_frame_matches()
+
+
+if __name__ == "__main__":
+    unittest.main()
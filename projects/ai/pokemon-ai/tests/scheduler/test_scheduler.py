@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+
+from src.gameboy import GameBoy
+from src.memory.gb_memory import Memory
+from src.cpu.gb_cpu import CPU
+from src.timer.gb_timer import Timer
+from src.ppu.ppu import PPU
+from src.scheduler.scheduler import Scheduler, NEVER
+
+
+def _build_test_rom():
+    """Build a ROM that keeps the timer, PPU and APU busy.
+
+    The timer runs at its fastest rate and is reset through DIV every loop,
+    the PPU raises V-Blank and H-Blank STAT interrupts, channel 1 is
+    retriggered with a length counter every loop, and the main loop reads
+    LY/DIV/STAT/NR52, writes VRAM and HALTs between interrupts.
+    """
+    rom = bytearray(0x8000)
+    # V-Blank ISR: increment counter at 0xC010
+    rom[0x0040:0x004A] = bytes([0xF5, 0xFA, 0x10, 0xC0, 0x3C, 0xEA, 0x10, 0xC0, 0xF1, 0xD9])
+    # STAT ISR: record LY at 0xC011
+    rom[0x0048:0x0050] = bytes([0xF5, 0xF0, 0x44, 0xEA, 0x11, 0xC0, 0xF1, 0xD9])
+    # Timer ISR
+    rom[0x0050] = 0xD9
+    rom[0x0100:0x0104] = bytes([0x00, 0xC3, 0x50, 0x01])  # NOP; JP 0x0150
+
+    program = [
+        0x31, 0xFE, 0xFF,        # LD SP,0xFFFE
+        0x3E, 0x05, 0xE0, 0x07,  # TAC = timer on, 16 T-cycles
+        0x3E, 0x08, 0xE0, 0x41,  # STAT = H-Blank interrupt source
+        0x3E, 0x07, 0xE0, 0xFF,  # IE = V-Blank, STAT, timer
+        0x3E, 0x80, 0xE0, 0x26,  # NR52 = power on
+        0x3E, 0xF3, 0xE0, 0x12,  # NR12 = volume 15, decreasing
+        0x3E, 0x11, 0xE0, 0x25,  # NR51
+        0x3E, 0x77, 0xE0, 0x24,  # NR50
+        0x3E, 0x11, 0xE0, 0x40,  # LCDC = off
+        0x3E, 0x91, 0xE0, 0x40,  # LCDC = on
+        0xFB,                    # EI
+    ]
+    loop = [
+        0x3E, 0x38, 0xE0, 0x11,  # NR11 = length 8
+        0x3E, 0xC7, 0xE0, 0x14,  # NR14 = trigger, length enabled
+        0xF0, 0x44,              # LDH A,(LY)
+        0x47,                    # LD B,A
+        0xF0, 0x04,              # LDH A,(DIV)
+        0x80,                    # ADD A,B
+        0x21, 0x00, 0x80,        # LD HL,0x8000
+        0x22,                    # LD (HL+),A   — VRAM write
+        0xF0, 0x26,              # LDH A,(NR52)
+        0xEA, 0x00, 0xC0,        # LD (0xC000),A
+        0xF0, 0x41,              # LDH A,(STAT)
+        0xEA, 0x01, 0xC0,        # LD (0xC001),A
+        0x76,                    # HALT
+        0x00,                    # NOP
+        0xE0, 0x04,              # LDH (DIV),A  — reset the timer divider
+    ]
+    loop += [0x18, (-(len(loop) + 2)) & 0xFF]  # JR loop
+    program += loop
+    rom[0x0150:0x0150 + len(program)] = bytes(program)
+
+    fd, path = tempfile.mkstemp(suffix=".gb")
+    os.write(fd, bytes(rom))
+    os.close(fd)
+    return path
+
+
+class TestSchedulerMatchesTicking(unittest.TestCase):
+    """Scheduled mode must be indistinguishable from per-instruction ticks."""
+
+    def setUp(self):
+        self.rom_path = _build_test_rom()
+
+    def tearDown(self):
+        os.unlink(self.rom_path)
+
+    def _make_gameboy(self, **kwargs):
+        gb = GameBoy(**kwargs)
+        gb.load_cartridge(self.rom_path)
+        gb.cpu.registers.PC = 0x0100
+        return gb
+
+    def _assert_same_run(self, reference, scheduled, compare_frames=True):
+        for chunk in (1, 9, 100, 457, 5000, 20000, 70224, 140448):
+            reference.run(max_cycles=reference.cpu.current_cycles + chunk)
+            scheduled.run(max_cycles=scheduled.cpu.current_cycles + chunk)
+            self.assertEqual(scheduled.save_state(), reference.save_state())
+            self.assertEqual(scheduled.apu.drain_samples(), reference.apu.drain_samples())
+            if compare_frames:
+                self.assertEqual(scheduled.ppu.get_color_buffer(), reference.ppu.get_color_buffer())
+
+    def test_interpreter(self):
+        self._assert_same_run(self._make_gameboy(),
+                              self._make_gameboy(event_scheduler=True))
+
+    def test_block_compiler(self):
+        self._assert_same_run(self._make_gameboy(compile_blocks=True),
+                              self._make_gameboy(compile_blocks=True, event_scheduler=True))
+
+    def test_program_reaches_interesting_paths(self):
+        gb = self._make_gameboy(event_scheduler=True)
+        gb.run(max_cycles=300000)
+        self.assertGreater(gb.memory.memory[0xC010], 0)  # V-Blank ISR ran
+        self.assertNotEqual(gb.memory.memory[0xC011], 0)  # STAT ISR ran
+        self.assertTrue(gb.apu.drain_samples())
+
+    def test_load_state_reschedules(self):
+        """Component state restored between runs is picked up by the next run."""
+        reference = self._make_gameboy()
+        scheduled = self._make_gameboy(event_scheduler=True)
+        reference.run(max_cycles=100000)
+        state = reference.save_state()
+        scheduled.load_state(state)
+        reference.load_state(state)
+        # Frame contents are not part of a save state, so only compare state
+        self._assert_same_run(reference, scheduled, compare_frames=False)
+
+
+class TestSchedulerEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.memory = Memory()
+        self.cpu = CPU(self.memory)
+        self.timer = Timer()
+        self.memory.load_timer(self.timer)
+        self.ppu = PPU()
+        self.memory.load_ppu(self.ppu)
+        self.scheduler = Scheduler(self.timer, self.ppu)
+        self.memory.load_scheduler(self.scheduler)
+
+    def test_cpu_picks_up_scheduler(self):
+        self.assertIs(self.cpu._scheduler, self.scheduler)
+
+    def test_timer_overflow_event(self):
+        self.timer.write(0xFF07, 0x05)  # 16 T-cycles per TIMA increment
+        self.timer.write(0xFF05, 0xFE)
+        self.assertEqual(self.timer.next_event_cycles(), 32)
+        self.timer.write(0xFF07, 0x00)
+        self.assertIsNone(self.timer.next_event_cycles())
+
+    def test_ppu_event_is_next_mode_change(self):
+        self.assertEqual(self.ppu.next_event_cycles(), 80)
+        self.ppu.tick(100)
+        self.assertEqual(self.ppu.next_event_cycles(), 152)
+        self.ppu._lcdc = 0x11
+        self.assertIsNone(self.ppu.next_event_cycles())
+
+    def test_register_read_catches_up(self):
+        self.scheduler.sync_all()
+        self.scheduler.advance(456 * 3 + 8)
+        self.assertEqual(self.memory.get_value(0xFF44), 3)
+        self.assertEqual(self.ppu._dot, 8)
+
+    def test_events_fire_without_register_access(self):
+        self.scheduler.sync_all()
+        for _ in range(144 * 456 // 4):
+            self.scheduler.advance(4)
+        self.assertEqual(self.memory.memory[0xFF0F] & 0x01, 0x01)  # V-Blank
+
+    def test_no_events_when_idle(self):
+        self.ppu._lcdc = 0x00
+        self.scheduler.sync_all()
+        self.assertEqual(self.scheduler.next_event, NEVER)
+
+
+if __name__ == "__main__":
+    unittest.main()
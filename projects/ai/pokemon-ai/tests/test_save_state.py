@@ -131,12 +131,12 @@ class TestAPUSaveState(unittest.TestCase):
         apu = APU()
         apu.write(0xFF26, 0x80)
         apu.tick(1000)
-        self.assertGreater(len(apu._sample_buffer), 0)
+        self.assertGreater(len(apu._ring), 0)
 
         state = apu.save_state()
         apu2 = APU()
         apu2.load_state(state)
-        self.assertEqual(len(apu2._sample_buffer), 0)
+        self.assertEqual(len(apu2._ring), 0)
 
 
 class TestTimerSaveState(unittest.TestCase):
@@ -207,11 +207,12 @@ class TestPPUSaveState(unittest.TestCase):
 
     def test_framebuffer_cleared(self):
         ppu = PPU()
-        ppu._framebuffer[0][0] = 3
         state = ppu.save_state()
-        ppu2 = PPU()
-        ppu2.load_state(state)
-        self.assertEqual(ppu2._framebuffer[0][0], 0)
+        view = ppu.get_framebuffer()
+        ppu._shades[0] = 3
+        ppu.load_state(state)
+        self.assertEqual(ppu.get_framebuffer()[0, 0], 0)
+        self.assertIs(ppu.get_framebuffer(), view)  # cleared in place
 
 
 class TestMemorySaveState(unittest.TestCase):